@@ -1,6 +1,29 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
+_WEB_SERVERS = ('gunicorn', 'uvicorn', 'daphne', 'hypercorn', 'uwsgi')
+
+
+def _is_web_server() -> bool:
+    """True for HTTP server processes (gunicorn & co, ``manage.py runserver``); False for Celery and other commands."""
+    prog = os.path.basename(sys.argv[0]) if sys.argv else ''
+    if prog.endswith(('manage.py', 'django-admin')):
+        # runserver's autoreloader parent only watches files; the served child has RUN_MAIN set
+        serving = os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+        return len(sys.argv) > 1 and sys.argv[1] == 'runserver' and serving
+    return prog.startswith(_WEB_SERVERS)
+
 
 class AiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai'
+
+    def ready(self):  # type: ignore[override]
+        # Opt-in: start loading the embedding model in the background so the first request does not pay for it
+        from .embedding_service import EmbeddingService, warmup_enabled
+
+        # Not in Celery (its children warm up in worker_process_init) or management commands
+        if warmup_enabled('web') and _is_web_server():
+            EmbeddingService.warm_up()
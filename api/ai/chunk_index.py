@@ -0,0 +1,603 @@
+"""Process-local vector index over ``AIChunk`` embeddings.
+
+Each worker process (web or Celery) keeps one index per embedding model
+(``AI_VECTOR_INDEX``: ``ivf`` | ``flat``) keyed by ``AIChunk.id``; a query is
+only ever scored against vectors of the model that embedded it. Each index
+carries a catalog of the per-chunk metadata retrieval needs (resource id,
+resource type, token_len), so a search touches the database only to read the
+winning chunks' text. It is
+loaded from ``AI_VECTOR_INDEX_DIR`` when a persisted copy exists, otherwise
+built from the chunk table on first use.
+
+Sync rules:
+  - Writers bump ``AICorpusState`` (ingestion, resource deletes). Each search
+    reads that single token; when it matches the token the index was built
+    from, no further queries are issued.
+  - On a token change a table stamp (row count + newest row) decides between
+    adding appended rows incrementally and a full rebuild. The stamp also
+    carries the ``'vectors'`` token, bumped when stored vectors are rewritten
+    in place (``reembed_chunks``), which always forces a rebuild.
+  - Ingestion also calls ``index_chunks`` after commit so new chunks are
+    searchable in the ingesting process without a resync.
+  - Dual-read (``choose_model``): during a model upgrade the previous model's
+    index keeps serving while the new model's index (chunk rows plus staged
+    ``AIChunkEmbedding`` vectors) is built in a background thread; queries
+    switch once it covers every embedded chunk.
+  - Chunks without a vector are skipped and counted (``unembedded_count``);
+    a sync that finds any queues ``tasks.backfill_chunk_embeddings`` instead
+    of embedding on the request path.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from threading import RLock, Thread
+from typing import Callable, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from .embedding_codec import decode_vector
+from .embedding_service import EmbeddingService
+from .models import AIChunk, AIChunkEmbedding, AICorpusState
+from .timing import add_count, add_ms
+from .vector_index import EmbeddingMatrix, IVFFlatIndex, load_index
+
+logger = logging.getLogger(__name__)
+
+_BATCH = 2000
+BACKFILL_LOCK = 'ai:emb:backfill'
+_lock = RLock()
+_slots: dict[str, dict] = {}  # per embedding model name, see _slot()
+_MAX_PARTITIONS = 128
+_unusable_dirs: set[str] = set()  # AI_VECTOR_INDEX_DIR values that could not be created (warned once)
+
+
+@dataclass(frozen=True)
+class ChunkHit:
+    chunk_id: int
+    score: float
+    resource_id: int
+    type: str
+    token_len: int
+
+
+@dataclass(frozen=True)
+class ChunkFilter:
+    """Retrieval scope applied inside the index before scoring.
+
+    - ``types``: resource types to include (``template`` / ``sample`` / ``call_snapshot``)
+    - ``org_id``: org scope — shared resources (org '') plus this org's own; ``None`` = no scoping
+    - ``source_url``: only resources ingested from this URL
+    - ``call_url``: call snapshots restricted to this URL (templates/samples unaffected)
+    """
+
+    types: tuple[str, ...] | None = None
+    org_id: str | None = None
+    source_url: str | None = None
+    call_url: str | None = None
+
+    def is_empty(self) -> bool:
+        return self.types is None and self.org_id is None and self.source_url is None and self.call_url is None
+
+
+def key64(value: str) -> int:
+    """Stable signed 64-bit key for a string column ('' -> 0)."""
+    if not value:
+        return 0
+    return int.from_bytes(hashlib.sha1(value.encode('utf-8')).digest()[:8], 'little', signed=True)
+
+
+class ChunkCatalog:
+    """Per-chunk metadata columns sorted by chunk id (lookup via ``searchsorted``).
+
+    Org and source URL are stored as 64-bit keys (``key64``) so filters compare integers.
+    """
+
+    COLUMNS = {
+        'resource_ids': np.int64,
+        'types': np.dtype('<U32'),
+        'token_lens': np.int32,
+        'org_keys': np.int64,
+        'url_keys': np.int64,
+    }
+
+    def __init__(self, ids=None, **columns) -> None:
+        self.ids = np.asarray(ids if ids is not None else [], dtype=np.int64)
+        for name, dtype in self.COLUMNS.items():
+            values = columns.get(name)
+            setattr(self, name, np.asarray(values if values is not None else [], dtype=dtype))
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    def add(self, ids, **columns) -> None:
+        new_ids = np.asarray(ids, dtype=np.int64)
+        if not new_ids.size:
+            return
+        keep = ~np.isin(self.ids, new_ids)
+        merged_ids = np.concatenate([self.ids[keep], new_ids])
+        order = np.argsort(merged_ids, kind='stable')
+        self.ids = merged_ids[order]
+        for name, dtype in self.COLUMNS.items():
+            merged = np.concatenate([getattr(self, name)[keep], np.asarray(columns[name], dtype=dtype)])
+            setattr(self, name, merged[order])
+
+    def positions(self, ids: np.ndarray) -> np.ndarray:
+        """Catalog positions of ``ids`` (all assumed present)."""
+        return np.searchsorted(self.ids, ids)
+
+    def describe(self, hits: Sequence[tuple[int, float]]) -> list[ChunkHit]:
+        out: list[ChunkHit] = []
+        for chunk_id, score in hits:
+            pos = int(np.searchsorted(self.ids, chunk_id))
+            if pos >= len(self) or self.ids[pos] != chunk_id:
+                continue
+            out.append(ChunkHit(chunk_id, score, int(self.resource_ids[pos]), str(self.types[pos]), int(self.token_lens[pos])))
+        return out
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {'cat_ids': self.ids, **{f'cat_{name}': getattr(self, name) for name in self.COLUMNS}}
+
+    @classmethod
+    def from_arrays(cls, extra: dict[str, np.ndarray]) -> ChunkCatalog:
+        return cls(extra['cat_ids'], **{name: extra[f'cat_{name}'] for name in cls.COLUMNS})
+
+
+def _catalog_rows(batch: list[tuple]) -> dict:
+    """Columns for ``ChunkCatalog.add`` from (id, resource_id, type, token_len, org_id, source_url) tuples."""
+    return {
+        'resource_ids': [b[1] for b in batch],
+        'types': [b[2] for b in batch],
+        'token_lens': [b[3] for b in batch],
+        'org_keys': [key64(b[4]) for b in batch],
+        'url_keys': [key64(b[5]) for b in batch],
+    }
+
+
+def _kind() -> str:
+    kind = str(getattr(settings, 'AI_VECTOR_INDEX', 'ivf') or 'ivf').lower()
+    return kind if kind in ('ivf', 'flat') else 'ivf'
+
+
+def _index_path(kind: str, model: str, dim: int) -> str | None:
+    base = getattr(settings, 'AI_VECTOR_INDEX_DIR', '') or ''
+    if not base or base in _unusable_dirs:
+        return None
+    try:
+        os.makedirs(base, exist_ok=True)
+    except OSError as exc:  # unwritable/missing volume: keep the index in memory only
+        _unusable_dirs.add(base)
+        logger.warning('AI_VECTOR_INDEX_DIR=%s unusable (%s); vector index not persisted', base, exc)
+        return None
+    return os.path.join(base, f'chunks-{kind}-{re.sub(r"[^A-Za-z0-9_.-]", "_", model)}-{dim}.npz')
+
+
+def _new_index(kind: str, dim: int) -> EmbeddingMatrix:
+    if kind == 'ivf':
+        return IVFFlatIndex.empty(
+            dim,
+            nprobe=int(getattr(settings, 'AI_IVF_NPROBE', 8) or 8),
+            min_train=int(getattr(settings, 'AI_IVF_MIN_TRAIN', 1024) or 1024),
+        )
+    return EmbeddingMatrix.empty(dim)
+
+
+def table_stamp() -> tuple[int, int, str]:
+    """(row count, newest id, newest created_at) — detects appends, deletes and id reuse."""
+    count = AIChunk.objects.count()
+    last = AIChunk.objects.order_by('-id').values_list('id', 'created_at').first()
+    if not last:
+        return count, 0, ''
+    return count, int(last[0]), last[1].isoformat()
+
+
+def _stamp() -> tuple[int, int, str, str]:
+    """``table_stamp()`` plus the in-place vector rewrite token."""
+    return (*table_stamp(), AICorpusState.current('vectors'))
+
+
+_META_FIELDS = ('resource_id', 'resource__type', 'token_len', 'resource__org_id', 'resource__source_url')
+
+
+def _matches(row_model: str, row_dim: int, model: str, dim: int) -> bool:
+    """Row vector belongs to ``model``'s index; untagged legacy rows count when the dimension fits."""
+    return row_dim == dim and (row_model == model or not row_model)
+
+
+def _add_rows(index: EmbeddingMatrix, catalog: ChunkCatalog, qs, model: str, timings: dict | None = None) -> tuple[int, int]:
+    """Stream ``qs`` into ``index``/``catalog`` with ``model``'s vectors. Returns (rows seen, rows without any vector).
+
+    Chunk rows stored under another model contribute their staged ``AIChunkEmbedding`` for ``model``
+    if one exists; vectors of other models are never mixed in. Nothing is embedded or written here:
+    unembedded rows are left to ``backfill_chunk_embeddings`` and legacy JSON vectors are used as read.
+    Time spent decoding stored vectors is added to ``timings['decode_ms']``.
+    """
+    seen = skipped = 0
+    decode_s = 0.0
+    batch: list[tuple] = []
+    vecs: list = []
+    legacy: list[int] = []
+    other: dict[int, list] = {}
+
+    def flush():
+        if batch:
+            index.add([b[0] for b in batch], vecs)
+            catalog.add([b[0] for b in batch], **_catalog_rows(batch))
+            batch.clear()
+            vecs.clear()
+
+    fields = ('id', 'embedding_vec', 'embedding_dim', 'embedding_dtype', 'embedding_model', *_META_FIELDS)
+    for chunk_id, blob, dim, dtype, row_model, *meta in qs.order_by('id').values_list(*fields).iterator(chunk_size=_BATCH):
+        seen += 1
+        if blob is None:
+            legacy.append(chunk_id)
+            continue
+        t0 = time.perf_counter()
+        vec = decode_vector(blob, dtype, dim) if _matches(row_model, dim, model, index.dim) else None
+        decode_s += time.perf_counter() - t0
+        if vec is None:  # another model's vector: look for a staged one
+            other[chunk_id] = meta
+            continue
+        batch.append((chunk_id, *meta))
+        vecs.append(vec)
+        if len(batch) >= _BATCH:
+            flush()
+    for start in range(0, len(legacy), _BATCH):
+        rows = AIChunk.objects.filter(id__in=legacy[start : start + _BATCH]).values_list('id', 'embedding', *_META_FIELDS)
+        for chunk_id, emb, *meta in rows:
+            if not emb:
+                skipped += 1
+            elif len(emb) == index.dim:
+                batch.append((chunk_id, *meta))
+                vecs.append(emb)
+    pending = list(other)
+    for start in range(0, len(pending), _BATCH):
+        staged = AIChunkEmbedding.objects.filter(chunk_id__in=pending[start : start + _BATCH], model=model, dim=index.dim)
+        for chunk_id, blob, dtype in staged.values_list('chunk_id', 'vec', 'dtype'):
+            t0 = time.perf_counter()
+            vec = decode_vector(blob, dtype, index.dim)
+            decode_s += time.perf_counter() - t0
+            if vec is not None:
+                batch.append((chunk_id, *other[chunk_id]))
+                vecs.append(vec)
+    flush()
+    add_ms(timings, 'decode_ms', decode_s)
+    return seen, skipped
+
+
+def _schedule_backfill() -> None:
+    """Queue ``backfill_chunk_embeddings`` once (cache-guarded) when a worker is available."""
+    if not (getattr(settings, 'AI_ASYNC', False) and getattr(settings, 'CELERY_BROKER_URL', '')):
+        return  # no worker: `manage.py reembed_chunks` embeds the backlog
+    from django.core.cache import cache
+
+    from .tasks import backfill_chunk_embeddings  # local import: tasks imports retrieval
+
+    if not cache.add(BACKFILL_LOCK, 1, timeout=600):
+        return
+    try:
+        backfill_chunk_embeddings.delay()  # type: ignore[attr-defined]
+    except Exception:  # broker down: retry on a later sync
+        cache.delete(BACKFILL_LOCK)
+
+
+def _persist(slot: dict, model: str) -> None:
+    index: EmbeddingMatrix = slot['index']
+    path = _index_path(index.kind, model, index.dim)
+    if not path:
+        return
+    stamp = slot['stamp']
+    try:
+        index.save(
+            path,
+            stamp=np.array([slot['token'] or '', str(stamp[0]), str(stamp[1]), stamp[2], stamp[3]]),
+            unembedded=np.array([slot['unembedded']]),
+            **slot['catalog'].arrays(),
+        )
+    except OSError:  # pragma: no cover - read-only volume; index stays in memory
+        pass
+
+
+def _load_persisted(kind: str, model: str, dim: int):
+    path = _index_path(kind, model, dim)
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        index, extra = load_index(path)
+        catalog = ChunkCatalog.from_arrays(extra)
+        raw = [str(x) for x in extra['stamp']]
+        unembedded = int(extra['unembedded'][0])
+    except Exception:  # corrupt/partial/old-format file: rebuild from DB
+        return None
+    if index.kind != kind or index.dim != dim or len(raw) != 5:
+        return None
+    return index, catalog, raw[0], (int(raw[1]), int(raw[2]), raw[3], raw[4]), unembedded
+
+
+def _slot(model: str) -> dict:
+    """Index state for one embedding model (each model's vectors live in their own index)."""
+    with _lock:
+        slot = _slots.get(model)
+        if slot is None:
+            slot = _slots[model] = {
+                'lock': RLock(),
+                'index': None,
+                'catalog': None,
+                'token': None,
+                'stamp': None,
+                'partitions': None,
+                'unembedded': 0,
+                'building': False,
+                'serving': False,
+            }
+        return slot
+
+
+def _default_model() -> str:
+    return EmbeddingService.instance().model_name
+
+
+def _sync(slot: dict, kind: str, model: str, dim: int, timings: dict | None = None) -> tuple[EmbeddingMatrix, ChunkCatalog]:
+    """Bring ``slot`` up to date with the chunk table (caller holds ``slot['lock']``)."""
+    token = AICorpusState.current()
+    index: EmbeddingMatrix | None = slot['index']
+    if index is not None and index.kind == kind and index.dim == dim and token == slot['token']:
+        return index, slot['catalog']
+    if index is None or index.kind != kind or index.dim != dim:
+        loaded = _load_persisted(kind, model, dim)
+        index, catalog, old_token, stamp, unembedded = loaded if loaded else (None, None, None, None, 0)
+    else:
+        catalog, old_token, stamp, unembedded = slot['catalog'], slot['token'], slot['stamp'], slot['unembedded']
+    if index is not None and old_token == token:
+        slot.update(index=index, catalog=catalog, token=token, stamp=stamp, unembedded=unembedded)
+        return index, catalog
+    current = _stamp()
+    incremental = index is not None and stamp == current
+    if index is not None and not incremental and stamp is not None and current[1] >= stamp[1] and current[3] == stamp[3]:
+        # Appends only: the previous newest row is untouched and every new row is above it.
+        tail_ok = not stamp[1] or AIChunk.objects.filter(id=stamp[1], created_at=datetime.fromisoformat(stamp[2])).exists()
+        if tail_ok:
+            added, skipped = _add_rows(index, catalog, AIChunk.objects.filter(id__gt=stamp[1]), model, timings)
+            incremental = stamp[0] + added == current[0]
+            unembedded += skipped
+    if not incremental:
+        index, catalog = _new_index(kind, dim), ChunkCatalog()
+        unembedded = _add_rows(index, catalog, AIChunk.objects.all(), model, timings)[1]
+    if isinstance(index, IVFFlatIndex) and index.needs_training():
+        index.train()
+    slot.update(index=index, catalog=catalog, token=token, stamp=current, unembedded=unembedded)
+    _persist(slot, model)
+    if unembedded:
+        _schedule_backfill()
+    return index, catalog
+
+
+def _timed_sync(slot: dict, model: str, dim: int, timings: dict | None) -> tuple[EmbeddingMatrix, ChunkCatalog]:
+    """``_sync`` with its cost split into ``fetch_ms`` (token check, DB reads, index upkeep) and ``decode_ms``."""
+    if timings is None:
+        return _sync(slot, _kind(), model, dim)
+    decoded = timings.setdefault('decode_ms', 0.0)
+    t0 = time.perf_counter()
+    synced = _sync(slot, _kind(), model, dim, timings)
+    add_ms(timings, 'fetch_ms', time.perf_counter() - t0 - (timings['decode_ms'] - decoded) / 1000)
+    return synced
+
+
+def _filter_mask(catalog: ChunkCatalog, at: np.ndarray, flt: ChunkFilter) -> np.ndarray:
+    """Boolean mask over catalog positions ``at`` for rows matching ``flt``."""
+    mask = np.ones(at.shape[0], dtype=bool)
+    if flt.types is not None:
+        mask &= np.isin(catalog.types[at], list(flt.types))
+    if flt.org_id is not None:
+        orgs = catalog.org_keys[at]
+        mask &= (orgs == 0) | (orgs == key64(flt.org_id))
+    if flt.source_url is not None:
+        mask &= catalog.url_keys[at] == key64(flt.source_url)
+    if flt.call_url is not None:
+        mask &= (catalog.types[at] != 'call_snapshot') | (catalog.url_keys[at] == key64(flt.call_url))
+    return mask
+
+
+def _partition(slot: dict, index: EmbeddingMatrix, catalog: ChunkCatalog, flt: ChunkFilter) -> np.ndarray:
+    """Row positions of ``index`` matching ``flt``; cached per filter until the index changes."""
+    cache = slot['partitions']
+    version = (id(index), id(catalog), index.version, len(catalog))
+    if cache is None or cache['version'] != version:
+        cache = slot['partitions'] = {'version': version, 'row_cat': catalog.positions(index.ids), 'rows': {}}
+    rows = cache['rows'].get(flt)
+    if rows is not None:
+        return rows
+    mask = _filter_mask(catalog, cache['row_cat'], flt)
+    rows = np.flatnonzero(mask)
+    if len(cache['rows']) >= _MAX_PARTITIONS:
+        cache['rows'].pop(next(iter(cache['rows'])))
+    cache['rows'][flt] = rows
+    return rows
+
+
+def search(
+    query: Sequence[float],
+    k: int,
+    *,
+    filters: ChunkFilter | None = None,
+    model: str | None = None,
+    timings: dict | None = None,
+) -> list[ChunkHit]:
+    """Top-k hits for the query vector (best first, ties by chunk id), synced with the DB first.
+
+    ``model`` names the embedding model that produced ``query`` (default: the active model); only
+    chunk vectors of that model are searched. ``filters`` restrict scoring to the matching partition.
+    ``timings`` receives ``fetch_ms`` / ``decode_ms`` / ``score_ms`` and ``candidates_scored``.
+    """
+    model = model or _default_model()
+    slot = _slot(model)
+    with slot['lock']:
+        index, catalog = _timed_sync(slot, model, len(query), timings)
+        t0 = time.perf_counter()
+        if filters is None or filters.is_empty():
+            top = index.top_k(query, k)
+        else:
+            top = index.top_k(query, k, rows=_partition(slot, index, catalog, filters))
+        add_ms(timings, 'score_ms', time.perf_counter() - t0)
+        add_count(timings, 'candidates_scored', index.last_scored)
+        return catalog.describe(top)
+
+
+def score_candidates(
+    query: Sequence[float],
+    ids: Sequence[int],
+    *,
+    filters: ChunkFilter | None = None,
+    model: str | None = None,
+    timings: dict | None = None,
+) -> list[ChunkHit]:
+    """Exact cosine hits for a short candidate list (e.g. lexical matches); unknown or filtered-out ids are skipped."""
+    model = model or _default_model()
+    slot = _slot(model)
+    with slot['lock']:
+        index, catalog = _timed_sync(slot, model, len(query), timings)
+        t0 = time.perf_counter()
+        if filters is not None and not filters.is_empty():
+            want = np.asarray(ids, dtype=np.int64)
+            at = np.minimum(catalog.positions(want), max(len(catalog) - 1, 0))
+            known = catalog.ids[at] == want if len(catalog) else np.zeros(want.shape[0], dtype=bool)
+            keep = known.copy()
+            keep[known] = _filter_mask(catalog, at[known], filters)
+            ids = want[keep].tolist()
+        scored = index.score_ids(query, ids)
+        add_ms(timings, 'score_ms', time.perf_counter() - t0)
+        add_count(timings, 'candidates_scored', index.last_scored)
+        return catalog.describe(scored)
+
+
+def vectors_for(ids: Sequence[int], *, model: str | None = None) -> tuple[list[int], np.ndarray]:
+    """Unit vectors of indexed chunks (for reranking a candidate list); ids not indexed are skipped."""
+    slot = _slot(model or _default_model())
+    with slot['lock']:
+        index: EmbeddingMatrix | None = slot['index']
+        if index is None:
+            return [], np.empty((0, 0), dtype=np.float32)
+        found, rows = index.rows_for(ids)
+        return found.tolist(), index.vectors[rows]
+
+
+def _spawn(target: Callable[[], None]) -> None:
+    Thread(target=target, name='chunk-index-build', daemon=True).start()
+
+
+def _build_in_background(model: str, dim: int) -> None:
+    slot = _slot(model)
+    with slot['lock']:
+        if slot['building']:
+            return
+        slot['building'] = True
+
+    def run():
+        try:
+            with slot['lock']:
+                _sync(slot, _kind(), model, dim)
+        except Exception:  # pragma: no cover - retried by the next dual-read check
+            pass
+        finally:
+            slot['building'] = False
+            connection.close()  # thread-local connection of this builder thread
+
+    _spawn(run)
+
+
+def choose_model(target: str, dim: int, previous: str) -> str:
+    """Dual-read: the model whose index should serve queries during a model upgrade.
+
+    ``target`` once its index is current and covers every embedded chunk (chunk rows of ``target`` plus
+    staged ``AIChunkEmbedding`` rows); until then ``previous``, while the target index is built in a
+    background thread. The previous model's index is dropped after the switch, and from then on the
+    target index catches up in the foreground like any other (e.g. after ``reembed_chunks --promote``).
+    """
+    if not previous or previous == target:
+        return target
+    slot = _slot(target)
+    if slot['serving']:
+        return target
+    if slot['building'] or not slot['lock'].acquire(blocking=False):
+        return previous
+    try:
+        index: EmbeddingMatrix | None = slot['index']
+        current = index is not None and index.dim == dim and slot['token'] == AICorpusState.current()
+        complete = current and len(slot['catalog']) + slot['unembedded'] >= slot['stamp'][0]
+    finally:
+        slot['lock'].release()
+    if not current:
+        _build_in_background(target, dim)
+        return previous
+    if not complete:
+        return previous
+    with _lock:
+        slot['serving'] = True
+        _slots.pop(previous, None)
+    return target
+
+
+def index_chunks(
+    ids: Sequence[int],
+    vectors: Sequence[Sequence[float]],
+    *,
+    resource_id: int,
+    type_: str,
+    token_lens: Sequence[int],
+    org_id: str = '',
+    source_url: str = '',
+    model: str | None = None,
+) -> None:
+    """Add freshly committed chunks of one resource to ``model``'s loaded index (no-op if not loaded yet)."""
+    model = model or _default_model()
+    slot = _slot(model)
+    with slot['lock']:
+        index: EmbeddingMatrix | None = slot['index']
+        if index is None or not ids:
+            return
+        rows = [(i, v, t) for i, v, t in zip(ids, vectors, token_lens) if v is not None and len(v) == index.dim]
+        if rows:
+            index.add([r[0] for r in rows], [r[1] for r in rows])
+            batch = [(r[0], resource_id, type_, r[2], org_id, source_url) for r in rows]
+            slot['catalog'].add([r[0] for r in rows], **_catalog_rows(batch))
+        if isinstance(index, IVFFlatIndex) and index.needs_training():
+            index.train()
+        # Adopt the new token only if nothing else changed concurrently; otherwise the next search resyncs.
+        stamp = _stamp()
+        if slot['stamp'] and stamp[0] == slot['stamp'][0] + len(ids) and stamp[3] == slot['stamp'][3]:
+            slot.update(token=AICorpusState.current(), stamp=stamp)
+        _persist(slot, model)
+
+
+def unembedded_count(model: str | None = None) -> int:
+    """Chunks ``model``'s loaded index skipped for lacking a vector (0 once the backfill has caught up)."""
+    slot = _slots.get(model or _default_model())
+    return int(slot['unembedded']) if slot else 0
+
+
+def reset_index() -> None:
+    """Drop the in-memory indexes (next search reloads from disk or DB)."""
+    with _lock:
+        _slots.clear()
+
+
+__all__ = [
+    'ChunkFilter',
+    'ChunkHit',
+    'choose_model',
+    'index_chunks',
+    'reset_index',
+    'score_candidates',
+    'search',
+    'table_stamp',
+    'unembedded_count',
+    'vectors_for',
+]
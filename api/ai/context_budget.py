@@ -6,7 +6,7 @@ Policy (initial):
 1. Inputs provided already ordered by priority (retrieval: score desc, memory: caller order, files: caller order).
 2. Reserve fixed output token allowance (caller supplies `reserved_output_tokens`).
 3. Hard model max tokens optionally provided; if omitted only per-section caps enforced.
-4. Approx token estimation: whitespace word count (same heuristic used elsewhere).
+4. Token estimation: stored `token_len`, else `ai.tokenization.count_tokens` (same tokenizer as ingestion).
 5. Deterministic: no randomness; stable slicing given identical inputs.
 
 Future extensions: dynamic reservation percentages, semantic tag buckets, refined token estimator.
@@ -17,11 +17,13 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Sequence
 
+from .tokenization import count_tokens
+
 
 def _approx_tokens(text: str | None) -> int:
     if not text:
         return 0
-    return max(1, len(text.split()))
+    return max(1, count_tokens(text))
 
 
 @dataclass
@@ -0,0 +1,128 @@
+"""Binary embedding storage helpers.
+
+``AIChunk.embedding_vec`` stores a vector as raw little-endian float32 (or
+float16) bytes; ``embedding_dim`` / ``embedding_dtype`` carry the metadata
+needed to decode it. A 384-dim MiniLM vector is 1.5 KB as float32 (768 B as
+float16) versus ~4–8 KB of JSON text, and decoding is a zero-copy
+``numpy.frombuffer`` view instead of a JSON parse.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+DTYPES = {'float32': np.dtype('<f4'), 'float16': np.dtype('<f2')}
+DEFAULT_DTYPE = 'float32'
+
+
+def storage_dtype() -> str:
+    from django.conf import settings
+
+    name = str(getattr(settings, 'AI_EMBEDDING_DTYPE', DEFAULT_DTYPE) or DEFAULT_DTYPE).lower()
+    return name if name in DTYPES else DEFAULT_DTYPE
+
+
+def encode_vector(vec: Sequence[float] | np.ndarray, dtype: str = DEFAULT_DTYPE) -> bytes:
+    return np.asarray(vec, dtype=DTYPES[dtype]).tobytes()
+
+
+def encode_vectors(vectors: Sequence[Sequence[float]] | np.ndarray, dtype: str = DEFAULT_DTYPE) -> list[bytes]:
+    """``encode_vector`` for a batch of equal-length vectors (one array conversion for all rows)."""
+    if not len(vectors):
+        return []
+    mat = np.asarray(vectors, dtype=DTYPES[dtype])
+    return [row.tobytes() for row in mat]
+
+
+def decode_vector(blob: bytes | memoryview | None, dtype: str = DEFAULT_DTYPE, dim: int | None = None) -> np.ndarray | None:
+    """Read-only view over ``blob`` (no copy); ``None`` when empty or malformed."""
+    if not blob:
+        return None
+    dt = DTYPES.get(dtype or DEFAULT_DTYPE)
+    if dt is None or len(blob) % dt.itemsize:
+        return None
+    vec = np.frombuffer(blob, dtype=dt)
+    if dim and vec.shape[0] != dim:
+        return None
+    return vec
+
+
+def vector_fields(vec: Sequence[float] | np.ndarray, dtype: str | None = None, *, model: str = '') -> dict:
+    """Model field values for storing ``vec`` (produced by embedding model ``model``) on an ``AIChunk``."""
+    dtype = dtype or storage_dtype()
+    return {
+        'embedding_vec': encode_vector(vec, dtype),
+        'embedding_dim': len(vec),
+        'embedding_dtype': dtype,
+        'embedding_model': model,
+    }
+
+
+STORED_FIELDS = ['embedding_vec', 'embedding_dim', 'embedding_dtype', 'embedding_model', 'embedding']
+
+
+def store_vectors(chunk_model, ids: Sequence[int], vectors, *, model: str, dtype: str | None = None) -> int:
+    """Write freshly computed vectors for chunk ``ids`` with one ``bulk_update`` (clears legacy JSON)."""
+    rows = [
+        chunk_model(id=chunk_id, embedding=None, **vector_fields(vec, dtype, model=model)) for chunk_id, vec in zip(ids, vectors)
+    ]
+    chunk_model.objects.bulk_update(rows, STORED_FIELDS)
+    return len(rows)
+
+
+def stage_vectors(staged_model, ids: Sequence[int], vectors, *, model: str, dtype: str | None = None) -> int:
+    """Write (replace) staged ``AIChunkEmbedding`` rows of ``model`` for chunk ``ids`` (dual-read upgrades)."""
+    dtype = dtype or storage_dtype()
+    staged_model.objects.filter(chunk_id__in=list(ids), model=model).delete()
+    staged_model.objects.bulk_create(
+        [
+            staged_model(chunk_id=i, model=model, dim=len(vec), dtype=dtype, vec=encode_vector(vec, dtype))
+            for i, vec in zip(ids, vectors)
+        ]
+    )
+    return len(ids)
+
+
+def pack_legacy_embeddings(chunk_model, *, batch: int = 500, dtype: str = DEFAULT_DTYPE, clear_json: bool = True) -> int:
+    """Convert JSON ``embedding`` lists into ``embedding_vec`` bytes; returns rows converted.
+
+    Works with the live model and with historical migration models. Resumable:
+    only rows that still lack a binary vector are touched.
+    """
+    converted = 0
+    last_id = 0
+    while True:
+        rows = list(
+            chunk_model.objects.filter(id__gt=last_id, embedding_vec__isnull=True, embedding__isnull=False)
+            .order_by('id')
+            .only('id', 'embedding')[:batch]
+        )
+        if not rows:
+            break
+        for row in rows:
+            last_id = row.id
+            if not row.embedding:
+                continue
+            row.embedding_vec = encode_vector(row.embedding, dtype)
+            row.embedding_dim = len(row.embedding)
+            row.embedding_dtype = dtype
+            if clear_json:
+                row.embedding = None
+            converted += 1
+        fields = ['embedding_vec', 'embedding_dim', 'embedding_dtype'] + (['embedding'] if clear_json else [])
+        chunk_model.objects.bulk_update([r for r in rows if r.embedding_vec], fields)
+    return converted
+
+
+__all__ = [
+    'decode_vector',
+    'encode_vector',
+    'encode_vectors',
+    'pack_legacy_embeddings',
+    'stage_vectors',
+    'storage_dtype',
+    'store_vectors',
+    'vector_fields',
+]
@@ -2,43 +2,344 @@
 
 DEV baseline: deterministic hash pseudo-vectors so the rest of the pipeline can
 be wired before pulling heavier embedding dependencies. Optional MiniLM switch
-behind EMBEDDING_BACKEND env ("hash" | "minilm"). Fallback to hash on errors.
+behind EMBEDDING_BACKEND env ("hash" | "minilm" | "onnx"). Fallback to hash on errors.
+
+Repeated texts (retried / duplicated / revise-loop queries) are served from an
+LRU + TTL memo keyed by ``(backend, model_name, sha256(text))``, optionally
+mirrored to a Django cache alias for cross-process reuse. For MiniLM,
+concurrent ``embed`` calls arriving within a few milliseconds are coalesced
+into one ``encode`` call.
 """
 
 from __future__ import annotations
 
 import hashlib
 import os
-from threading import Lock
-from typing import Any, Iterable, Literal, cast
+import time
+from collections import OrderedDict
+from threading import Condition, Event, Lock, Thread
+from typing import Any, Callable, Iterable, Literal, Sequence, cast
+
+import numpy as np
 
 _HASH_DIM = 32  # placeholder dimension (MiniLM-L6-v2 is 384)
+HASH_MODEL = 'placeholder-hash-v1'
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:  # settings not configured (standalone use)
+        return default
+
+
+class EmbeddingMemo:
+    """Thread-safe LRU + TTL map from memo key to vector, with an optional Django cache tier.
+
+    Vectors are held as float64 bytes so values round-trip exactly.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2048,
+        ttl_seconds: float = 3600.0,
+        *,
+        cache_alias: str = '',
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max(0, int(max_size))
+        self.ttl = float(ttl_seconds)
+        self.cache_alias = cache_alias
+        self._clock = clock
+        self._lock = Lock()
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(backend: str, model_name: str, text: str) -> str:
+        return f'{backend}:{model_name}:{hashlib.sha256(text.encode("utf-8")).hexdigest()}'
+
+    def _cache(self):
+        if not self.cache_alias:
+            return None
+        try:
+            from django.core.cache import caches
+
+            return caches[self.cache_alias]
+        except Exception:
+            return None
+
+    def get_many(self, keys: Sequence[str]) -> dict[str, list[float]]:
+        found: dict[str, bytes] = {}
+        now = self._clock()
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                if self.ttl > 0 and now - entry[0] > self.ttl:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = entry[1]
+        rest = [k for k in keys if k not in found]
+        cache = self._cache()
+        if rest and cache is not None:
+            try:
+                remote = cache.get_many(['ai:emb:' + k for k in rest])
+            except Exception:  # cache backend down: memo is best effort
+                remote = {}
+            shared = {k: remote['ai:emb:' + k] for k in rest if isinstance(remote.get('ai:emb:' + k), bytes)}
+            self._store_local(shared)
+            found.update(shared)
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return {k: np.frombuffer(v, dtype=np.float64).tolist() for k, v in found.items()}
+
+    def set_many(self, items: dict[str, Sequence[float]]) -> None:
+        packed = {k: np.asarray(v, dtype=np.float64).tobytes() for k, v in items.items()}
+        self._store_local(packed)
+        cache = self._cache()
+        if packed and cache is not None:
+            try:
+                cache.set_many({'ai:emb:' + k: v for k, v in packed.items()}, timeout=int(self.ttl) or None)
+            except Exception:
+                pass
+
+    def _store_local(self, packed: dict[str, bytes]) -> None:
+        if not self.max_size:
+            return
+        now = self._clock()
+        with self._lock:
+            for key, blob in packed.items():
+                self._data[key] = (now, blob)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+    def after_fork(self) -> None:
+        """Fresh lock in a forked child (the parent may have held it while forking); entries are kept."""
+        self._lock = Lock()
+
+
+class _BatchRequest:
+    __slots__ = ('texts', 'done', 'result', 'error')
+
+    def __init__(self, texts: list[str]) -> None:
+        self.texts = texts
+        self.done = Event()
+        self.result: list[list[float]] = []
+        self.error: BaseException | None = None
+
+
+class MicroBatcher:
+    """Coalesce concurrent ``submit`` calls arriving within ``window_ms`` into one ``encode`` call.
+
+    The first caller of a window becomes the leader: it waits for the window
+    (or until ``max_batch`` texts are pending), encodes everything queued and
+    hands each caller its slice. Followers just wait for their result.
+    """
+
+    def __init__(self, encode: Callable[[list[str]], Sequence[Sequence[float]]], window_ms: float = 5.0, max_batch: int = 64):
+        self._encode = encode
+        self._window = max(0.0, float(window_ms)) / 1000.0
+        self._max_batch = max(1, int(max_batch))
+        self._cond = Condition()
+        self._encode_lock = Lock()
+        self._pending: list[_BatchRequest] = []
+        self._leader = False
+        self.calls = 0
+
+    def submit(self, texts: list[str]) -> list[list[float]]:
+        req = _BatchRequest(texts)
+        with self._cond:
+            self._pending.append(req)
+            lead = not self._leader
+            self._leader = True
+            self._cond.notify_all()
+        if lead:
+            deadline = time.monotonic() + self._window
+            with self._cond:
+                while sum(len(r.texts) for r in self._pending) < self._max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+                self._leader = False
+            self._run(batch)
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+    def after_fork(self) -> None:
+        """Fresh locks and an empty queue in a forked child: the parent's leader and waiting threads do not exist there."""
+        self._cond = Condition()
+        self._encode_lock = Lock()
+        self._pending = []
+        self._leader = False
+
+    def _run(self, batch: list[_BatchRequest]) -> None:
+        flat = [t for r in batch for t in r.texts]
+        try:
+            with self._encode_lock:
+                self.calls += 1
+                vectors = [[float(x) for x in row] for row in self._encode(flat)]
+        except BaseException as exc:  # surfaced to every waiting caller
+            for r in batch:
+                r.error = exc
+                r.done.set()
+            return
+        pos = 0
+        for r in batch:
+            r.result = vectors[pos : pos + len(r.texts)]
+            pos += len(r.texts)
+            r.done.set()
+
+
+Backend = Literal['hash', 'minilm', 'onnx']
+BACKENDS: tuple[str, ...] = ('hash', 'minilm', 'onnx')
+
+
+def _onnx_quantized() -> bool:
+    return bool(_setting('AI_ONNX_QUANTIZED', False))
+
+
+def model_identity(backend: str) -> tuple[str, int]:
+    """(model_name, dim) produced by ``backend``; int8 vectors differ, so they get their own name."""
+    if backend == 'hash':
+        return HASH_MODEL, _HASH_DIM
+    if backend == 'onnx':
+        return ('MiniLM-L6-v2-onnx-int8' if _onnx_quantized() else 'MiniLM-L6-v2-onnx'), 384
+    return 'MiniLM-L6-v2', 384
+
+
+def _load_model(backend: str) -> Any:  # pragma: no cover - optional heavy dependencies
+    if backend == 'onnx':
+        from .onnx_embedder import OnnxEmbedder
+
+        return OnnxEmbedder(
+            str(_setting('AI_ONNX_MODEL_DIR', '') or ''),
+            quantized=_onnx_quantized(),
+            threads=int(_setting('AI_ONNX_THREADS', 0) or 0),
+        )
+    from sentence_transformers import SentenceTransformer  # type: ignore
+
+    return SentenceTransformer('all-MiniLM-L6-v2')
 
 
 class EmbeddingService:
+    """Process-wide embedding backend.
+
+    With ``EMBEDDING_BACKEND=minilm`` (sentence-transformers) or ``onnx``
+    (onnxruntime, see ``onnx_embedder``) the model is loaded synchronously on first
+    use, or in a background thread when created through ``warm_up()``. Until the
+    model is ready (or after a failed load, until the retry interval passes and a
+    reload succeeds) the hash backend serves requests; ``health()`` reports the
+    load state.
+    """
+
     _instance: EmbeddingService | None = None
+    _others: dict[str, EmbeddingService] = {}
     _lock = Lock()
+    model_loader: Callable[[str], Any] = staticmethod(_load_model)
 
-    def __init__(self) -> None:
-        env_backend = os.getenv('EMBEDDING_BACKEND', 'hash').lower()
-        if env_backend not in ('hash', 'minilm'):
+    def __init__(self, backend: str | None = None, *, background: bool = False, batch_window_ms: float | None = None) -> None:
+        env_backend = (backend or os.getenv('EMBEDDING_BACKEND', 'hash')).lower()
+        if env_backend not in BACKENDS:
             env_backend = 'hash'
-        self.backend = cast(Literal['hash', 'minilm'], env_backend)
-
-        self.model_name = 'placeholder-hash-v1' if self.backend == 'hash' else 'MiniLM-L6-v2'
-        self.dim = _HASH_DIM if self.backend == 'hash' else 384
+        self.requested_backend = cast(Backend, env_backend)
         self._model: Any | None = None
+        self._batcher: MicroBatcher | None = None
+        # 0 = no micro-batching; None = AI_EMBEDDING_BATCH_WINDOW_MS
+        self._batch_window_ms = float(_setting('AI_EMBEDDING_BATCH_WINDOW_MS', 5) if batch_window_ms is None else batch_window_ms)
+        self._state_lock = Lock()
+        self._loader_thread: Thread | None = None
+        self._pid = os.getpid()  # process that owns the load (and its loader thread)
+        self.load_state = 'ready' if env_backend == 'hash' else 'idle'  # idle | loading | ready | failed
+        self.load_error = ''
+        self._failed_at = 0.0
+        self._use_hash()
+        self.memo = EmbeddingMemo(
+            int(_setting('AI_EMBEDDING_MEMO_SIZE', 2048)),
+            float(_setting('AI_EMBEDDING_MEMO_TTL', 3600)),
+            cache_alias=str(_setting('AI_EMBEDDING_CACHE_ALIAS', '') or ''),
+        )
+        if self.requested_backend != 'hash':
+            self._start_load(background=background)
+
+    def _use_hash(self) -> None:
+        self.backend = cast(Backend, 'hash')
+        self.model_name, self.dim = model_identity('hash')
+
+    def _start_load(self, *, background: bool) -> None:
+        with self._state_lock:
+            if self.load_state in ('loading', 'ready'):
+                return
+            self.load_state = 'loading'
+            self._pid = os.getpid()
+        if background:
+            self._loader_thread = Thread(target=self._load, name='embedding-warmup', daemon=True)
+            self._loader_thread.start()
+        else:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            model = type(self).model_loader(self.requested_backend)
+        except Exception as exc:  # keep serving hash vectors; retried after AI_EMBEDDING_LOAD_RETRY_SECONDS
+            with self._state_lock:
+                self.load_state = 'failed'
+                self.load_error = str(exc)[:200]
+                self._failed_at = time.monotonic()
+            return
+        window = self._batch_window_ms
+        batcher = (
+            MicroBatcher(
+                lambda batch: model.encode(batch, normalize_embeddings=True),
+                window,
+                int(_setting('AI_EMBEDDING_BATCH_MAX', 64)),
+            )
+            if window > 0
+            else None
+        )
+        with self._state_lock:
+            self._model, self._batcher = model, batcher
+            self.backend = self.requested_backend
+            self.model_name, self.dim = model_identity(self.requested_backend)
+            self.load_state = 'ready'
+            self.load_error = ''
 
-        if self.backend == 'minilm':  # lazy heavy import; pragma: no cover (optional path)
-            try:  # pragma: no cover
-                from sentence_transformers import SentenceTransformer  # type: ignore
+    def _maybe_retry_load(self) -> None:
+        if self.load_state != 'failed':
+            return
+        retry = float(_setting('AI_EMBEDDING_LOAD_RETRY_SECONDS', 300))
+        if time.monotonic() - self._failed_at >= retry:
+            with self._state_lock:
+                if self.load_state != 'failed':
+                    return
+                self.load_state = 'idle'
+            self._start_load(background=True)
 
-                self._model = SentenceTransformer('all-MiniLM-L6-v2')
-            except Exception:  # fallback silently to hash if failure
-                self.backend = cast(Literal['hash', 'minilm'], 'hash')
-                self.model_name = 'placeholder-hash-v1'
-                self.dim = _HASH_DIM
-                self._model = None
+    def wait_until_ready(self, timeout: float | None = None) -> bool:
+        thread = self._loader_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.load_state == 'ready'
 
     # -- lifecycle -----------------------------------------------------
     @classmethod
@@ -49,38 +350,168 @@ class EmbeddingService:
                     cls._instance = cls()
         return cls._instance
 
+    @classmethod
+    def existing(cls) -> EmbeddingService | None:
+        """The process instance if one was created already (does not load anything)."""
+        return cls._instance
+
+    @classmethod
+    def for_backend(cls, backend: str) -> EmbeddingService:
+        """Process instance for ``backend`` (the default instance when it matches; dual-read serves two)."""
+        default = cls.instance()
+        if backend == default.requested_backend:
+            return default
+        with cls._lock:
+            other = cls._others.get(backend)
+            if other is None:
+                other = cls._others[backend] = cls(backend)
+        return other
+
+    @classmethod
+    def after_fork(cls) -> None:
+        """Forget instances inherited from the parent process unless their model was already loaded there.
+
+        A loader thread does not survive fork(): an inherited instance stuck in ``loading`` (or ``idle`` /
+        ``failed``) is dropped so the next ``instance()`` / ``warm_up()`` loads in this process. Ready
+        instances are kept (the loaded model is shared copy-on-write) with fresh locks, including their
+        memo's and micro-batcher's, which a parent thread may have held at fork time.
+        """
+        cls._lock = Lock()
+        pid = os.getpid()
+        kept: dict[str, EmbeddingService] = {}
+        for key, svc in [('', cls._instance), *cls._others.items()]:
+            if svc is None or (svc._pid != pid and svc.load_state != 'ready'):
+                continue
+            svc._state_lock = Lock()
+            svc.memo.after_fork()
+            if svc._batcher is not None:
+                svc._batcher.after_fork()
+            svc._pid = pid
+            kept[key] = svc
+        cls._instance = kept.pop('', None)
+        cls._others = kept
+
+    @classmethod
+    def warm_up(cls) -> EmbeddingService:
+        """Create the process instance now, loading the model in a background thread."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls(background=True)
+        return cls._instance
+
     # -- public api ----------------------------------------------------
     def embed(self, texts: Iterable[str]) -> list[list[float]]:
+        return self.embed_with_model(texts)[0]
+
+    def embed_with_model(self, texts: Iterable[str], *, memo: bool = True) -> tuple[list[list[float]], str]:
+        """``embed`` plus the name of the model that produced the vectors (stored per chunk).
+
+        If the model fails mid-call, every vector of the call is a hash vector and the hash model name is
+        returned, so a batch is never mixed. ``memo=False`` bypasses the memo (bulk re-embedding).
+        """
         items = list(texts)
+        self._maybe_retry_load()
+        with self._state_lock:  # one consistent backend for the whole call, even if warm-up finishes mid-way
+            backend, model_name, model, batcher = self.backend, self.model_name, self._model, self._batcher
         if not items:
-            return []
+            return [], model_name
+        if not memo:
+            vectors, ok = self._compute(items, backend, model, batcher)
+            return vectors, model_name if ok else HASH_MODEL
 
-        if self.backend == 'minilm' and self._model is not None:  # pragma: no cover
-            try:  # pragma: no cover
-                emb = self._model.encode(items, normalize_embeddings=True)
-                return [[float(x) for x in row] for row in emb]
-            except Exception:  # fallback to hash
-                pass
+        keys = [EmbeddingMemo.key(backend, model_name, t) for t in items]
+        known = self.memo.get_many(list(dict.fromkeys(keys)))
+        todo = {k: t for k, t in zip(keys, items) if k not in known}
+        if todo:
+            fresh, cacheable = self._compute(list(todo.values()), backend, model, batcher)
+            if not cacheable:
+                return self._hash_vectors(items), HASH_MODEL
+            computed = dict(zip(todo, fresh))
+            self.memo.set_many(computed)
+            known.update(computed)
+        return [list(known[k]) for k in keys], model_name
+
+    def _compute(
+        self, items: list[str], backend: str, model: Any, batcher: MicroBatcher | None
+    ) -> tuple[list[list[float]], bool]:
+        if backend != 'hash' and model is not None:
+            try:
+                if batcher is not None:
+                    return batcher.submit(items), True
+                emb = model.encode(items, normalize_embeddings=True)
+                return [[float(x) for x in row] for row in emb], True
+            except Exception:  # fallback to hash (not memoized under the model's key)
+                return self._hash_vectors(items), False
+        # Hash vectors are always HASH_MODEL's (_HASH_DIM), never sized like the requested model
+        return self._hash_vectors(items), backend == 'hash'
 
-        # hash backend (deterministic pseudo-vector)
-        out: list[list[float]] = []
-        for text in items:
-            h = hashlib.sha256(text.encode('utf-8')).digest()
-            nums = list(h[: self.dim])
-            vec = [n / 255.0 for n in nums]
-            if len(vec) < self.dim:  # defensive (should not happen with sha256 slice)
-                vec.extend([0.0] * (self.dim - len(vec)))
-            out.append(vec)
-        return out
+    @staticmethod
+    def _hash_vectors(items: list[str]) -> list[list[float]]:
+        # hash backend (deterministic pseudo-vector, always HASH_MODEL's _HASH_DIM)
+        return [[n / 255.0 for n in hashlib.sha256(text.encode('utf-8')).digest()[:_HASH_DIM]] for text in items]
 
     def health(self) -> dict[str, Any]:
         return {
             'backend': self.backend,
             'model': self.model_name,
             'dim': self.dim,
-            'ready': self.backend == 'hash' or (self._model is not None),
+            'ready': self.load_state == 'ready',
+            'requested_backend': self.requested_backend,
+            'state': self.load_state,
+            'error': self.load_error,
+            'memo': self.memo.stats(),
         }
 
 
+if hasattr(os, 'register_at_fork'):  # covers Celery prefork children and preloaded gunicorn workers
+    os.register_at_fork(after_in_child=EmbeddingService.after_fork)
+
+
+def warmup_enabled(role: str) -> bool:
+    """Whether ``AI_EMBEDDING_WARMUP`` (``web`` | ``worker`` | ``all``) covers this process role."""
+    mode = str(_setting('AI_EMBEDDING_WARMUP', '') or '').lower()
+    return mode in (role, 'all')
+
+
+def previous_service() -> EmbeddingService | None:
+    """Dual-read: the service for ``AI_EMBEDDING_PREVIOUS_BACKEND`` (None when unset or same as active).
+
+    During a model upgrade chunk rows keep the previous model's vectors (still served) and the
+    active model's vectors are staged alongside until its index covers the corpus.
+    """
+    backend = str(_setting('AI_EMBEDDING_PREVIOUS_BACKEND', '') or '').lower()
+    if backend not in BACKENDS or backend == EmbeddingService.instance().requested_backend:
+        return None
+    return EmbeddingService.for_backend(backend)
+
+
 def embed_texts(texts: Iterable[str]) -> list[list[float]]:
     return EmbeddingService.instance().embed(texts)
+
+
+def embed_texts_with_model(texts: Iterable[str]) -> tuple[list[list[float]], str]:
+    return EmbeddingService.instance().embed_with_model(texts)
+
+
+# -- bulk re-embedding workers (``reembed_chunks``) ---------------------
+# Kept here rather than in the command module: spawned pool workers unpickle these by module path,
+# and this module imports no Django models.
+_bulk_service: EmbeddingService | None = None
+
+
+def init_bulk_embedder(backend: str, setup_django: bool = False) -> None:
+    """Create this process's bulk embedder (no memo reuse, no micro-batching window)."""
+    global _bulk_service
+    if setup_django:  # pool workers start as fresh interpreters
+        import django
+
+        django.setup()
+    _bulk_service = EmbeddingService(backend, batch_window_ms=0)
+
+
+def bulk_embed(texts: list[str]) -> tuple[list[list[float]], str]:
+    """Embed one batch with the bulk embedder; returns (vectors, model name that produced them)."""
+    if _bulk_service is None:
+        raise RuntimeError('init_bulk_embedder() was not called in this process')
+    return _bulk_service.embed_with_model(texts, memo=False)
@@ -12,15 +12,35 @@ content.
 from __future__ import annotations
 
 import re
+import time
+import codecs
 import hashlib
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Sequence
 import requests
 import yaml
 from html.parser import HTMLParser
 from django.db import transaction
+from django.utils import timezone
 
-from .models import AIResource, AIChunk
-from .embedding_service import embed_texts
+from .models import AICorpusState, AIResource, AIResourceBand, AIChunk, AIChunkEmbedding
+from .embedding_service import EmbeddingService, bulk_embed, init_bulk_embedder, previous_service
+from .embedding_codec import encode_vectors, stage_vectors, storage_dtype
 from .retrieval import _cosine  # reuse cosine similarity
+from .chunk_index import index_chunks
+from .lexical_index import index_texts
+from .timing import add_count, add_ms, timed
+from .near_dup import lead_probe_keys, signature_fields
+from .tokenization import chunk_text, count_tokens, tokenizer_name
+
+_BULK_BATCH = 500  # AIChunk rows per INSERT
+_MAX_TEXT_CHARS = 200_000  # extracted text kept per HTML document
+_FETCH_CHUNK = 16 * 1024
+_MAX_DUP_CANDIDATES = 200  # newest LSH / lead-key candidates confirmed per ingestion
+_MAX_VERSIONS = 20  # previous-version summaries kept in AIResource.metadata['versions']
 
 
 class _SafeTextExtractor(HTMLParser):
@@ -39,6 +59,7 @@ class _SafeTextExtractor(HTMLParser):
         super().__init__(convert_charrefs=True)
         self._out: list[str] = []
         self._suppress_depth = 0
+        self.size = 0  # characters of kept text so far
 
     def handle_starttag(self, tag, attrs):  # noqa: D401 - inherited
         t = tag.lower()
@@ -66,6 +87,7 @@ class _SafeTextExtractor(HTMLParser):
         # Minimal noise trimming; keep internal spaces to avoid word joins
         if data.strip():
             self._out.append(data)
+            self.size += len(data)
 
     def get_text(self) -> str:
         # Join and normalize whitespace
@@ -75,47 +97,201 @@ class _SafeTextExtractor(HTMLParser):
         return raw.strip()
 
 
-def _clean_html(html: str) -> str:  # noqa: D401
+def _extract_text(pieces: Iterable[str], *, max_chars: int = _MAX_TEXT_CHARS) -> str:
+    """Feed decoded HTML ``pieces`` to the extractor as they arrive; stop once enough text is kept.
+
+    Each feed ends just before a ``<``: HTMLParser flushes trailing text at the end of a feed, so cutting
+    inside a text run would split it into two data events (joined with a space) and change the output.
+    """
     parser = _SafeTextExtractor()
-    try:
-        parser.feed(html)
-        parser.close()
-    except Exception:
+    seen: list[str] = []  # raw input, only needed for the regex fallback
+    pending = ''
+    failed = False
+    # Only the parser is guarded: errors raised by ``pieces`` (transport failures mid-body) propagate,
+    # so a truncated download is never stored as a snapshot.
+    for piece in pieces:
+        seen.append(piece)
+        if failed:
+            continue
+        pending += piece
+        cut = pending.rfind('<')
+        if cut > 0:
+            try:
+                parser.feed(pending[:cut])
+            except Exception:
+                failed = True
+                continue
+            pending = pending[cut:]
+        if parser.size >= 2 * max_chars:  # whitespace normalization cannot shrink this below the cap
+            pending = ''
+            break
+    if not failed:
+        try:
+            parser.feed(pending)
+            parser.close()
+        except Exception:
+            failed = True
+    if failed:
         # Fallback to simple tag strip if parser fails (rare malformed input)
-        text = re.sub(r'<[^>]+>', ' ', html)
+        text = re.sub(r'<[^>]+>', ' ', ''.join(seen))
         text = re.sub(r'\s+', ' ', text)
-        return text.strip()[:200000]
-    return parser.get_text()[:200000]
+        return text.strip()[:max_chars]
+    return parser.get_text()[:max_chars]
 
 
-def _chunk_text(text: str, *, max_chars: int = 800) -> list[str]:
-    parts: list[str] = []
-    buf: list[str] = []
-    current = 0
-    for para in re.split(r'\n+|(?<=\.)\s{2,}', text):
-        p = para.strip()
-        if not p:
-            continue
-        if current + len(p) > max_chars and buf:
-            parts.append(' '.join(buf))
-            buf = []
-            current = 0
-        buf.append(p)
-        current += len(p) + 1
-    if buf:
-        parts.append(' '.join(buf))
-    return parts[:200]  # safety cap
+def _clean_html(html: str) -> str:  # noqa: D401
+    return _extract_text([html])
+
+
+def _chunk_text(text: str) -> list[str]:
+    # Token-budgeted, sentence-aware chunks (AI_CHUNK_MAX_TOKENS / AI_CHUNK_OVERLAP_TOKENS; ai/tokenization.py)
+    return chunk_text(text)
 
 
 def _token_len(s: str) -> int:
-    # Approximate token length (placeholder): words * 1
-    return max(1, len(s.split()))
+    return max(1, count_tokens(s))
 
 
 def _dedup_key(text: str) -> str:
     return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
 
 
+@dataclass
+class PreparedText:
+    """Chunks of one document and their vectors (``model`` = embedding model that produced them)."""
+
+    chunks: list[str]
+    vectors: list[list[float]]
+    model: str
+
+
+def prepare_text(text: str) -> PreparedText:
+    """Chunk + embed ``text`` with this process's bulk embedder (manifest ingestion pool workers)."""
+    chunks = _chunk_text(text) or [text[:800]]
+    vectors, model = bulk_embed(chunks)
+    return PreparedText(chunks, vectors, model)
+
+
+def _chunk_rows(resource: AIResource, chunks: list[str], vectors, model: str, ords: Sequence[int] | None = None) -> list[AIChunk]:
+    """Unsaved ``AIChunk`` rows for ``chunks`` (``ords`` default 0..n-1); vectors are encoded in one batch."""
+    dtype = storage_dtype()
+    dim = len(vectors[0]) if len(vectors) else 0
+    suffix = str(dim)  # embedding_key = sha256(text + dim), as before
+    blobs = encode_vectors(vectors, dtype)
+    tokenizer = tokenizer_name()
+    return [
+        AIChunk(
+            resource=resource,
+            ord=ords[idx] if ords is not None else idx,
+            text=text,
+            token_len=_token_len(text),
+            tokenizer=tokenizer,
+            embedding_key=_dedup_key(text + suffix),
+            metadata={},
+            embedding_vec=blob,
+            embedding_dim=dim,
+            embedding_dtype=dtype,
+            embedding_model=model,
+        )
+        for idx, (text, blob) in enumerate(zip(chunks, blobs))
+    ]
+
+
+def _find_near_duplicate(
+    first_chunk: str,
+    bands: list[int],
+    *,
+    type_: str,
+    org_id: str,
+    service: EmbeddingService,
+    threshold: float,
+    first: tuple[Sequence[float], str] | None = None,
+) -> AIResource | None:
+    """Existing resource (same type/org) whose first chunk near-duplicates ``first_chunk``, if any.
+
+    Candidates come from the LSH bucket index and the lead-key index (whole corpus, newest first);
+    each is confirmed by the prefix heuristic (delta < 32 chars) or first-chunk cosine >= ``threshold``.
+    The first chunk is only embedded when a candidate needs the cosine check (``first`` = precomputed
+    (vector, model)).
+    """
+    scope = {'resource__type': type_, 'resource__org_id': org_id}
+    by_band = AIResourceBand.objects.filter(key__in=bands, **scope).values_list('resource_id', flat=True)
+    by_lead = AIResource.objects.filter(type=type_, org_id=org_id, lead_key__in=lead_probe_keys(first_chunk))
+    candidate_ids = sorted(
+        set(by_band.order_by('-resource_id').distinct()[:_MAX_DUP_CANDIDATES])
+        | set(by_lead.order_by('-id').values_list('id', flat=True)[:_MAX_DUP_CANDIDATES]),
+        reverse=True,
+    )[:_MAX_DUP_CANDIDATES]
+    if not candidate_ids:
+        return None
+    fields = ('resource_id', 'text', 'embedding_vec', 'embedding_dim', 'embedding_dtype', 'embedding_model', 'embedding')
+    firsts = {c.resource_id: c for c in AIChunk.objects.filter(resource_id__in=candidate_ids, ord=0).only(*fields)}  # type: ignore[attr-defined]
+    first_vec, first_model = first if first is not None else (None, '')
+    for cand_id in candidate_ids:  # newest first (recency bias, as before)
+        ch0 = firsts.get(cand_id)
+        if ch0 is None:
+            continue
+        # Fast textual near-duplicate heuristic (prefix delta <32 chars)
+        s1, s2 = (ch0.text or '').strip(), first_chunk.strip()
+        shorter, longer = (s1, s2) if len(s1) <= len(s2) else (s2, s1)
+        if shorter and longer.startswith(shorter) and (len(longer) - len(shorter) < 32):
+            return AIResource.objects.get(id=cand_id)
+        ch0_vec = ch0.vector
+        if ch0_vec is None:
+            continue
+        if first_vec is None:
+            vecs, first_model = service.embed_with_model([first_chunk])
+            first_vec = vecs[0]
+        if ch0.embedding_model not in (first_model, ''):  # only compare one model's vectors
+            continue
+        if _cosine(first_vec, ch0_vec) >= threshold:
+            return AIResource.objects.get(id=cand_id)
+    return None
+
+
+def _embed_for_storage(
+    chunks: list[str], primary: EmbeddingService, active: EmbeddingService, prepared: PreparedText | None = None
+) -> tuple[list[list[float]], str, list[list[float]], str]:
+    """(chunk-row vectors, their model, staged vectors, staged model); staged only during a dual-read upgrade."""
+    if prepared is not None:
+        embeddings, model_name = prepared.vectors, prepared.model
+    else:
+        embeddings, model_name = primary.embed_with_model(chunks)
+    staged: list[list[float]] = []
+    staged_model = ''
+    if primary is not active:
+        staged, staged_model = active.embed_with_model(chunks)
+        if staged_model == model_name:  # active model not loaded yet: nothing to stage
+            staged = []
+    return embeddings, model_name, staged, staged_model
+
+
+def _index_on_commit(
+    resource: AIResource,
+    chunk_ids: list[int],
+    chunks: list[str],
+    token_lens: list[int],
+    vectors: tuple[tuple[list[list[float]], str], ...],
+) -> None:
+    """Add committed chunks to this process's vector indexes (one per (vectors, model)) and the lexical index."""
+    for embeddings, model_name in vectors:
+        if not embeddings:
+            continue
+        transaction.on_commit(
+            lambda embeddings=embeddings, model_name=model_name: index_chunks(
+                chunk_ids,
+                embeddings,
+                resource_id=resource.id,
+                type_=resource.type,
+                token_lens=token_lens,
+                org_id=resource.org_id,
+                source_url=resource.source_url,
+                model=model_name,
+            )
+        )
+    transaction.on_commit(lambda: index_texts(chunk_ids, chunks))
+
+
 @transaction.atomic
 def create_resource_with_chunks(
     *,
@@ -124,110 +300,425 @@ def create_resource_with_chunks(
     source_url: str,
     full_text: str,
     similarity_threshold: float = 0.97,
+    org_id: str = '',
+    stats: dict | None = None,
+    prepared: PreparedText | None = None,
 ) -> AIResource:
+    """Create a resource and its embedded chunks, or return an existing (near-)duplicate resource.
+
+    Chunks are built in memory and written with ``bulk_create``. ``stats`` (optional) receives
+    ``chunks``, ``embed_ms``, ``insert_ms``, ``ingest_ms``, ``chunks_per_sec`` and ``outcome``
+    (``created`` / ``duplicate_exact`` / ``duplicate_similar``). ``prepared`` carries chunks and vectors
+    computed elsewhere (``prepare_text`` in a worker process); they are used when the served model matches.
+    """
+    started = time.perf_counter()
+    if stats is not None:
+        stats.setdefault('chunks', 0)
     sha256 = AIResource.compute_sha256(full_text)
-    existing = AIResource.objects.filter(sha256=sha256, type=type_).first()
+    existing = AIResource.objects.filter(sha256=sha256, type=type_, org_id=org_id).first()
     if existing:
+        if stats is not None:
+            stats['outcome'] = 'duplicate_exact'
         return existing
-
-    # Similarity-based dedupe (phase 1 heuristic): compare first chunk embedding to existing
-    # resources of same type. If cosine >= threshold → reuse existing resource.
-    # Lightweight: only embed first prospective chunk before full processing.
-    prospective_chunks = _chunk_text(full_text)
+    # Chunk rows store the served model's vectors: the previous model during a dual-read upgrade
+    active = EmbeddingService.instance()
+    primary = previous_service() or active
+    if prepared is not None and (not prepared.chunks or prepared.model != primary.model_name):
+        prepared = None  # e.g. worker fell back to hash vectors: embed here instead
+    prospective_chunks = prepared.chunks if prepared is not None else _chunk_text(full_text)
     if not prospective_chunks:
         prospective_chunks = [full_text[:800]]
     first_chunk = prospective_chunks[0]
-    first_vec = embed_texts([first_chunk])[0]
     # Adjust threshold for deterministic hash backend (coarse). Hash vectors can
     # yield lower cosine for small textual variants; widen window slightly.
-    from .embedding_service import EmbeddingService  # local import to avoid cycle in apps
-
-    if EmbeddingService.instance().backend == 'hash' and similarity_threshold >= 0.95:
+    if primary.backend == 'hash' and similarity_threshold >= 0.95:
         adj_threshold = 0.90
     else:
         adj_threshold = similarity_threshold
+    signature, bands = signature_fields(first_chunk)
     if adj_threshold < 1.0:  # allow disabling by passing 1.0
-        # Iterate limited candidate set (same type, last 200 for recency bias)
-        candidate_qs = AIResource.objects.filter(type=type_).order_by('-id')[:200]
-        candidate_ids = list(candidate_qs.values_list('id', flat=True))
-        if candidate_ids:
-            chunk_map: dict[int, AIChunk] = {}
-            for c in AIChunk.objects.filter(resource_id__in=candidate_ids, ord=0):  # type: ignore[attr-defined]
-                if c.embedding:  # ensure embedding present
-                    chunk_map[c.resource_id] = c  # type: ignore[attr-defined]
-            for cand_id in candidate_ids:
-                ch0 = chunk_map.get(cand_id)
-                if not ch0:
-                    continue
-                # Fast textual near-duplicate heuristic (prefix delta <32 chars)
-                t_existing = ch0.text or ''
-                s1, s2 = t_existing.strip(), first_chunk.strip()
-                shorter, longer = (s1, s2) if len(s1) <= len(s2) else (s2, s1)
-                if shorter and longer.startswith(shorter) and (len(longer) - len(shorter) < 32):
-                    existing_sim = next((r for r in candidate_qs if getattr(r, 'id', None) == cand_id), None)
-                    if existing_sim:
-                        return existing_sim
-                if not ch0.embedding:  # defensive
-                    continue
-                sim = _cosine(first_vec, ch0.embedding)
-                if sim >= adj_threshold:
-                    existing_sim = next((r for r in candidate_qs if getattr(r, 'id', None) == cand_id), None)
-                    if existing_sim:
-                        return existing_sim
+        duplicate = _find_near_duplicate(
+            first_chunk,
+            bands,
+            type_=type_,
+            org_id=org_id,
+            service=primary,
+            threshold=adj_threshold,
+            first=(prepared.vectors[0], prepared.model) if prepared is not None else None,
+        )
+        if duplicate is not None:
+            if stats is not None:
+                stats['outcome'] = 'duplicate_similar'
+            return duplicate
+    chunks = prospective_chunks  # reuse already chunked result
+    with timed(stats, 'embed_ms'):
+        embeddings, model_name, staged, staged_model = _embed_for_storage(chunks, primary, active, prepared)
+    insert_started = time.perf_counter()
     resource = AIResource.objects.create(
         type=type_,
         title=title[:256],
         source_url=source_url,
+        org_id=org_id,
         sha256=sha256,
-        metadata={'dedup': True},
+        **signature,
+        metadata={'chunks': len(chunks)},  # ingestion stats, known before the chunks are written
     )
-    chunks = prospective_chunks  # reuse already chunked result
-    embeddings = embed_texts(chunks)
-    created = 0
-    for idx, (chunk_text, vec) in enumerate(zip(chunks, embeddings)):
-        AIChunk.objects.create(
-            resource=resource,
-            ord=idx,
-            text=chunk_text,
-            token_len=_token_len(chunk_text),
-            embedding_key=_dedup_key(chunk_text + str(len(vec))),
-            embedding=vec,
-            metadata={},
-        )
-        created += 1
-    # Attach simple ingestion stats
+    AIResourceBand.objects.bulk_create([AIResourceBand(resource=resource, key=key) for key in bands])
+    rows = AIChunk.objects.bulk_create(_chunk_rows(resource, chunks, embeddings, model_name), batch_size=_BULK_BATCH)
+    chunk_ids: list[int] = [row.id for row in rows]  # type: ignore[attr-defined]
+    if None in chunk_ids:  # backend without RETURNING on bulk insert
+        chunk_ids = list(AIChunk.objects.filter(resource=resource).order_by('ord').values_list('id', flat=True))
+    token_lens = [row.token_len for row in rows]
+    created = len(chunk_ids)
+    if staged:
+        stage_vectors(AIChunkEmbedding, chunk_ids, staged, model=staged_model)
+    add_ms(stats, 'insert_ms', time.perf_counter() - insert_started)
     if created:
-        AIResource.objects.filter(pk=resource.pk).update(metadata={'chunks': created})
+        # Invalidate every process's cached index; this process catches up directly once committed
+        AICorpusState.bump()
+        _index_on_commit(resource, chunk_ids, chunks, token_lens, ((embeddings, model_name), (staged, staged_model)))
+    if stats is not None:
+        elapsed = time.perf_counter() - started
+        stats['outcome'] = 'created'
+        stats['chunks'] += created
+        add_ms(stats, 'ingest_ms', elapsed)
+        stats['chunks_per_sec'] = round(created / elapsed, 1) if elapsed > 0 else 0.0
     return resource
 
 
-def ingest_grant_call(url: str) -> AIResource:
-    resp = requests.get(url, timeout=15)
-    resp.raise_for_status()
-    cleaned = _clean_html(resp.text)
-    return create_resource_with_chunks(
-        type_='call_snapshot',
-        title='Grant Call',
-        source_url=url,
-        full_text=cleaned,
-    )
+def refresh_resource(resource: AIResource, full_text: str, *, stats: dict | None = None) -> AIResource:
+    """Re-ingest changed ``full_text`` into ``resource`` in place, embedding only chunks whose text changed.
+
+    New chunks are matched on ``embedding_key`` (sha256 of text + dimension) with the resource's rows that
+    hold a vector of the served model: matched rows keep their id, vector and staged vectors and only get
+    their new ``ord``; the other chunks are embedded in one call and inserted; leftover rows are deleted.
+    sha256, near-duplicate signature and LSH bands are replaced and ``version`` is incremented
+    (``metadata['versions']`` keeps the last ``_MAX_VERSIONS`` summaries). Unchanged text is a no-op.
+    ``stats`` (optional) receives ``outcome`` ('unchanged' | 'refreshed'), ``chunks``, ``reused``,
+    ``embedded``, ``deleted``, ``embed_ms`` and ``ingest_ms``.
+    """
+    started = time.perf_counter()
+    sha256 = AIResource.compute_sha256(full_text)
+    if sha256 == resource.sha256:
+        if stats is not None:
+            stats.update(outcome='unchanged', reused=0, embedded=0, deleted=0)
+        return resource
+    active = EmbeddingService.instance()
+    primary = previous_service() or active
+    chunks = _chunk_text(full_text) or [full_text[:800]]
+    suffix = str(primary.dim)
+    keys = [_dedup_key(text + suffix) for text in chunks]
+    with transaction.atomic():
+        resource = AIResource.objects.select_for_update().get(id=resource.id)
+        current = list(AIChunk.objects.filter(resource=resource).order_by('ord').values_list('id', 'ord'))
+        reusable: dict[str, list[int]] = {}
+        for cid, key in (
+            AIChunk.objects.filter(
+                resource=resource, embedding_model=primary.model_name, embedding_dim=primary.dim, embedding_vec__isnull=False
+            )
+            .order_by('ord')
+            .values_list('id', 'embedding_key')
+        ):
+            reusable.setdefault(key, []).append(cid)
+        kept: dict[int, int] = {}  # chunk id -> new ord
+        fresh: list[int] = []  # ords of chunks to embed
+        for pos, key in enumerate(keys):
+            ids = reusable.get(key)
+            if ids:
+                kept[ids.pop(0)] = pos
+            else:
+                fresh.append(pos)
+        removed = [cid for cid, _ in current if cid not in kept]
+        if removed:
+            AIChunk.objects.filter(id__in=removed).delete()
+        moved = [AIChunk(id=cid, ord=pos) for cid, pos in kept.items() if dict(current).get(cid) != pos]
+        if moved:
+            # Two passes so swapped positions never collide with the (resource, ord) unique constraint
+            AIChunk.objects.bulk_update([AIChunk(id=row.id, ord=-1 - row.ord) for row in moved], ['ord'])
+            AIChunk.objects.bulk_update(moved, ['ord'])
+        new_texts = [chunks[pos] for pos in fresh]
+        chunk_ids: list[int] = []
+        token_lens: list[int] = []
+        embeddings: list[list[float]] = []
+        staged: list[list[float]] = []
+        model_name = staged_model = ''
+        if new_texts:
+            with timed(stats, 'embed_ms'):
+                embeddings, model_name, staged, staged_model = _embed_for_storage(new_texts, primary, active)
+            rows = AIChunk.objects.bulk_create(
+                _chunk_rows(resource, new_texts, embeddings, model_name, ords=fresh), batch_size=_BULK_BATCH
+            )
+            chunk_ids = [row.id for row in rows]  # type: ignore[attr-defined]
+            if None in chunk_ids:  # backend without RETURNING on bulk insert
+                by_ord = dict(AIChunk.objects.filter(resource=resource, ord__in=fresh).values_list('ord', 'id'))
+                chunk_ids = [by_ord[pos] for pos in fresh]
+            token_lens = [row.token_len for row in rows]
+            if staged:
+                stage_vectors(AIChunkEmbedding, chunk_ids, staged, model=staged_model)
+        signature, bands = signature_fields(chunks[0])
+        AIResourceBand.objects.filter(resource=resource).delete()
+        AIResourceBand.objects.bulk_create([AIResourceBand(resource=resource, key=key) for key in bands])
+        history = list((resource.metadata or {}).get('versions') or [])
+        history.append(
+            {
+                'version': resource.version,
+                'sha256': resource.sha256,
+                'chunks': len(current),
+                'replaced_at': timezone.now().isoformat(),
+            }
+        )
+        resource.sha256 = sha256
+        resource.minhash = signature['minhash']
+        resource.lead_key = signature['lead_key']
+        resource.version += 1
+        resource.metadata = {
+            **(resource.metadata or {}),
+            'chunks': len(chunks),
+            'versions': history[-_MAX_VERSIONS:],
+        }
+        resource.save(update_fields=['sha256', 'minhash', 'lead_key', 'version', 'metadata'])
+        AICorpusState.bump()
+        if chunk_ids:
+            _index_on_commit(resource, chunk_ids, new_texts, token_lens, ((embeddings, model_name), (staged, staged_model)))
+    if stats is not None:
+        stats.update(outcome='refreshed', chunks=len(chunks), reused=len(kept), embedded=len(fresh), deleted=len(removed))
+        add_ms(stats, 'ingest_ms', time.perf_counter() - started)
+    return resource
+
+
+def _validators_key(url: str, org_id: str) -> str:
+    return 'ai_fetch:' + hashlib.sha256(f'{org_id}|{url}'.encode()).hexdigest()
+
+
+def _stream_text(resp: requests.Response, max_bytes: int, stats: dict | None = None) -> Iterator[str]:
+    """Decoded body pieces of a streamed response, stopping after ``max_bytes`` bytes."""
+    # Charset from the header when given, else UTF-8 (no whole-body charset sniffing while streaming)
+    charset = resp.encoding if 'charset' in resp.headers.get('content-type', '').lower() else None
+    try:
+        decoder = codecs.getincrementaldecoder(charset or 'utf-8')(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    read = 0
+    for raw in resp.iter_content(chunk_size=_FETCH_CHUNK):
+        raw = raw[: max_bytes - read]
+        read += len(raw)
+        add_count(stats, 'bytes', len(raw))
+        yield decoder.decode(raw)
+        if read >= max_bytes:
+            if stats is not None:
+                stats['truncated'] = True
+            return
+    yield decoder.decode(b'', final=True)
+
+
+def ingest_grant_call(url: str, *, org_id: str = '', stats: dict | None = None) -> AIResource:
+    """Snapshot a grant call page; an unchanged page (HTTP 304) returns the stored snapshot without re-parsing.
+
+    The body is streamed into the HTML extractor and reading stops at ``AI_FETCH_MAX_BYTES``. ETag /
+    Last-Modified of the last successful fetch are kept in the Django cache per (org, url) and sent as
+    ``If-None-Match`` / ``If-Modified-Since``. ``stats`` (optional) receives ``fetch`` ('not_modified' or
+    'fetched'), ``bytes`` and ``fetch_ms``.
+    """
+    from django.conf import settings
+    from django.core.cache import cache
+
+    key = _validators_key(url, org_id)
+    known = cache.get(key) or {}
+    if known and not AIResource.objects.filter(id=known.get('resource_id')).exists():
+        known = {}  # snapshot deleted since: fetch the page again
+    headers = {}
+    if known.get('etag'):
+        headers['If-None-Match'] = known['etag']
+    if known.get('last_modified'):
+        headers['If-Modified-Since'] = known['last_modified']
+    max_bytes = int(getattr(settings, 'AI_FETCH_MAX_BYTES', 5 * 1024 * 1024))
+    if stats is not None:
+        stats['bytes'] = 0
+    with timed(stats, 'fetch_ms'), requests.get(url, timeout=15, stream=True, headers=headers) as resp:
+        not_modified = resp.status_code == 304 and bool(headers)
+        if not not_modified:
+            resp.raise_for_status()
+            cleaned = _extract_text(_stream_text(resp, max_bytes, stats))
+            etag, last_modified = resp.headers.get('ETag', ''), resp.headers.get('Last-Modified', '')
+    if stats is not None:
+        stats['fetch'] = 'not_modified' if not_modified else 'fetched'
+    if not_modified:
+        return AIResource.objects.get(id=known['resource_id'])
+    previous = AIResource.objects.filter(type='call_snapshot', source_url=url, org_id=org_id).order_by('-id').first()
+    if previous is not None:  # changed call page: new version of the same snapshot, unchanged chunks keep their vectors
+        res = refresh_resource(previous, cleaned, stats=stats)
+    else:
+        res = create_resource_with_chunks(
+            type_='call_snapshot',
+            title='Grant Call',
+            source_url=url,
+            full_text=cleaned,
+            org_id=org_id,
+            stats=stats,
+        )
+    if etag or last_modified:
+        ttl = int(getattr(settings, 'AI_FETCH_VALIDATOR_TTL', 7 * 24 * 3600))
+        cache.set(key, {'etag': etag, 'last_modified': last_modified, 'resource_id': res.id}, timeout=ttl)
+    else:
+        cache.delete(key)
+    return res
+
+
+@dataclass
+class ManifestReport:
+    """Outcome of a manifest run; each entry carries the item's position in ``items``."""
+
+    items: int = 0
+    created: list[dict] = field(default_factory=list)  # {'index', 'resource_id', 'chunks'}
+    duplicate_exact: list[dict] = field(default_factory=list)  # {'index', 'resource_id'}
+    duplicate_similar: list[dict] = field(default_factory=list)  # {'index', 'resource_id'}
+    failed: list[dict] = field(default_factory=list)  # {'index', 'title', 'reason'}
+    chunks: int = 0
+    timings: dict = field(default_factory=dict)  # parse_ms, prepare_ms, write_ms, total_ms
+
+    def resource_ids(self) -> list[int]:
+        """Created and matched resource ids in manifest order, without repeats."""
+        rows = sorted(self.created + self.duplicate_exact + self.duplicate_similar, key=lambda r: r['index'])
+        return list(dict.fromkeys(r['resource_id'] for r in rows))
+
+    def as_dict(self) -> dict:
+        total_s = self.timings.get('total_ms', 0.0) / 1000
+        return {
+            'items': self.items,
+            'counts': {
+                'created': len(self.created),
+                'duplicate_exact': len(self.duplicate_exact),
+                'duplicate_similar': len(self.duplicate_similar),
+                'failed': len(self.failed),
+            },
+            'created': self.created,
+            'duplicate_exact': self.duplicate_exact,
+            'duplicate_similar': self.duplicate_similar,
+            'failed': self.failed,
+            'chunks': self.chunks,
+            'chunks_per_sec': round(self.chunks / total_s, 1) if total_s > 0 else 0.0,
+            'timings': self.timings,
+        }
+
+
+def _prepared_texts(texts: list[str], workers: int) -> Iterator[PreparedText | None]:
+    """Chunk + embed ``texts`` in a spawn process pool, yielded in input order (``None`` = prepare in-process)."""
+    if workers <= 0:
+        yield from (None for _ in texts)
+        return
+    backend = (previous_service() or EmbeddingService.instance()).requested_backend
+    ctx = multiprocessing.get_context('spawn')  # no forked DB connections or loader threads
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=init_bulk_embedder, initargs=(backend, True)) as pool:
+        inflight: deque[Future] = deque()
+        pending = iter(texts)
+        for text in pending:
+            inflight.append(pool.submit(prepare_text, text))
+            if len(inflight) >= workers * 4:  # bounded read-ahead
+                break
+        while inflight:
+            future = inflight.popleft()
+            try:
+                yield future.result()
+            except Exception:  # worker crashed on this item: the writer chunks/embeds it itself
+                yield None
+            nxt = next(pending, None)
+            if nxt is not None:
+                inflight.append(pool.submit(prepare_text, nxt))
 
 
-def ingest_manifest(yaml_text: str) -> list[AIResource]:
-    data = yaml.safe_load(yaml_text) or {}
-    items = data.get('items', [])
-    created: list[AIResource] = []
-    for it in items:
+def ingest_manifest_report(yaml_text: str, *, workers: int = 0, batch: int = 50) -> ManifestReport:
+    """Ingest manifest ``items`` and report per-item outcomes.
+
+    With ``workers`` > 0 items are chunked and embedded in a process pool while the main process writes
+    them in transactions of ``batch`` items. Each item runs in its own savepoint: a failing item is
+    reported with its reason and does not roll back the rest of the batch. Items whose sha256 already
+    exists are reported as exact duplicates without being embedded.
+    """
+    started = time.perf_counter()
+    report = ManifestReport()
+    timings = report.timings
+    with timed(timings, 'parse_ms'):
         try:
-            type_ = it.get('type')
-            title = it.get('title', type_)
-            text = it.get('text')
-            url = it.get('source_url', '')
-            if not type_ or not text:
-                continue
-            res = create_resource_with_chunks(type_=type_, title=title, source_url=url, full_text=text)
-            if res not in created:  # avoid duplicates in return list
-                created.append(res)
-        except Exception:
+            data = yaml.safe_load(yaml_text) or {}
+        except yaml.YAMLError as exc:
+            data = None
+            report.failed.append({'index': -1, 'title': '', 'reason': f'invalid manifest: {exc}'[:200]})
+        items = (data.get('items') or []) if isinstance(data, dict) else []
+    report.items = len(items)
+    valid: list[tuple[int, dict]] = []
+    for idx, it in enumerate(items):
+        if not isinstance(it, dict) or not it.get('type') or not it.get('text'):
+            title = str(it.get('title', '')) if isinstance(it, dict) else ''
+            report.failed.append({'index': idx, 'title': title[:256], 'reason': 'missing type or text'})
             continue
-    return created
+        valid.append((idx, it))
+    # Exact duplicates of stored resources: one query, never embedded
+    shas = {idx: AIResource.compute_sha256(str(it['text'])) for idx, it in valid}
+    known = {
+        (sha, type_): rid
+        for sha, type_, rid in AIResource.objects.filter(sha256__in=set(shas.values()), org_id='').values_list(
+            'sha256', 'type', 'id'
+        )
+    }
+    todo = []
+    for idx, it in valid:
+        rid = known.get((shas[idx], it['type']))
+        if rid is not None:
+            report.duplicate_exact.append({'index': idx, 'resource_id': rid})
+        else:
+            todo.append((idx, it))
+    prepared = _prepared_texts([str(it['text']) for _, it in todo], workers)
+    batch = max(1, batch)
+    for start in range(0, len(todo), batch):
+        group = todo[start : start + batch]
+        t0 = time.perf_counter()
+        ready = [next(prepared) for _ in group]
+        add_ms(timings, 'prepare_ms', time.perf_counter() - t0)
+        with timed(timings, 'write_ms'), transaction.atomic():
+            for (idx, it), item_prepared in zip(group, ready):
+                item_stats: dict = {}
+                try:
+                    with transaction.atomic():  # savepoint: a failing item leaves nothing behind
+                        res = create_resource_with_chunks(
+                            type_=it['type'],
+                            title=str(it.get('title') or it['type']),
+                            source_url=it.get('source_url', '') or '',
+                            full_text=str(it['text']),
+                            stats=item_stats,
+                            prepared=item_prepared,
+                        )
+                except Exception as exc:  # noqa: BLE001 - isolated per item
+                    report.failed.append(
+                        {'index': idx, 'title': str(it.get('title', ''))[:256], 'reason': f'{type(exc).__name__}: {exc}'[:200]}
+                    )
+                    continue
+                outcome = item_stats.get('outcome', 'created')
+                if outcome == 'created':
+                    report.created.append({'index': idx, 'resource_id': res.id, 'chunks': item_stats.get('chunks', 0)})
+                    report.chunks += item_stats.get('chunks', 0)
+                else:
+                    getattr(report, outcome).append({'index': idx, 'resource_id': res.id})
+    add_ms(timings, 'total_ms', time.perf_counter() - started)
+    return report
+
+
+def ingest_manifest(yaml_text: str, *, stats: dict | None = None, workers: int = 0) -> list[AIResource]:
+    """Ingest manifest ``items``; returns created or matched resources (failed items are skipped).
+
+    ``stats`` (optional) receives totals and ``chunks_per_sec`` for the whole run; use
+    ``ingest_manifest_report`` for per-item outcomes.
+    """
+    report = ingest_manifest_report(yaml_text, workers=workers)
+    ids = report.resource_ids()
+    by_id = AIResource.objects.in_bulk(ids)
+    if stats is not None:
+        summary = report.as_dict()
+        stats.update(
+            items=report.items,
+            resources=len(ids),
+            chunks=report.chunks,
+            failed=len(report.failed),
+            ingest_ms=report.timings.get('total_ms', 0.0),
+            chunks_per_sec=summary['chunks_per_sec'],
+        )
+    return [by_id[i] for i in ids if i in by_id]
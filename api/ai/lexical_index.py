@@ -0,0 +1,165 @@
+"""Process-local BM25 inverted index over ``AIChunk.text``.
+
+Grant calls carry exact terms (programme codes such as ``HORIZON-CL5-2024-D3-01``,
+eligibility phrases) that embedding similarity blurs. This index gives
+``retrieve_top_k(mode='hybrid')`` a cheap lexical candidate list that is fused
+with vector scores (reciprocal rank fusion).
+
+Postings are compact ``array`` buffers per term (chunk row position + term
+frequency) read as zero-copy NumPy views at query time. The index is built
+from the chunk table on first use and kept current the same way as the vector
+index (``chunk_index``): ``AICorpusState`` token check per query, append-only
+catch-up or rebuild on change, and in-process additions from ingestion.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from array import array
+from collections import Counter
+from datetime import datetime
+from threading import RLock
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from .chunk_index import table_stamp
+from .models import AIChunk, AICorpusState
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+(?:[-_./][a-z0-9]+)*')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the this to was were will with'.split()
+)
+_MAX_QUERY_TERMS = 32
+_BATCH = 2000
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens; compound codes (``cl5-2024``) are kept whole and also split into parts."""
+    out: list[str] = []
+    for tok in _TOKEN_RE.findall((text or '').lower()):
+        if tok in _STOPWORDS:
+            continue
+        out.append(tok)
+        if any(c in tok for c in '-_./'):
+            out.extend(p for p in re.split(r'[-_./]', tok) if p and p not in _STOPWORDS)
+    return out
+
+
+class BM25Index:
+    """Okapi BM25 (``k1``, ``b``) over documents addressed by chunk id."""
+
+    def __init__(self, *, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.ids = array('q')
+        self.lengths = array('I')
+        self.total_len = 0
+        self.postings: dict[str, tuple[array, array]] = {}
+        self._positions: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, chunk_id: int, text: str) -> None:
+        """Append a document. Re-adding an id is ignored (chunks are immutable once stored)."""
+        if chunk_id in self._positions:
+            return
+        pos = len(self.ids)
+        tokens = tokenize(text)
+        self._positions[chunk_id] = pos
+        self.ids.append(chunk_id)
+        self.lengths.append(len(tokens))
+        self.total_len += len(tokens)
+        for term, tf in Counter(tokens).items():
+            plist = self.postings.get(term)
+            if plist is None:
+                plist = self.postings[term] = (array('q'), array('I'))
+            plist[0].append(pos)
+            plist[1].append(tf)
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Top-k ``(chunk_id, score)`` by BM25, best first, ties by chunk id."""
+        n = len(self.ids)
+        if not n or k <= 0:
+            return []
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self.postings]
+        if not terms:
+            return []
+        # Long queries (section answers) keep only their most selective terms
+        terms.sort(key=lambda t: len(self.postings[t][0]))
+        terms = terms[:_MAX_QUERY_TERMS]
+        lengths = np.frombuffer(self.lengths, dtype=np.uint32).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths / (self.total_len / n or 1.0))
+        scores = np.zeros(n, dtype=np.float32)
+        for term in terms:
+            pos_arr, tf_arr = self.postings[term]
+            pos = np.frombuffer(pos_arr, dtype=np.int64)
+            tf = np.frombuffer(tf_arr, dtype=np.uint32).astype(np.float32)
+            df = pos.shape[0]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores[pos] += idf * tf * (self.k1 + 1) / (tf + norm[pos])
+        hit = np.flatnonzero(scores > 0)
+        if not hit.size:
+            return []
+        ids = np.frombuffer(self.ids, dtype=np.int64)[hit]
+        order = np.lexsort((ids, -scores[hit]))[:k]
+        return [(int(ids[i]), float(scores[hit[i]])) for i in order]
+
+
+_lock = RLock()
+_state: dict = {'index': None, 'token': None, 'stamp': None}
+
+
+def _add_rows(index: BM25Index, qs) -> int:
+    seen = 0
+    for chunk_id, text in qs.order_by('id').values_list('id', 'text').iterator(chunk_size=_BATCH):
+        index.add(chunk_id, text)
+        seen += 1
+    return seen
+
+
+def _sync() -> BM25Index:
+    token = AICorpusState.current()
+    index: BM25Index | None = _state['index']
+    if index is not None and token == _state['token']:
+        return index
+    current = table_stamp()
+    stamp = _state['stamp']
+    incremental = index is not None and stamp == current
+    if index is not None and not incremental and stamp is not None and current[1] >= stamp[1]:
+        if not stamp[1] or AIChunk.objects.filter(id=stamp[1], created_at=datetime.fromisoformat(stamp[2])).exists():
+            added = _add_rows(index, AIChunk.objects.filter(id__gt=stamp[1]))
+            incremental = stamp[0] + added == current[0]
+    if not incremental:
+        index = BM25Index()
+        _add_rows(index, AIChunk.objects.all())
+    _state.update(index=index, token=token, stamp=current)
+    return index
+
+
+def search(query: str, k: int) -> list[tuple[int, float]]:
+    with _lock:
+        return _sync().search(query, k)
+
+
+def index_texts(ids: Sequence[int], texts: Iterable[str]) -> None:
+    """Add freshly committed chunks to the loaded index (no-op if not loaded yet)."""
+    with _lock:
+        index: BM25Index | None = _state['index']
+        if index is None or not ids:
+            return
+        for chunk_id, text in zip(ids, texts):
+            index.add(chunk_id, text)
+        stamp = table_stamp()
+        if _state['stamp'] and stamp[0] == _state['stamp'][0] + len(ids):
+            _state.update(token=AICorpusState.current(), stamp=stamp)
+
+
+def reset_index() -> None:
+    with _lock:
+        _state.update(index=None, token=None, stamp=None)
+
+
+__all__ = ['BM25Index', 'index_texts', 'reset_index', 'search', 'tokenize']
@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from ai.embedding_service import BACKENDS, EmbeddingMemo, EmbeddingService
+
+_WORDS = (
+    'grant budget research community impact outcome partner evaluation program funding deadline '
+    'objective method timeline risk mitigation sustainability education health climate data'
+).split()
+
+
+def _texts(n: int, seed: int) -> list[str]:
+    # Unique, deterministic pseudo-sentences (~20 words) so nothing is served from a memo
+    out = []
+    for i in range(n):
+        words = [_WORDS[(i * 7 + j * (seed + 3)) % len(_WORDS)] for j in range(20)]
+        out.append(f'{i} ' + ' '.join(words))
+    return out
+
+
+def _rss_mb() -> float:
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Compare embedding backends (hash | minilm | onnx): load time, RSS, query latency and batch throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', default=','.join(BACKENDS), help='Comma-separated backends to compare')
+        parser.add_argument('--queries', type=int, default=50, help='Single-text embed calls for latency')
+        parser.add_argument('--texts', type=int, default=512, help='Texts for the throughput run')
+        parser.add_argument('--batch', type=int, default=32, help='Texts per embed call in the throughput run')
+        parser.add_argument('--quantized', action='store_true', help='Use the int8 ONNX model (AI_ONNX_QUANTIZED)')
+        parser.add_argument('--only', default='', help=argparse.SUPPRESS)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['only']:
+            self.stdout.write(json.dumps(self._measure(options['only'], options)))
+            return
+        rows = []
+        for backend in [b.strip() for b in options['backends'].split(',') if b.strip()]:
+            # One fresh interpreter per backend so imports and RSS do not bleed between runs
+            cmd = [sys.executable, sys.argv[0], 'embedding_benchmark', '--only', backend]
+            for flag in ('queries', 'texts', 'batch', 'seed'):
+                cmd += [f'--{flag}', str(options[flag])]
+            if options['quantized']:
+                cmd.append('--quantized')
+            proc = subprocess.run(cmd, capture_output=True, text=True, env=os.environ.copy())
+            try:
+                rows.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            except (IndexError, ValueError):
+                rows.append({'backend': backend, 'error': (proc.stderr or 'no output').strip()[-200:]})
+        self.stdout.write(f'{"backend":<10}{"active":<10}{"load s":>8}{"+rss MB":>9}{"p50 ms":>9}{"p95 ms":>9}{"texts/s":>10}')
+        for r in rows:
+            if 'load_s' not in r:
+                self.stdout.write(f'{r["backend"]:<10}error: {r["error"]}')
+                continue
+            self.stdout.write(
+                f'{r["backend"]:<10}{r["active"]:<10}{r["load_s"]:>8.2f}{r["rss_mb"]:>9.1f}'
+                f'{r["p50_ms"]:>9.2f}{r["p95_ms"]:>9.2f}{r["texts_per_s"]:>10.1f}'
+                + (f'  (load failed: {r["error"]})' if r['error'] else '')
+            )
+
+    def _measure(self, backend: str, options) -> dict:
+        rss0 = _rss_mb()
+        with override_settings(AI_ONNX_QUANTIZED=options['quantized']):
+            t0 = time.perf_counter()
+            svc = EmbeddingService(backend, batch_window_ms=0)
+            load_s = time.perf_counter() - t0
+            svc.memo = EmbeddingMemo(max_size=0)  # measure the model, not the memo
+            texts = _texts(options['queries'] + options['texts'], options['seed'])
+            svc.embed(texts[:1])  # first-call overheads (allocator, graph init)
+            lat = []
+            for text in texts[: options['queries']]:
+                t1 = time.perf_counter()
+                svc.embed([text])
+                lat.append((time.perf_counter() - t1) * 1000)
+            bulk = texts[options['queries'] :]
+            t1 = time.perf_counter()
+            for start in range(0, len(bulk), options['batch']):
+                svc.embed(bulk[start : start + options['batch']])
+            elapsed = time.perf_counter() - t1
+        lat.sort()
+        return {
+            'backend': backend,
+            'active': svc.backend,  # differs from backend when the model failed to load (hash fallback)
+            'error': None if svc.load_state == 'ready' else svc.load_error,
+            'load_s': load_s,
+            'rss_mb': _rss_mb() - rss0,
+            'p50_ms': statistics.median(lat) if lat else 0.0,
+            'p95_ms': lat[min(len(lat) - 1, int(len(lat) * 0.95))] if lat else 0.0,
+            'texts_per_s': len(bulk) / elapsed if elapsed else 0.0,
+        }
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.ingestion import ingest_manifest_report
+
+
+class Command(BaseCommand):
+    help = (
+        'Ingest a YAML manifest (items: [{type, title, text, source_url}]) with per-item isolation. '
+        'Failed items are reported and do not roll back the others.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Manifest file ("-" reads stdin)')
+        parser.add_argument('--workers', type=int, default=0, help='Chunk/embed processes (0 = in this process)')
+        parser.add_argument('--batch', type=int, default=50, help='Items written per transaction')
+        parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            if path == '-':
+                import sys
+
+                yaml_text = sys.stdin.read()
+            else:
+                with open(path, encoding='utf-8') as fh:
+                    yaml_text = fh.read()
+        except OSError as exc:
+            raise CommandError(f'Cannot read manifest: {exc}') from exc
+        report = ingest_manifest_report(yaml_text, workers=max(0, options['workers']), batch=options['batch'])
+        summary = report.as_dict()
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        counts = summary['counts']
+        total_s = summary['timings'].get('total_ms', 0.0) / 1000
+        self.stdout.write(
+            f'{report.items} items: {counts["created"]} created, {counts["duplicate_exact"]} exact duplicates, '
+            f'{counts["duplicate_similar"]} similar duplicates, {counts["failed"]} failed'
+        )
+        for row in report.failed:
+            self.stdout.write(self.style.WARNING(f'  item {row["index"]} {row["title"]!r}: {row["reason"]}'))
+        self.stdout.write(
+            self.style.SUCCESS(f'Wrote {report.chunks} chunks in {total_s:.1f}s ({summary["chunks_per_sec"]:.0f} chunks/s)')
+        )
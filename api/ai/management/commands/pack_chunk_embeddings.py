@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from ai.embedding_codec import DTYPES, pack_legacy_embeddings
+from ai.models import AIChunk
+
+
+class Command(BaseCommand):
+    help = 'Convert legacy JSON AIChunk.embedding lists into binary embedding_vec (resumable).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=500, help='Rows per bulk_update')
+        parser.add_argument('--dtype', choices=sorted(DTYPES), default='float32', help='Binary storage precision')
+        parser.add_argument('--keep-json', action='store_true', help='Do not clear the legacy JSON column')
+
+    def handle(self, *args, **options):
+        pending = AIChunk.objects.filter(embedding_vec__isnull=True, embedding__isnull=False).count()
+        converted = pack_legacy_embeddings(
+            AIChunk, batch=options['batch'], dtype=options['dtype'], clear_json=not options['keep_json']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Packed embeddings: {converted} / {pending}'))
@@ -0,0 +1,69 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai.models import AIJobContext, AIPromptTemplate
+
+_LINE = (
+    'Section {i}: Jane Doe (jane.doe{i}@example.org, +1 555-010-{i:04d}) leads work package WP{i:02d} '
+    'at {i} Main Street under grant 20250{i:04d}; the Community Health budget covers evaluation and outreach.\n'
+)
+
+
+def _prompt(size_kb: int) -> str:
+    # Proposal-like text with the PII shapes the redactor looks for, cut to the target size
+    out = []
+    total = 0
+    i = 0
+    while total < size_kb * 1024:
+        line = _LINE.format(i=i)
+        out.append(line)
+        total += len(line)
+        i += 1
+    return ''.join(out)[: size_kb * 1024]
+
+
+def _cpu_ms(fn, arg, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t0 = time.process_time()
+        fn(arg)
+        samples.append((time.process_time() - t0) * 1000)
+    return statistics.median(samples)
+
+
+class Command(BaseCommand):
+    help = (
+        'Per-job CPU of prompt redaction + template hashing: legacy (render and task each redact and hash) '
+        'vs. current (RenderedPrompt carries the redaction map and stored checksum).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,25,30', help='Comma-separated prompt sizes in KB')
+        parser.add_argument('--runs', type=int, default=30, help='Jobs per size (median reported)')
+
+    def handle(self, *args, **options):
+        template = AIPromptTemplate(template='ROLE: writer\n' + 'Guidelines: be concise and cite sources.\n' * 50)
+        template.checksum = AIPromptTemplate.compute_checksum(template.template)
+        runs = max(1, options['runs'])
+
+        def legacy(text):
+            # render_role_prompt: redact + throwaway sha256; task: redact again + compute_checksum
+            for _ in range(2):
+                AIJobContext.redact_with_mapping(text)
+                AIPromptTemplate.compute_checksum(template.template)
+
+        def current(text):
+            AIJobContext.redact_with_mapping(text)
+            return template.checksum
+
+        self.stdout.write(f'{"size KB":>8}{"legacy ms":>11}{"current ms":>12}{"saved ms":>10}{"saved %":>9}')
+        for size in [int(s) for s in options['sizes'].split(',') if s.strip()]:
+            text = _prompt(size)
+            before = _cpu_ms(legacy, text, runs)
+            after = _cpu_ms(current, text, runs)
+            saved = before - after
+            self.stdout.write(
+                f'{size:>8}{before:>11.2f}{after:>12.2f}{saved:>10.2f}{(saved / before * 100 if before else 0.0):>9.1f}'
+            )
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.onnx_embedder import model_path, quantize
+
+
+class Command(BaseCommand):
+    help = 'Write an int8 (dynamic quantization) copy of the exported ONNX embedding model.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model-dir', default='', help='Directory with model.onnx (default: AI_ONNX_MODEL_DIR)')
+
+    def handle(self, *args, **options):
+        model_dir = options['model_dir'] or getattr(settings, 'AI_ONNX_MODEL_DIR', '')
+        if not model_dir:
+            raise CommandError('Pass --model-dir or set AI_ONNX_MODEL_DIR')
+        try:
+            target = quantize(model_dir)
+        except ImportError as exc:
+            raise CommandError(f'onnxruntime is required: {exc}') from exc
+        except Exception as exc:
+            raise CommandError(f'Quantization failed for {model_path(model_dir, False)}: {exc}') from exc
+        self.stdout.write(self.style.SUCCESS(f'Wrote {target}'))
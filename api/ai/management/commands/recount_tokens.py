@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from ai.models import AIChunk, AICorpusState
+from ai.tokenization import recount_token_lens, tokenizer_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount AIChunk.token_len with the AI_TOKENIZER tokenizer (bulk). '
+        'Only rows counted by another tokenizer are touched unless --all.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=500, help='Rows per bulk_update')
+        parser.add_argument('--all', action='store_true', help='Recount every row, not only stale ones')
+
+    def handle(self, *args, **options):
+        done = recount_token_lens(AIChunk, batch=max(1, options['batch']), stale_only=not options['all'])
+        if done:
+            # token_len is cached in the vector index catalogs: rebuild instead of append
+            AICorpusState.bump('vectors')
+            AICorpusState.bump()
+        self.stdout.write(self.style.SUCCESS(f'Recounted {done} chunks with {tokenizer_name()}'))
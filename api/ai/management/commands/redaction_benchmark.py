@@ -0,0 +1,66 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai.management.commands.prompt_benchmark import _prompt
+from ai.redaction import legacy_redact_with_mapping, redact_with_mapping
+
+_OCR_LINES = (
+    'Page {i} of 240    Annual Report {i}\n',
+    'Table {i}.2  Expenditure by pro-\ngramme area (EUR)   {i}45 210   {i}3 118   12.{i}%\n',
+    'Partici- pants were recrui-\nted in {i} re-gions ; see Annex {i} ( p . {i}4 ) .\n',
+    'l0cal authori ty  cofunding   |   {i}0 000   |   n/a   |  Q{i}\n',
+    'Contact: The Project Office, {i} Harbour Road, Tel {i}01 234 567\n',
+)
+
+
+def _ocr(size_kb: int) -> str:
+    # Scanned-report shape: broken hyphenation, table rows, page furniture, few real PII hits
+    out = []
+    total = 0
+    i = 0
+    while total < size_kb * 1024:
+        line = _OCR_LINES[i % len(_OCR_LINES)].format(i=i % 97)
+        out.append(line)
+        total += len(line)
+        i += 1
+    return ''.join(out)[: size_kb * 1024]
+
+
+def _ms(fn, text: str, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn(text)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+class Command(BaseCommand):
+    help = 'Redaction throughput: legacy six-pass re.sub vs. the compiled engine (ai.redaction) on prompt and OCR text.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,30,100', help='Comma-separated synthetic text sizes in KB')
+        parser.add_argument('--runs', type=int, default=20, help='Calls per engine and text (median reported)')
+        parser.add_argument('--file', action='append', default=[], help='Also benchmark this UTF-8 text file (repeatable)')
+
+    def handle(self, *args, **options):
+        runs = max(1, options['runs'])
+        corpora = []
+        for size in [int(s) for s in options['sizes'].split(',') if s.strip()]:
+            corpora.append((f'prompt {size}KB', _prompt(size)))
+            corpora.append((f'ocr {size}KB', _ocr(size)))
+        for path in options['file']:
+            with open(path, encoding='utf-8', errors='replace') as fh:
+                corpora.append((path[-24:], fh.read()))
+        self.stdout.write(f'{"text":<26}{"legacy ms":>10}{"compiled ms":>12}{"MB/s":>8}{"speedup":>9}  same')
+        for name, text in corpora:
+            same = redact_with_mapping(text) == legacy_redact_with_mapping(text)
+            before = _ms(legacy_redact_with_mapping, text, runs)
+            after = _ms(redact_with_mapping, text, runs)
+            mb_s = len(text.encode('utf-8')) / 1e6 / (after / 1000) if after else 0.0
+            self.stdout.write(
+                f'{name:<26}{before:>10.2f}{after:>12.2f}{mb_s:>8.1f}{(before / after if after else 0.0):>8.2f}x  '
+                + ('yes' if same else 'NO')
+            )
@@ -0,0 +1,159 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ai.embedding_codec import DTYPES, decode_vector, stage_vectors, storage_dtype, store_vectors
+from ai.embedding_service import BACKENDS, bulk_embed, init_bulk_embedder, model_identity, previous_service
+from ai.models import AIChunk, AIChunkEmbedding, AICorpusState
+
+
+def _read_checkpoint(path: str, model: str) -> int:
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path) as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return 0
+    return int(data.get('last_id', 0)) if data.get('model') == model else 0
+
+
+def _write_checkpoint(path: str, model: str, last_id: int, done: int) -> None:
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump({'model': model, 'last_id': last_id, 'done': done}, fh)
+    os.replace(tmp, path)
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-embed AIChunk rows with the configured embedding model (bulk, resumable). '
+        'Only rows whose stored model/dimension differ from the target are touched unless --all. '
+        'With AI_EMBEDDING_PREVIOUS_BACKEND set (dual-read) vectors are staged and later moved with --promote.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=BACKENDS, default='', help='Default: EMBEDDING_BACKEND')
+        parser.add_argument('--batch', type=int, default=256, help='Texts per embed call / bulk_update')
+        parser.add_argument('--dtype', choices=sorted(DTYPES), default='', help='Default: AI_EMBEDDING_DTYPE')
+        parser.add_argument('--workers', type=int, default=0, help='Embedding processes (0 = embed in this process)')
+        parser.add_argument('--checkpoint', default='', help='JSON file recording the last written chunk id')
+        parser.add_argument('--all', action='store_true', help='Re-embed every row, not only stale ones')
+        parser.add_argument('--limit', type=int, default=0, help='Stop after this many rows (0 = no limit)')
+        parser.add_argument('--stage', action='store_true', help='Write AIChunkEmbedding rows (default in dual-read)')
+        parser.add_argument('--promote', action='store_true', help='Move staged vectors into the chunk rows and exit')
+        parser.add_argument('--drop-staged', action='store_true', help='Delete staged vectors of the model and exit')
+
+    def handle(self, *args, **options):
+        backend = options['backend'] or os.getenv('EMBEDDING_BACKEND', 'hash').lower()
+        if backend not in BACKENDS:
+            raise CommandError(f'Unknown embedding backend: {backend}')
+        model, dim = model_identity(backend)
+        dtype = options['dtype'] or storage_dtype()
+        batch = max(1, options['batch'])
+        limit = options['limit']
+        checkpoint = options['checkpoint']
+        if options['promote'] or options['drop_staged']:
+            moved = self._promote(model, batch) if options['promote'] else self._drop_staged(model)
+            if moved:
+                AICorpusState.bump('vectors')
+                AICorpusState.bump()
+            verb = 'Promoted' if options['promote'] else 'Dropped'
+            self.stdout.write(self.style.SUCCESS(f'{verb} {moved} staged {model} vectors'))
+            return
+        previous = previous_service()
+        self.stage = options['stage'] or (previous is not None and previous.model_name != model)
+        last_id = _read_checkpoint(checkpoint, model)
+
+        qs = AIChunk.objects.all()
+        if not options['all']:
+            qs = qs.exclude(embedding_model=model, embedding_dim=dim, embedding_vec__isnull=False)
+            if self.stage:
+                qs = qs.exclude(embeddings__model=model)
+
+        def pages():
+            # Keyset pages (id > last) instead of one open cursor: writes between pages are safe on every backend
+            cursor, read = last_id, 0
+            while not limit or read < limit:
+                size = min(batch, limit - read) if limit else batch
+                rows = list(qs.filter(id__gt=cursor).order_by('id').values_list('id', 'text')[:size])
+                if not rows:
+                    return
+                cursor, read = rows[-1][0], read + len(rows)
+                yield [r[0] for r in rows], [r[1] for r in rows]
+
+        workers = max(0, options['workers'])
+        started = time.perf_counter()
+        self.done = 0
+        try:
+            if workers:
+                ctx = multiprocessing.get_context('spawn')  # no forked DB connections or loader threads
+                with ProcessPoolExecutor(
+                    workers, mp_context=ctx, initializer=init_bulk_embedder, initargs=(backend, True)
+                ) as pool:
+                    inflight: deque[tuple[list[int], Future]] = deque()
+                    for ids, texts in pages():
+                        inflight.append((ids, pool.submit(bulk_embed, texts)))
+                        if len(inflight) >= workers * 2:  # bounded read-ahead; results are written in id order
+                            self._write(*self._result(inflight.popleft()), model, dtype, checkpoint)
+                    while inflight:
+                        self._write(*self._result(inflight.popleft()), model, dtype, checkpoint)
+            else:
+                init_bulk_embedder(backend)
+                for ids, texts in pages():
+                    self._write(ids, *bulk_embed(texts), model, dtype, checkpoint)
+        finally:
+            if self.done:
+                # Vectors changed in place: every process rebuilds its index instead of appending
+                AICorpusState.bump('vectors')
+                AICorpusState.bump()
+        if checkpoint and os.path.exists(checkpoint) and (not limit or self.done < limit):
+            os.remove(checkpoint)  # table exhausted: the next run starts from the beginning
+        done = self.done
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(f'Re-embedded {done} chunks with {model} (dim {dim}) in {elapsed:.1f}s ({rate:.0f}/s)')
+        )
+
+    @staticmethod
+    def _result(item: tuple[list[int], Future]) -> tuple[list[int], list[list[float]], str]:
+        ids, future = item
+        vectors, produced = future.result()
+        return ids, vectors, produced
+
+    def _write(self, ids: list[int], vectors: list[list[float]], produced: str, model: str, dtype: str, checkpoint: str) -> None:
+        if produced != model:  # model failed to load/encode: never store fallback vectors under the target name
+            raise CommandError(f'Embedding backend produced {produced!r} instead of {model!r}; aborting')
+        if self.stage:  # served vectors stay untouched; the new model's index reads the staged rows
+            self.done += stage_vectors(AIChunkEmbedding, ids, vectors, model=model, dtype=dtype)
+        else:
+            self.done += store_vectors(AIChunk, ids, vectors, model=model, dtype=dtype)
+        if checkpoint:
+            _write_checkpoint(checkpoint, model, ids[-1], self.done)
+
+    @staticmethod
+    def _promote(model: str, batch: int) -> int:
+        """Copy staged vectors of ``model`` into the chunk rows, then delete them (end of a dual-read upgrade)."""
+        moved = 0
+        while True:
+            pending = AIChunkEmbedding.objects.filter(model=model).order_by('chunk_id')
+            staged = list(pending.values_list('id', 'chunk_id', 'vec', 'dim', 'dtype')[:batch])
+            if not staged:
+                return moved
+            vectors = [decode_vector(vec, dtype, dim) for _, _, vec, dim, dtype in staged]
+            kept = [(row, vec) for row, vec in zip(staged, vectors) if vec is not None]
+            with transaction.atomic():
+                store_vectors(AIChunk, [row[1] for row, _ in kept], [vec for _, vec in kept], model=model, dtype=storage_dtype())
+                AIChunkEmbedding.objects.filter(id__in=[row[0] for row in staged]).delete()
+            moved += len(kept)
+
+    @staticmethod
+    def _drop_staged(model: str) -> int:
+        return AIChunkEmbedding.objects.filter(model=model).delete()[0]
@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from ai.embedding_codec import decode_vector
+from ai.models import AIChunk
+from ai.vector_index import EmbeddingMatrix, IVFFlatIndex, normalize_rows, recall_at_k, synthetic_vectors
+
+
+class Command(BaseCommand):
+    help = 'Measure IVF index recall@k and query latency against exact brute-force search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=0, help='Use N clustered synthetic vectors instead of AIChunk rows')
+        parser.add_argument('--dim', type=int, default=384, help='Synthetic vector dimension')
+        parser.add_argument('--clusters', type=int, default=64, help='Synthetic topic clusters')
+        parser.add_argument('--queries', type=int, default=200, help='Number of queries (perturbed corpus rows)')
+        parser.add_argument('--k', type=int, default=6)
+        parser.add_argument('--nlist', type=int, default=0, help='IVF cells (0 = sqrt(n))')
+        parser.add_argument('--nprobe', default='1,2,4,8,16,32', help='Comma-separated nprobe values to sweep')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        k = options['k']
+        if options['synthetic']:
+            vectors = synthetic_vectors(options['synthetic'], options['dim'], clusters=options['clusters'], seed=options['seed'])
+            ids = np.arange(1, vectors.shape[0] + 1, dtype=np.int64)
+        else:
+            rows = [
+                (cid, decode_vector(blob, dtype, dim))
+                for cid, blob, dim, dtype in AIChunk.objects.filter(embedding_vec__isnull=False)
+                .order_by('id')
+                .values_list('id', 'embedding_vec', 'embedding_dim', 'embedding_dtype')
+            ]
+            rows = [r for r in rows if r[1] is not None]
+            if not rows:
+                raise CommandError('No embedded chunks found; use --synthetic N')
+            dim = rows[0][1].shape[0]
+            rows = [r for r in rows if r[1].shape[0] == dim]
+            ids = np.array([cid for cid, _ in rows], dtype=np.int64)
+            vectors = normalize_rows(np.array([vec for _, vec in rows], dtype=np.float32))
+        n, dim = vectors.shape
+
+        rng = np.random.default_rng(options['seed'] + 1)
+        picks = rng.choice(n, min(options['queries'], n), replace=False)
+        queries = vectors[picks] + 0.1 * rng.standard_normal((picks.size, dim)).astype(np.float32) / np.sqrt(dim)
+
+        flat = EmbeddingMatrix(ids, vectors)
+        t0 = time.perf_counter()
+        exact = [[cid for cid, _ in flat.top_k(q, k)] for q in queries]
+        flat_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+        ivf = IVFFlatIndex(ids, vectors, min_train=1)
+        t0 = time.perf_counter()
+        ivf.train(nlist=options['nlist'] or None)
+        train_s = time.perf_counter() - t0
+        nlist = ivf.centroids.shape[0] if ivf.centroids is not None else 0
+
+        self.stdout.write(f'corpus n={n} dim={dim} k={k} queries={len(queries)} nlist={nlist} train={train_s:.2f}s')
+        self.stdout.write(f'{"index":<14}{"recall@k":>10}{"ms/query":>12}{"speedup":>10}')
+        self.stdout.write(f'{"flat":<14}{1.0:>10.4f}{flat_ms:>12.3f}{1.0:>10.2f}')
+        for raw in str(options['nprobe']).split(','):
+            nprobe = int(raw)
+            t0 = time.perf_counter()
+            approx = [[cid for cid, _ in ivf.top_k(q, k, nprobe=nprobe)] for q in queries]
+            ms = (time.perf_counter() - t0) * 1000 / len(queries)
+            recall = recall_at_k(approx, exact)
+            self.stdout.write(f'{"ivf/" + str(nprobe):<14}{recall:>10.4f}{ms:>12.3f}{(flat_ms / ms if ms else 0):>10.2f}')
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.10 on 2026-10-17 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0009_aijobcontext_redaction_map_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aichunk',
+            name='embedding_dim',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aichunk',
+            name='embedding_dtype',
+            field=models.CharField(blank=True, default='', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='aichunk',
+            name='embedding_vec',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
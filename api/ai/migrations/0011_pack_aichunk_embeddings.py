@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def pack_embeddings(apps, schema_editor):
+    AIChunk = apps.get_model('ai', 'AIChunk')
+    pack_legacy_embeddings = __import__('ai.embedding_codec', fromlist=['pack_legacy_embeddings']).pack_legacy_embeddings
+    converted = pack_legacy_embeddings(AIChunk, batch=500)
+    if converted:
+        print(f'Packed {converted} AIChunk JSON embeddings into embedding_vec')
+
+
+def noop_reverse(apps, schema_editor):
+    # Binary vectors stay in place; JSON lists are not restored (re-run ingestion/reembed if needed).
+    pass
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0010_aichunk_embedding_vec'),
+    ]
+
+    operations = [
+        migrations.RunPython(pack_embeddings, noop_reverse),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.10 on 2026-10-17 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0011_pack_aichunk_embeddings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AICorpusState',
+            fields=[
+                ('key', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=32)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.10 on 2026-10-17 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0012_aicorpusstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airesource',
+            name='org_id',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='airesource',
+            index=models.Index(fields=['org_id'], name='ai_airesour_org_id_6080ed_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.10 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0013_airesource_org_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aichunk',
+            name='embedding_model',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='aichunk',
+            index=models.Index(fields=['embedding_model'], name='ai_aichunk_embeddi_03d2bf_idx'),
+        ),
+    ]
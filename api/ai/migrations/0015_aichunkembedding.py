@@ -0,0 +1,32 @@
+# Generated by Django 5.1.10 on 2026-10-17 04:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0014_aichunk_embedding_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIChunkEmbedding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=64)),
+                ('dim', models.PositiveIntegerField()),
+                ('dtype', models.CharField(max_length=8)),
+                ('vec', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                (
+                    'chunk',
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='embeddings', to='ai.aichunk'),
+                ),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'chunk'], name='ai_aichunke_model_f9b406_idx')],
+                'constraints': [models.UniqueConstraint(fields=('chunk', 'model'), name='aichunkembedding_chunk_model_unique')],
+            },
+        ),
+    ]
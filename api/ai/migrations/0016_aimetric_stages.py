@@ -0,0 +1,29 @@
+# Generated by Django 5.1.10 on 2026-10-17 04:15
+
+import ai.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0015_aichunkembedding'),
+    ]
+
+    operations = [
+        # Existing rows predate deployment labels: '' for them, the callable default for new rows
+        migrations.AddField(
+            model_name='aimetric',
+            name='deployment',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='aimetric',
+            name='deployment',
+            field=models.CharField(blank=True, db_index=True, default=ai.models.current_deployment, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='aimetric',
+            name='stages',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
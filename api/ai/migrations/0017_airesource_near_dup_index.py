@@ -0,0 +1,53 @@
+# Generated by Django 5.1.10 on 2026-10-17 04:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_signatures(apps, schema_editor):
+    AIResource = apps.get_model('ai', 'AIResource')
+    AIChunk = apps.get_model('ai', 'AIChunk')
+    AIResourceBand = apps.get_model('ai', 'AIResourceBand')
+    backfill = __import__('ai.near_dup', fromlist=['backfill_signatures']).backfill_signatures
+    done = backfill(AIResource, AIChunk, AIResourceBand, batch=500)
+    if done:
+        print(f'Computed near-duplicate signatures for {done} AIResource rows')
+
+
+def noop_reverse(apps, schema_editor):
+    # Signature columns and the band table are dropped by the schema reversal.
+    pass
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0016_aimetric_stages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airesource',
+            name='lead_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='airesource',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='AIResourceBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                (
+                    'resource',
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_bands', to='ai.airesource'),
+                ),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key'], name='ai_airesour_key_efae2d_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_signatures, noop_reverse),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.10 on 2026-10-17 04:30
+
+import uuid
+
+from django.db import migrations, models
+
+
+def recount_tokens(apps, schema_editor):
+    AIChunk = apps.get_model('ai', 'AIChunk')
+    AICorpusState = apps.get_model('ai', 'AICorpusState')
+    recount = __import__('ai.tokenization', fromlist=['recount_token_lens']).recount_token_lens
+    done = recount(AIChunk, batch=500)
+    if done:
+        # token_len is cached in every vector index catalog: force a rebuild rather than an append
+        for key in ('chunks', 'vectors'):
+            AICorpusState.objects.update_or_create(key=key, defaults={'token': uuid.uuid4().hex})
+        print(f'Recounted token_len for {done} AIChunk rows')
+
+
+def noop_reverse(apps, schema_editor):
+    # Recounted token_len values are kept; the tokenizer column is dropped by the schema reversal.
+    pass
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0017_airesource_near_dup_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aichunk',
+            name='tokenizer',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.RunPython(recount_tokens, noop_reverse),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.10 on 2026-10-17 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0018_aichunk_tokenizer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airesource',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
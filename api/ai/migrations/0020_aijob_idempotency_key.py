@@ -0,0 +1,27 @@
+# Generated by Django 5.1.10 on 2026-10-17 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ai', '0019_airesource_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aijob',
+            name='coalesced_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='aijob',
+            name='idempotency_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='aijob',
+            name='reused_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
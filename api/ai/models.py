@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 
+from . import redaction
+
 
 class AIPromptTemplate(models.Model):
     """Versioned prompt template owned by backend (users never edit directly).
@@ -79,6 +83,12 @@ class AIJob(models.Model):
     error_text = models.TextField(blank=True, default='')
     created_by = models.ForeignKey(get_user_model(), null=True, blank=True, on_delete=models.SET_NULL)
     org_id = models.CharField(max_length=64, blank=True, default='')
+    # Content hash of the submission (type, caller, org, input, deterministic flag, active template version);
+    # '' when deduplication is off (AI_JOB_DEDUP_WINDOW=0). See ai.tasks.submit_job.
+    idempotency_key = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    # Identical submissions answered by this job: attached while queued/processing, served its stored result once done
+    coalesced_count = models.PositiveIntegerField(default=0)
+    reused_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -87,6 +97,13 @@ class AIJob(models.Model):
         return f"AIJob#{getattr(self, 'id', 'unsaved')} {self.type} {self.status}"  # type: ignore[attr-defined]
 
 
+def current_deployment() -> str:
+    """Deployment label stored on metrics (``AI_DEPLOYMENT_ID``), to compare stage timings across releases."""
+    from django.conf import settings
+
+    return str(getattr(settings, 'AI_DEPLOYMENT_ID', '') or '')[:64]
+
+
 class AIMetric(models.Model):
     TYPE_CHOICES = [
         ('plan', 'plan'),
@@ -107,6 +124,9 @@ class AIMetric(models.Model):
     error_text = models.TextField(blank=True, default='')
     created_by = models.ForeignKey(get_user_model(), null=True, blank=True, on_delete=models.SET_NULL)
     org_id = models.CharField(max_length=64, blank=True, default='')
+    # Stage timers of the job (retrieval embed/fetch/decode/score, provider, render, persist; see ai/timing.py)
+    stages = models.JSONField(default=dict, blank=True)
+    deployment = models.CharField(max_length=64, blank=True, default=current_deployment, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self) -> str:
@@ -246,41 +266,9 @@ class AIJobContext(models.Model):
 
         Returns (redacted_text, mapping) where mapping is token->classification (NOT raw value).
         Classifications: EMAIL, NUMBER, PHONE, SIMPLE_NAME, ID_CODE, ADDRESS_LINE
+        (compiled engine in ``ai.redaction``).
         """
-        import re
-        import hashlib
-
-        if not text:
-            return text, {}
-        mapping: dict[str, str] = {}
-
-        patterns: list[tuple[str, str]] = [
-            (r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}', 'EMAIL'),
-            (r'\b\d{6,}\b', 'NUMBER'),
-            (r'\b\+?[0-9][0-9\-\s]{6,}[0-9]\b', 'PHONE'),
-            (r'\b[A-Z]{2}[0-9]{2,}\b', 'ID_CODE'),  # simplistic code/id pattern
-            (r'\b([A-Z][a-z]{1,15}\s[A-Z][a-z]{1,15})\b', 'SIMPLE_NAME'),
-            (r'\b\d+\s+[A-Z][A-Za-z]+\s+(Street|St|Road|Rd|Avenue|Ave|Boulevard|Blvd|Lane|Ln)\b', 'ADDRESS_LINE'),
-        ]
-
-        def token_for(val: str, cls: str) -> str:
-            h = hashlib.sha256(val.encode('utf-8')).hexdigest()[:10]
-            return f'[{cls}_{h}]'
-
-        redacted = text
-        for pattern, classification in patterns:
-
-            def repl(m, _c=classification):  # bind current classification
-                val = m.group(0)
-                tok = token_for(val, _c)
-                mapping.setdefault(tok, _c)
-                return tok
-
-            redacted = re.sub(pattern, repl, redacted)
-
-        if len(redacted) > 20000:
-            redacted = redacted[:20000] + '…'
-        return redacted, mapping
+        return redaction.redact_with_mapping(text)
 
 
 class AIResource(models.Model):
@@ -294,7 +282,14 @@ class AIResource(models.Model):
     type = models.CharField(max_length=32, choices=TYPE_CHOICES)
     title = models.CharField(max_length=256, blank=True, default='')
     source_url = models.URLField(blank=True, default='')
+    # Owning org ('' = shared across orgs); org-scoped retrieval sees shared + own resources
+    org_id = models.CharField(max_length=64, blank=True, default='')
     sha256 = models.CharField(max_length=64, db_index=True)
+    # Near-duplicate detection (ai/near_dup.py): MinHash of the first chunk + hash of its first 32 characters
+    minhash = models.BinaryField(null=True, blank=True)
+    lead_key = models.CharField(max_length=16, blank=True, default='', db_index=True)
+    # Incremented by ingestion.refresh_resource when the source text changes (chunks diffed in place)
+    version = models.PositiveIntegerField(default=1)
     metadata = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -302,6 +297,7 @@ class AIResource(models.Model):
         indexes = [
             models.Index(fields=['type']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['org_id']),
         ]
 
     def __str__(self) -> str:  # pragma: no cover
@@ -314,6 +310,19 @@ class AIResource(models.Model):
         return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
 
+class AIResourceBand(models.Model):
+    """LSH bucket of an AIResource's MinHash signature (one row per band); resources sharing a key are candidates."""
+
+    resource = models.ForeignKey(AIResource, on_delete=models.CASCADE, related_name='lsh_bands')
+    key = models.BigIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['key'])]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f'AIResourceBand({self.resource_id},{self.key})'  # type: ignore[attr-defined]
+
+
 class AIChunk(models.Model):
     """Embedded chunk of an AIResource."""
 
@@ -321,9 +330,17 @@ class AIChunk(models.Model):
     ord = models.IntegerField()
     text = models.TextField()
     token_len = models.IntegerField(default=0)
+    # Tokenizer that counted token_len (ai/tokenization.py); `recount_tokens` refreshes rows counted by another one
+    tokenizer = models.CharField(max_length=32, blank=True, default='')
     embedding_key = models.CharField(max_length=64, blank=True, default='')  # placeholder until vector store integration
-    # Cached embedding vector (list[float]) for naive in-DB retrieval; replace with external vector store later
+    # Legacy JSON vector (list[float]); superseded by embedding_vec and cleared by `pack_chunk_embeddings`
     embedding = models.JSONField(null=True, blank=True)
+    # Embedding as raw little-endian bytes (see ai/embedding_codec.py); dim/dtype describe the layout
+    embedding_vec = models.BinaryField(null=True, blank=True)
+    embedding_dim = models.PositiveIntegerField(default=0)
+    embedding_dtype = models.CharField(max_length=8, blank=True, default='')
+    # Embedding model that produced embedding_vec ('' = unknown / legacy); `reembed_chunks` targets mismatches
+    embedding_model = models.CharField(max_length=64, blank=True, default='')
     metadata = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -334,7 +351,84 @@ class AIChunk(models.Model):
         indexes = [
             models.Index(fields=['resource']),
             models.Index(fields=['embedding_key']),
+            models.Index(fields=['embedding_model']),
         ]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"AIChunk(res={getattr(self.resource, 'id', 'unsaved')},ord={self.ord})"
+
+    @property
+    def vector(self):
+        """Embedding as a read-only numpy view (falls back to the legacy JSON list)."""
+        from .embedding_codec import decode_vector
+
+        vec = decode_vector(self.embedding_vec, self.embedding_dtype, self.embedding_dim or None)
+        if vec is None and self.embedding:
+            import numpy as np
+
+            vec = np.asarray(self.embedding, dtype=np.float32)
+        return vec
+
+
+class AIChunkEmbedding(models.Model):
+    """Staged embedding of a chunk under another model (dual-read model upgrades).
+
+    ``AIChunk.embedding_vec`` holds the vector of the model currently served. While
+    ``AI_EMBEDDING_PREVIOUS_BACKEND`` is set, vectors for the new model are written
+    here (ingestion, ``reembed_chunks --stage``) so both indexes can be built side
+    by side; ``reembed_chunks --promote`` moves them into the chunk rows.
+    """
+
+    chunk = models.ForeignKey(AIChunk, on_delete=models.CASCADE, related_name='embeddings')
+    model = models.CharField(max_length=64)
+    dim = models.PositiveIntegerField()
+    dtype = models.CharField(max_length=8)
+    vec = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chunk', 'model'], name='aichunkembedding_chunk_model_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['model', 'chunk']),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f'AIChunkEmbedding(chunk={self.chunk_id},model={self.model})'  # type: ignore[attr-defined]
+
+
+class AICorpusState(models.Model):
+    """Change token for the retrieval corpus (one row per key, e.g. 'chunks').
+
+    Writers that add, remove or re-embed chunks call ``bump``; each worker's
+    in-memory index compares the token with the one it was built from and only
+    resyncs when they differ. Rewriting vectors in place (re-embedding) also
+    bumps the ``'vectors'`` key, which turns that resync into a full rebuild. The token is random rather than a counter so a
+    rolled-back write can never make a stale index look current.
+    """
+
+    key = models.CharField(max_length=32, primary_key=True)
+    token = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f'AICorpusState({self.key}={self.token})'
+
+    @classmethod
+    def bump(cls, key: str = 'chunks') -> str:
+        import uuid
+
+        token = uuid.uuid4().hex
+        cls.objects.update_or_create(key=key, defaults={'token': token})
+        return token
+
+    @classmethod
+    def current(cls, key: str = 'chunks') -> str:
+        return cls.objects.filter(key=key).values_list('token', flat=True).first() or ''
+
+
+@receiver(post_delete, sender=AIResource)
+def _resource_deleted(sender, instance: AIResource, **kwargs):
+    # One bump per resource; no AIChunk receiver, so its cascade stays a fast (bulk) delete.
+    AICorpusState.bump()
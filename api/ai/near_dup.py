@@ -0,0 +1,137 @@
+"""MinHash / LSH signatures for near-duplicate resource detection at ingestion.
+
+Each ``AIResource`` stores a MinHash signature of its first chunk
+(``NUM_PERM`` 32-bit minima over word 1- and 2-shingles) plus ``BANDS`` LSH
+bucket keys (``AIResourceBand``, indexed). A new resource only compares
+itself with resources sharing at least one bucket, found with one indexed
+``key IN (...)`` query over the whole corpus, instead of the 200 most recent
+resources. With 16 bands of 4 rows a pair of Jaccard similarity 0.7 becomes
+a candidate with probability ~0.98 (0.5: ~0.64).
+
+Candidates are then confirmed exactly as before (textual prefix heuristic or
+first-chunk cosine >= threshold); the index only decides who is compared.
+A ``lead_key`` (hash of the first 32 characters) additionally finds
+candidates for the prefix heuristic whose shingle overlap is too small for LSH.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+
+import numpy as np
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+LEAD_CHARS = 32
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(20250917)  # fixed: signatures are persisted
+_A = _rng.integers(1, (1 << 31) - 1, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, (1 << 31) - 1, NUM_PERM, dtype=np.uint64)
+_WORD_RE = re.compile(r'\w+')
+_EMPTY = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+
+
+def _h32(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def shingles(text: str) -> set[int]:
+    """32-bit hashes of lowercased word unigrams and bigrams."""
+    words = _WORD_RE.findall((text or '').lower())
+    out = {_h32(w) for w in words}
+    out.update(_h32(f'{a} {b}') for a, b in zip(words, words[1:]))
+    return out
+
+
+def minhash(text: str) -> np.ndarray:
+    """``NUM_PERM`` MinHash values (uint32) of ``text``'s shingles; all-max for text without words."""
+    items = shingles(text)
+    if not items:
+        return _EMPTY.copy()
+    x = np.fromiter(items, dtype=np.uint64, count=len(items)) % _PRIME
+    # Universal hashing (a * x + b) mod (2^31 - 1): every operand < 2^31, so the product fits in uint64
+    hashed = (np.outer(_A, x) + _B[:, None]) % _PRIME
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def signature_bytes(sig: np.ndarray) -> bytes:
+    return np.asarray(sig, dtype='<u4').tobytes()
+
+
+def signature_from_bytes(blob: bytes | memoryview | None) -> np.ndarray | None:
+    if not blob or len(blob) != NUM_PERM * 4:
+        return None
+    return np.frombuffer(blob, dtype='<u4')
+
+
+def band_keys(sig: np.ndarray) -> list[int]:
+    """One signed 64-bit LSH bucket key per band (band index mixed in); none for an empty signature."""
+    if np.array_equal(sig, _EMPTY):
+        return []
+    rows = np.asarray(sig, dtype='<u4').reshape(BANDS, ROWS)
+    return [
+        int.from_bytes(hashlib.blake2b(bytes([band]) + rows[band].tobytes(), digest_size=8).digest(), 'little', signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def estimate_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def lead_key(text: str) -> str:
+    """Hash of the first ``LEAD_CHARS`` characters (of the stripped first chunk)."""
+    return hashlib.sha256(text.strip()[:LEAD_CHARS].encode('utf-8')).hexdigest()[:16]
+
+
+def lead_probe_keys(text: str) -> list[str]:
+    """``lead_key`` values of every resource whose first chunk could be a prefix of ``text`` or share its lead."""
+    s = text.strip()
+    return [lead_key(s[:n]) for n in range(1, min(len(s), LEAD_CHARS) + 1)]
+
+
+def signature_fields(first_chunk: str) -> tuple[dict, list[int]]:
+    """(``AIResource`` field values, LSH band keys) for a resource whose first chunk is ``first_chunk``."""
+    sig = minhash(first_chunk)
+    return {'minhash': signature_bytes(sig), 'lead_key': lead_key(first_chunk)}, band_keys(sig)
+
+
+def backfill_signatures(resource_model, chunk_model, band_model, *, batch: int = 500) -> int:
+    """Compute signatures + bands for resources that have none (live or historical migration models)."""
+    done = 0
+    last_id = 0
+    while True:
+        pending = resource_model.objects.filter(id__gt=last_id, minhash__isnull=True).order_by('id')
+        ids = list(pending.values_list('id', flat=True)[:batch])
+        if not ids:
+            return done
+        last_id = ids[-1]
+        firsts = dict(chunk_model.objects.filter(resource_id__in=ids, ord=0).values_list('resource_id', 'text'))
+        rows = []
+        bands = []
+        for rid in ids:
+            fields, keys = signature_fields(firsts.get(rid, ''))
+            rows.append(resource_model(id=rid, **fields))
+            bands.extend(band_model(resource_id=rid, key=k) for k in keys)
+        resource_model.objects.bulk_update(rows, ['minhash', 'lead_key'])
+        band_model.objects.filter(resource_id__in=ids).delete()
+        band_model.objects.bulk_create(bands)
+        done += len(ids)
+
+
+__all__ = [
+    'BANDS',
+    'NUM_PERM',
+    'backfill_signatures',
+    'band_keys',
+    'estimate_jaccard',
+    'lead_key',
+    'lead_probe_keys',
+    'minhash',
+    'shingles',
+    'signature_bytes',
+    'signature_fields',
+    'signature_from_bytes',
+]
@@ -0,0 +1,79 @@
+"""MiniLM sentence embeddings through onnxruntime (CPU, optional int8).
+
+Replaces the sentence-transformers/PyTorch stack for ``EMBEDDING_BACKEND=onnx``:
+only ``onnxruntime`` and ``tokenizers`` are imported. The model directory
+(``AI_ONNX_MODEL_DIR``) holds an exported all-MiniLM-L6-v2, e.g. produced on a
+build machine with::
+
+    optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 <dir>
+    python manage.py quantize_embedding_model --model-dir <dir>   # adds model.int8.onnx
+
+Pipeline matches sentence-transformers: tokenize (max 256 tokens), encoder
+forward pass, attention-masked mean pooling, L2 normalization.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Sequence
+
+import numpy as np
+
+MODEL_FILE = 'model.onnx'
+QUANTIZED_FILE = 'model.int8.onnx'
+MAX_TOKENS = 256
+
+
+def model_path(model_dir: str, quantized: bool) -> str:
+    return os.path.join(model_dir, QUANTIZED_FILE if quantized else MODEL_FILE)
+
+
+def mean_pool(hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Attention-masked mean over the token axis, then L2-normalized rows."""
+    m = mask.astype(np.float32)[:, :, None]
+    summed = (hidden * m).sum(axis=1)
+    pooled = summed / np.clip(m.sum(axis=1), 1e-9, None)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled / np.clip(norms, 1e-12, None)
+
+
+class OnnxEmbedder:
+    """``encode(texts)`` compatible with ``SentenceTransformer.encode`` for the service."""
+
+    def __init__(self, model_dir: str, *, quantized: bool = False, threads: int = 0) -> None:
+        import onnxruntime as ort  # type: ignore
+        from tokenizers import Tokenizer  # type: ignore
+
+        path = model_path(model_dir, quantized)
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(MAX_TOKENS)
+        self.tokenizer.enable_padding()
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: Sequence[str], normalize_embeddings: bool = True) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {'input_ids': ids, 'attention_mask': mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.zeros_like(ids)
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+        return mean_pool(hidden, mask)
+
+
+def quantize(model_dir: str) -> str:
+    """Write ``model.int8.onnx`` (dynamic int8 weight quantization) next to ``model.onnx``."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+
+    target = model_path(model_dir, True)
+    quantize_dynamic(model_path(model_dir, False), target, weight_type=QuantType.QInt8)
+    return target
+
+
+__all__ = ['OnnxEmbedder', 'mean_pool', 'model_path', 'quantize']
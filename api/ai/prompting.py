@@ -1,10 +1,13 @@
 """Prompt template rendering utility.
 
 Responsibilities:
-- Fetch active template for a role (highest version, active=True)
+- Fetch active template for a role (highest version, active=True) and parse it once into
+  literal/variable segments, cached per (role, version, checksum, digest of blueprint fields and
+  declared variables) and dropped on template save/delete
 - Validate required variables are supplied and no undeclared extras (strict mode)
-- Perform safe "{{var}}" substitution (no logic, no attribute access)
-- Return both raw rendered and redacted snapshot (using AIJobContext.redact)
+- Perform safe "{{var}}" substitution (no logic, no attribute access) with a single join
+- Return raw rendered and redacted snapshot plus the redaction map and template checksum
+  (one AIJobContext.redact_with_mapping pass per render; callers persist these as-is)
 - Fallback: minimal hardcoded template if DB has none (keeps system functioning)
 
 Security / Safety:
@@ -18,9 +21,12 @@ The formatting agent and other roles receive deterministic, backend-owned prompt
 """
 
 from __future__ import annotations
-from dataclasses import dataclass
-from .models import AIPromptTemplate, AIJobContext
 import hashlib
+import json
+from dataclasses import dataclass, field
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import AIPromptTemplate, AIJobContext
 
 MAX_PROMPT_LEN = 30000
 MAX_VALUE_LEN = 4000
@@ -36,30 +42,62 @@ class RenderedPrompt:
     rendered: str
     redacted: str
     variables_used: dict[str, str]
+    # token -> classification from the same redaction pass that produced ``redacted``
+    redaction_map: dict[str, str] = field(default_factory=dict)
+    # sha256 of the stored template text ('' for the fallback template)
+    template_sha256: str = ''
 
 
-def _get_active_template(role: str) -> AIPromptTemplate | None:
-    qs = AIPromptTemplate.objects.filter(role=role, active=True).order_by('-version')
-    return qs.first()
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """Template parsed once into literal and variable segments (``names[i]`` follows ``literals[i]``)."""
 
+    template: AIPromptTemplate | None
+    literals: tuple[str, ...]
+    names: tuple[str, ...]
+    declared: frozenset[str]
+    checksum: str
 
-def _fallback_template(role: str) -> tuple[str, list[str]]:
-    # Minimal safe fallback; kept intentionally simple.
-    base = f'ROLE: {role}\n' 'Instructions: Follow role guidelines.\n' 'Input JSON: {{input_json}}\n'
-    return base, ['input_json']
+    def render(self, values: dict[str, str]) -> str:
+        parts = [self.literals[0]]
+        for name, literal in zip(self.names, self.literals[1:]):
+            parts.append(values.get(name, ''))
+            parts.append(literal)
+        return ''.join(parts)
 
 
-def render_role_prompt(*, role: str, variables: dict[str, object]) -> RenderedPrompt:
-    tpl = _get_active_template(role)
-    if tpl is None:
-        raw_tpl, declared = _fallback_template(role)
-        declared_set = set(declared)
-    else:
-        raw_tpl = tpl.template
-        declared_set = set(tpl.variables or [])
+# (role, version, checksum, _fields_digest) -> compiled template; per process, cleared for a role when one of
+# its templates is saved
+_compiled: dict[tuple[str, int, str, str], CompiledTemplate] = {}
+_COMPILED_FIELDS = ('blueprint_instructions', 'blueprint_schema', 'variables')  # feed compilation besides the text
+
 
+def _fields_digest(instructions: str, schema, variables) -> str:
+    """Digest of the non-text fields a compiled template depends on (``checksum`` covers the text only)."""
+    payload = json.dumps([instructions or '', schema, variables or []], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _parse(raw_tpl: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """Split on ``{{name}}`` tokens; an unclosed ``{{`` and everything after it stays literal."""
+    literals: list[str] = []
+    names: list[str] = []
+    pos = 0
+    while True:
+        i = raw_tpl.find('{{', pos)
+        j = raw_tpl.find('}}', i + 2) if i != -1 else -1
+        if j == -1:
+            literals.append(raw_tpl[pos:])
+            return tuple(literals), tuple(names)
+        literals.append(raw_tpl[pos:i])
+        names.append(raw_tpl[i + 2 : j].strip())
+        pos = j + 2
+
+
+def _with_blueprint(tpl: AIPromptTemplate) -> str:
+    raw_tpl = tpl.template
     # If template has blueprint metadata and role is formatter, append structured blueprint guidance
-    if tpl and role == 'formatter' and (tpl.blueprint_schema or tpl.blueprint_instructions):
+    if tpl.role == 'formatter' and (tpl.blueprint_schema or tpl.blueprint_instructions):
         blueprint_block = '\n---\nSTRUCTURE BLUEPRINT INSTRUCTIONS:\n'
         if tpl.blueprint_instructions:
             blueprint_block += tpl.blueprint_instructions.strip() + '\n'
@@ -71,6 +109,81 @@ def render_role_prompt(*, role: str, variables: dict[str, object]) -> RenderedPr
             except Exception:  # pragma: no cover - defensive
                 pass
         raw_tpl = raw_tpl.rstrip() + blueprint_block
+    return raw_tpl
+
+
+def compile_template(tpl: AIPromptTemplate) -> CompiledTemplate:
+    literals, names = _parse(_with_blueprint(tpl))
+    return CompiledTemplate(
+        template=tpl,
+        literals=literals,
+        names=names,
+        declared=frozenset(tpl.variables or []),
+        # Stored on save(); only rows written without save() need hashing
+        checksum=tpl.checksum or AIPromptTemplate.compute_checksum(tpl.template),
+    )
+
+
+def _fallback_template(role: str) -> tuple[str, list[str]]:
+    # Minimal safe fallback; kept intentionally simple.
+    base = f'ROLE: {role}\n' 'Instructions: Follow role guidelines.\n' 'Input JSON: {{input_json}}\n'
+    return base, ['input_json']
+
+
+def _compiled_fallback(role: str) -> CompiledTemplate:
+    key = (role, 0, '', '')
+    compiled = _compiled.get(key)
+    if compiled is None:
+        raw_tpl, declared = _fallback_template(role)
+        literals, names = _parse(raw_tpl)
+        compiled = _compiled[key] = CompiledTemplate(None, literals, names, frozenset(declared), '')
+    return compiled
+
+
+def get_compiled_template(role: str) -> CompiledTemplate:
+    """Compiled active template for ``role`` (highest version, active=True), or the fallback.
+
+    The active row is looked up on every call (id/version/checksum and the blueprint/variables
+    fields, not the template text), so deactivating, rolling back or editing a template, also
+    through ``queryset.update()`` or from another process, takes effect immediately in every
+    process; the full row is only loaded and parsed when that key is not cached yet.
+    """
+    head = (
+        AIPromptTemplate.objects.filter(role=role, active=True)
+        .order_by('-version')
+        .values_list('id', 'version', 'checksum', *_COMPILED_FIELDS)
+        .first()
+    )
+    if head is None:
+        return _compiled_fallback(role)
+    tpl_id, version, checksum, *fields = head
+    key = (role, version, checksum, _fields_digest(*fields))
+    compiled = _compiled.get(key)
+    if compiled is not None and compiled.template is not None and compiled.template.pk == tpl_id:
+        return compiled
+    tpl = AIPromptTemplate.objects.filter(id=tpl_id).first()
+    if tpl is None:  # deleted between the two queries
+        return _compiled_fallback(role)
+    compiled = compile_template(tpl)
+    for stale in [k for k in _compiled if k[0] == role and k[1]]:
+        _compiled.pop(stale, None)
+    _compiled[key] = compiled
+    return compiled
+
+
+def clear_template_cache(role: str | None = None) -> None:
+    for key in [k for k in _compiled if role is None or k[0] == role]:
+        _compiled.pop(key, None)
+
+
+@receiver([post_save, post_delete], sender=AIPromptTemplate)
+def _template_changed(sender, instance: AIPromptTemplate, **kwargs):
+    clear_template_cache(instance.role)
+
+
+def render_role_prompt(*, role: str, variables: dict[str, object]) -> RenderedPrompt:
+    compiled = get_compiled_template(role)
+    tpl = compiled.template
 
     # Normalize and coerce variable values
     norm_vars: dict[str, str] = {}
@@ -85,57 +198,38 @@ def render_role_prompt(*, role: str, variables: dict[str, object]) -> RenderedPr
         norm_vars[k] = s
 
     # Strict variable enforcement
-    provided = set(norm_vars.keys())
-    missing = declared_set - provided
-    extras = provided - declared_set
     if tpl is not None:  # Only enforce strictness when template exists in DB
+        provided = set(norm_vars.keys())
+        missing = compiled.declared - provided
+        extras = provided - compiled.declared
         if missing:
             raise PromptTemplateError(f"missing variables: {', '.join(sorted(missing))}")
         if extras:
             raise PromptTemplateError(f"unexpected variables: {', '.join(sorted(extras))}")
 
-    # Render (one-pass replace of {{var}} tokens)
-    def replace_token(token: str) -> str:
-        name = token[2:-2].strip()
-        return norm_vars.get(name, '')
-
-    out_parts: list[str] = []
-    i = 0
-    while i < len(raw_tpl):
-        if raw_tpl.startswith('{{', i):
-            j = raw_tpl.find('}}', i + 2)
-            if j == -1:
-                # no closing, treat as literal
-                out_parts.append(raw_tpl[i:])
-                break
-            token = raw_tpl[i : j + 2]
-            out_parts.append(replace_token(token))
-            i = j + 2
-        else:
-            out_parts.append(raw_tpl[i])
-            i += 1
-    rendered = ''.join(out_parts)
+    rendered = compiled.render(norm_vars)
     if len(rendered) > MAX_PROMPT_LEN:
         rendered = rendered[:MAX_PROMPT_LEN] + '…'
 
     # Use extended redaction to capture mapping
-    redacted, _map = AIJobContext.redact_with_mapping(rendered)
-
-    # Attach template checksum for drift detection (checksum already stored, but recompute on combined template)
-    if tpl is not None:
-        # Compute for callers that may extend RenderedPrompt later (side-effect only)
-        _ = hashlib.sha256(tpl.template.encode('utf-8')).hexdigest()
+    redacted, red_map = AIJobContext.redact_with_mapping(rendered)
 
     return RenderedPrompt(
         template=tpl,
         rendered=rendered,
         redacted=redacted,
         variables_used=norm_vars,
+        redaction_map=red_map,
+        template_sha256=compiled.checksum,
     )
 
 
 __all__ = [
+    'CompiledTemplate',
     'RenderedPrompt',
+    'clear_template_cache',
+    'compile_template',
+    'get_compiled_template',
     'render_role_prompt',
     'PromptTemplateError',
 ]
@@ -0,0 +1,158 @@
+"""Deterministic PII redaction for persisted prompt snapshots (``AIJobContext``).
+
+The classifications run as ordered passes: each pass scans the output of the
+previous ones, so earlier patterns win on overlaps (``Main Street`` is a
+``SIMPLE_NAME`` before ``ADDRESS_LINE`` runs) and a number already replaced by
+a ``NUMBER`` token can no longer be read as part of a phone number. A single
+alternation regex scans left to right and picks the first alternative at the
+leftmost position instead, which changes both the tokens and the mapping, so
+the engine keeps the passes and makes each one cheap:
+
+- patterns are compiled once at import;
+- a pass is skipped when a plain substring / single-character prefilter shows
+  it cannot match the current text (no ``@`` -> no email, no digit -> no
+  number / phone / id code / address);
+- the email pass is anchored on ``@``: instead of trying the pattern at every
+  position it only matches from the start of the local-part run before each
+  ``@`` (the only place a left-to-right scan can find a match);
+- replacement tokens (sha256 fragment of the match) are memoized per
+  (value, classification), so repeated values hash once per process.
+
+``legacy_redact_with_mapping`` is the original implementation, kept as the
+reference for the differential tests and ``manage.py redaction_benchmark``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from functools import lru_cache
+
+MAX_REDACTED_LEN = 20000
+
+PATTERNS: list[tuple[str, str]] = [
+    (r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}', 'EMAIL'),
+    (r'\b\d{6,}\b', 'NUMBER'),
+    (r'\b\+?[0-9][0-9\-\s]{6,}[0-9]\b', 'PHONE'),
+    (r'\b[A-Z]{2}[0-9]{2,}\b', 'ID_CODE'),  # simplistic code/id pattern
+    (r'\b([A-Z][a-z]{1,15}\s[A-Z][a-z]{1,15})\b', 'SIMPLE_NAME'),
+    (r'\b\d+\s+[A-Z][A-Za-z]+\s+(Street|St|Road|Rd|Avenue|Ave|Boulevard|Blvd|Lane|Ln)\b', 'ADDRESS_LINE'),
+]
+
+_DIGIT_RE = re.compile(r'\d')  # Unicode digits: \d in NUMBER / ADDRESS_LINE matches them too
+_ASCII_DIGIT_RE = re.compile(r'[0-9]')
+_STREET_WORDS = ('St', 'Rd', 'Road', 'Ave', 'Blvd', 'Boulevard', 'Lane', 'Ln')
+
+
+def _has_digit(text: str) -> bool:
+    return _DIGIT_RE.search(text) is not None
+
+
+def _has_ascii_digit(text: str) -> bool:
+    return _ASCII_DIGIT_RE.search(text) is not None
+
+
+def _may_be_address(text: str) -> bool:
+    return any(word in text for word in _STREET_WORDS) and _has_digit(text)
+
+
+# Necessary (not sufficient) condition per classification; None = always scan
+_PREFILTERS = {
+    'EMAIL': lambda text: '@' in text,
+    'NUMBER': _has_digit,
+    'PHONE': _has_ascii_digit,
+    'ID_CODE': _has_ascii_digit,
+    'SIMPLE_NAME': None,
+    'ADDRESS_LINE': _may_be_address,
+}
+_COMPILED = [(re.compile(pattern), cls, _PREFILTERS.get(cls)) for pattern, cls in PATTERNS]
+_EMAIL_LOCAL = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-')
+
+
+def _sub_at_anchors(regex: re.Pattern, text: str, repl) -> str:
+    """``regex.sub(repl, text)`` for the EMAIL pattern, trying matches only around each ``@``.
+
+    A match must contain an ``@`` preceded by local-part characters, and a left-to-right scan
+    reaches the first character of that run (or the end of the previous match) first: the
+    greedy local part then runs exactly to the ``@``. If the domain fails there, every later
+    start in the same run fails the same way.
+    """
+    out: list[str] = []
+    pos = 0
+    at = text.find('@')
+    while at != -1:
+        start = at
+        while start > pos and text[start - 1] in _EMAIL_LOCAL:
+            start -= 1
+        m = regex.match(text, start) if start < at else None
+        if m is None:
+            at = text.find('@', at + 1)
+            continue
+        out.append(text[pos:start])
+        out.append(repl(m))
+        pos = m.end()
+        at = text.find('@', pos)
+    if not out:
+        return text
+    out.append(text[pos:])
+    return ''.join(out)
+
+
+@lru_cache(maxsize=8192)
+def _token(value: str, cls: str) -> str:
+    return f'[{cls}_{hashlib.sha256(value.encode("utf-8")).hexdigest()[:10]}]'
+
+
+def redact_with_mapping(text: str) -> tuple[str, dict[str, str]]:
+    """(redacted text, token -> classification); identical to ``legacy_redact_with_mapping``."""
+    if not text:
+        return text, {}
+    mapping: dict[str, str] = {}
+    redacted = text
+    for regex, cls, prefilter in _COMPILED:
+        if prefilter is not None and not prefilter(redacted):
+            continue
+
+        def repl(m, _c=cls):
+            tok = _token(m.group(0), _c)
+            mapping.setdefault(tok, _c)
+            return tok
+
+        redacted = _sub_at_anchors(regex, redacted, repl) if cls == 'EMAIL' else regex.sub(repl, redacted)
+    if len(redacted) > MAX_REDACTED_LEN:
+        redacted = redacted[:MAX_REDACTED_LEN] + '…'
+    return redacted, mapping
+
+
+def legacy_redact_with_mapping(text: str) -> tuple[str, dict[str, str]]:
+    """Original six-pass ``re.sub`` implementation (reference for tests and benchmarks)."""
+    if not text:
+        return text, {}
+    mapping: dict[str, str] = {}
+
+    def token_for(val: str, cls: str) -> str:
+        h = hashlib.sha256(val.encode('utf-8')).hexdigest()[:10]
+        return f'[{cls}_{h}]'
+
+    redacted = text
+    for pattern, classification in PATTERNS:
+
+        def repl(m, _c=classification):  # bind current classification
+            val = m.group(0)
+            tok = token_for(val, _c)
+            mapping.setdefault(tok, _c)
+            return tok
+
+        redacted = re.sub(pattern, repl, redacted)
+
+    if len(redacted) > MAX_REDACTED_LEN:
+        redacted = redacted[:MAX_REDACTED_LEN] + '…'
+    return redacted, mapping
+
+
+__all__ = [
+    'MAX_REDACTED_LEN',
+    'PATTERNS',
+    'legacy_redact_with_mapping',
+    'redact_with_mapping',
+]
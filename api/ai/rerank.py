@@ -0,0 +1,103 @@
+"""Diversity reranking for retrieval results (maximal marginal relevance).
+
+Adjacent chunks of one resource often restate the same thing; a plain top-k
+then spends the token budget on near-duplicates. ``mmr_select`` greedily picks
+the candidate maximizing ``lambda * relevance - (1 - lambda) * max_sim_to_picked``
+over a candidate pool, with:
+  - per-resource caps (``max_per_group``),
+  - near-duplicate collapsing (candidates with cosine >= ``dup_threshold`` to an
+    already picked chunk are dropped).
+
+The pairwise similarity matrix of the pool is one matrix product; each greedy
+step is a vectorized argmax, so the cost is O(pool^2) on a pool of a few dozen.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class RerankStats:
+    pool: int = 0
+    selected: int = 0
+    collapsed: int = 0  # dropped as near-duplicates of a picked chunk
+    capped: int = 0  # dropped by the per-resource cap (after backfill)
+    distinct_resources: int = 0
+    mean_similarity: float = 0.0  # mean pairwise cosine among picked chunks (lower = more diverse)
+
+    def as_dict(self) -> dict:
+        return {
+            'rerank_pool': self.pool,
+            'rerank_selected': self.selected,
+            'rerank_collapsed': self.collapsed,
+            'rerank_capped': self.capped,
+            'distinct_resources': self.distinct_resources,
+            'mean_similarity': round(self.mean_similarity, 4),
+        }
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    vectors: np.ndarray,
+    groups: np.ndarray,
+    k: int,
+    *,
+    lambda_: float = 0.7,
+    max_per_group: int = 0,
+    dup_threshold: float = 1.0,
+) -> tuple[list[int], RerankStats]:
+    """Pick up to ``k`` pool positions; returns (positions in pick order, stats).
+
+    ``vectors`` rows must be unit length. Pool order breaks ties (pass candidates best-first, by id).
+    ``max_per_group=0`` disables the cap; ``dup_threshold>=1`` disables collapsing. When the cap leaves
+    fewer than ``k`` picks, capped candidates backfill in pool order.
+    """
+    n = int(relevance.shape[0])
+    stats = RerankStats(pool=n)
+    if not n or k <= 0:
+        return [], stats
+    sim = vectors @ vectors.T
+    max_sim = np.zeros(n, dtype=np.float64)  # similarity to the closest picked chunk (0 until something is picked)
+    available = np.ones(n, dtype=bool)
+    per_group: dict[int, int] = {}
+    picked: list[int] = []
+    capped: list[int] = []
+    while len(picked) < k and available.any():
+        gain = np.where(available, lambda_ * relevance - (1 - lambda_) * max_sim, -np.inf)
+        pos = int(np.argmax(gain))
+        picked.append(pos)
+        available[pos] = False
+        group = int(groups[pos])
+        per_group[group] = per_group.get(group, 0) + 1
+        if max_per_group and per_group[group] >= max_per_group:
+            full = available & (groups == group)
+            capped.extend(np.flatnonzero(full).tolist())
+            available &= ~full
+        if dup_threshold < 1.0:
+            dups = available & (sim[pos] >= dup_threshold)
+            stats.collapsed += int(dups.sum())
+            available &= ~dups
+        max_sim = np.maximum(max_sim, sim[pos])
+    # Too few distinct resources to fill k: backfill with capped (not duplicate) chunks, best first
+    if len(picked) < k and capped:
+        taken = set(picked)
+        for pos in sorted(capped):
+            if len(picked) >= k:
+                break
+            if pos in taken or (dup_threshold < 1.0 and float(sim[pos, picked].max()) >= dup_threshold):
+                continue
+            picked.append(pos)
+            taken.add(pos)
+    stats.capped = len(set(capped) - set(picked))
+    stats.selected = len(picked)
+    stats.distinct_resources = len({int(groups[p]) for p in picked})
+    if len(picked) > 1:
+        sub = sim[np.ix_(picked, picked)]
+        stats.mean_similarity = float((sub.sum() - np.trace(sub)) / (len(picked) * (len(picked) - 1)))
+    return picked, stats
+
+
+__all__ = ['RerankStats', 'mmr_select']
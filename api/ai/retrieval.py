@@ -2,13 +2,24 @@
 
 from __future__ import annotations
 
+import time
 from typing import Sequence, Iterable
 from math import sqrt
+import numpy as np
+from django.conf import settings
+
 from .models import AIChunk
-from .embedding_service import embed_texts
+from .embedding_service import EmbeddingService, previous_service
+from . import chunk_index, lexical_index
+from .chunk_index import ChunkFilter
+from .rerank import mmr_select
+from .timing import timed
+from .tokenization import count_tokens
 
 
 def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    if len(a) != len(b):  # vectors of different embedding models are not comparable
+        return 0.0
     num = sum(x * y for x, y in zip(a, b))
     da = sqrt(sum(x * x for x in a)) or 1.0
     db = sqrt(sum(y * y for y in b)) or 1.0
@@ -19,7 +30,7 @@ def _trim_to_token_budget(chunks: Iterable[dict], *, max_tokens: int = 1200) ->
     out: list[dict] = []
     used = 0
     for ch in chunks:
-        tlen = ch.get('token_len') or len(ch.get('text', '').split())
+        tlen = ch.get('token_len') or count_tokens(ch.get('text', ''))
         if used + tlen > max_tokens:
             break
         used += tlen
@@ -27,33 +38,166 @@ def _trim_to_token_budget(chunks: Iterable[dict], *, max_tokens: int = 1200) ->
     return out
 
 
-def retrieve_top_k(query_text: str, *, k: int = 6, token_budget: int | None = None) -> list[dict]:
+def _retrieval_mode(mode: str | None) -> str:
+    mode = (mode or getattr(settings, 'AI_RETRIEVAL_MODE', 'vector') or 'vector').lower()
+    return mode if mode in ('vector', 'hybrid') else 'vector'
+
+
+def _hybrid_hits(
+    query_text: str,
+    q_vec: Sequence[float],
+    k: int,
+    filters: ChunkFilter | None = None,
+    model: str | None = None,
+    timings: dict | None = None,
+) -> list[tuple[chunk_index.ChunkHit, float, float]]:
+    """Reciprocal rank fusion of BM25 and vector rankings over a short candidate list.
+
+    Candidates = BM25 top-N ∪ vector-index top-N (both within ``filters``); only those are cosine-scored exactly.
+    Returns ``(hit, fused_score, bm25_score)`` ordered by (-fused, chunk_id).
+    """
+    n = max(k, int(getattr(settings, 'AI_HYBRID_CANDIDATES', 50) or 50))
+    rrf_k = int(getattr(settings, 'AI_RRF_K', 60) or 60)
+    scoped = filters is not None and not filters.is_empty()
+    # The lexical index is unpartitioned: over-fetch when filtered, then drop out-of-scope ids
+    with timed(timings, 'lexical_ms'):
+        lexical = lexical_index.search(query_text, n * 4 if scoped else n)
+    lexical_ids = [cid for cid, _ in lexical]
+    lexical_scored = chunk_index.score_candidates(q_vec, lexical_ids, filters=filters, model=model, timings=timings)
+    in_scope = {h.chunk_id for h in lexical_scored}
+    lexical = [(cid, score) for cid, score in lexical if cid in in_scope][:n]
+    lexical_rank = {chunk_id: rank for rank, (chunk_id, _) in enumerate(lexical, start=1)}
+    bm25 = dict(lexical)
+    scored = [h for h in lexical_scored if h.chunk_id in lexical_rank]
+    vector_hits = chunk_index.search(q_vec, n, filters=filters, model=model, timings=timings)
+    scored += [h for h in vector_hits if h.chunk_id not in lexical_rank]
+    scored.sort(key=lambda h: (-h.score, h.chunk_id))
+    fused = []
+    for rank, hit in enumerate(scored, start=1):
+        score = 1.0 / (rrf_k + rank)
+        if hit.chunk_id in lexical_rank:
+            score += 1.0 / (rrf_k + lexical_rank[hit.chunk_id])
+        fused.append((hit, score, bm25.get(hit.chunk_id, 0.0)))
+    fused.sort(key=lambda x: (-x[1], x[0].chunk_id))
+    return fused[:k]
+
+
+def _mmr_rerank(ranked: list[tuple], relevance: list[float], k: int, metrics: dict | None, model: str) -> list[tuple]:
+    """Diversify a best-first candidate pool with MMR + per-resource caps (see ``ai/rerank.py``)."""
+    t0 = time.perf_counter()
+    found, vectors = chunk_index.vectors_for([hit.chunk_id for hit, _ in ranked], model=model)
+    if len(found) != len(ranked):  # index changed underneath us: keep relevance order
+        return ranked[:k]
+    picked, stats = mmr_select(
+        np.asarray(relevance, dtype=np.float64),
+        vectors,
+        np.array([hit.resource_id for hit, _ in ranked], dtype=np.int64),
+        k,
+        lambda_=float(getattr(settings, 'AI_MMR_LAMBDA', 0.7)),
+        max_per_group=int(getattr(settings, 'AI_MAX_CHUNKS_PER_RESOURCE', 2) or 0),
+        dup_threshold=float(getattr(settings, 'AI_MMR_DUP_THRESHOLD', 0.95)),
+    )
+    if metrics is not None:
+        metrics.update(stats.as_dict(), rerank_ms=round((time.perf_counter() - t0) * 1000, 3))
+    return [ranked[p] for p in picked]
+
+
+def _query_vector(query_text: str) -> tuple[list[float], str]:
+    """Query embedding plus the model whose chunk vectors it may be compared with.
+
+    Dual-read (``AI_EMBEDDING_PREVIOUS_BACKEND``): the previous model serves until the active model's
+    index covers the corpus (``chunk_index.choose_model``).
+    """
+    service = EmbeddingService.instance()
+    previous = previous_service()
+    if previous is not None:
+        serving = chunk_index.choose_model(service.model_name, service.dim, previous.model_name)
+        if serving == previous.model_name:
+            service = previous
+    vectors, model = service.embed_with_model([query_text])
+    return vectors[0], model
+
+
+def retrieve_top_k(
+    query_text: str,
+    *,
+    k: int = 6,
+    token_budget: int | None = None,
+    mode: str | None = None,
+    filters: ChunkFilter | None = None,
+    rerank: bool | None = None,
+    metrics: dict | None = None,
+) -> list[dict]:
+    """Top-k chunks for ``query_text``, optionally scoped by ``filters`` (applied in the index before scoring).
+
+    ``mode`` (default ``AI_RETRIEVAL_MODE``): ``vector`` ranks by cosine; ``hybrid`` fuses BM25 and
+    cosine rankings (RRF), where ``score`` is the fused score and ``vector_score`` / ``lexical_score``
+    carry the components.
+
+    ``rerank`` (default ``AI_RETRIEVAL_MMR``) diversifies a larger candidate pool with MMR, per-resource
+    caps and near-duplicate collapsing; reranking cost/diversity figures are added to ``metrics``.
+
+    Chunks without a stored vector are skipped (never embedded on the request path) and counted in
+    ``metrics['unembedded_skipped']``; ``backfill_chunk_embeddings`` embeds them asynchronously.
+
+    Stage timers are accumulated into ``metrics`` (``ai/timing.py``): ``embed_ms`` (query embedding),
+    ``fetch_ms`` (index sync + chunk text read), ``decode_ms`` (stored vectors decoded by a sync),
+    ``score_ms`` (index scoring), ``lexical_ms`` (hybrid only), ``rerank_ms``, ``retrieval_ms`` (total)
+    and ``candidates_scored`` (vectors compared with the query).
+    """
     if not query_text:
         return []
-    q_vec = embed_texts([query_text])[0]
-    chunks = AIChunk.objects.all().select_related('resource')[:500]  # soft cap for now
-    scored = []
-    for ch in chunks:
-        if ch.embedding:
-            c_vec = ch.embedding
-        else:
-            # Backfill missing embedding (older rows); store once
-            c_vec = embed_texts([ch.text])[0]
-            AIChunk.objects.filter(pk=ch.pk).update(embedding=c_vec)  # pragma: no cover
-        score = _cosine(q_vec, c_vec)
-        scored.append((score, ch))
-    # Deterministic ordering: sort by (-score, chunk_id)
-    scored.sort(key=lambda x: (-x[0], x[1].id))
+    with timed(metrics, 'retrieval_ms'):
+        return _retrieve(query_text, k, token_budget, mode, filters, rerank, metrics)
+
+
+def _retrieve(
+    query_text: str,
+    k: int,
+    token_budget: int | None,
+    mode: str | None,
+    filters: ChunkFilter | None,
+    rerank: bool | None,
+    metrics: dict | None,
+) -> list[dict]:
+    with timed(metrics, 'embed_ms'):
+        q_vec, model = _query_vector(query_text)
+    rerank = bool(getattr(settings, 'AI_RETRIEVAL_MMR', True)) if rerank is None else rerank
+    pool = k * max(1, int(getattr(settings, 'AI_MMR_POOL_FACTOR', 4) or 1)) if rerank else k
+    if _retrieval_mode(mode) == 'hybrid':
+        fused_hits = _hybrid_hits(query_text, q_vec, pool, filters, model, metrics)
+        ranked = [
+            (hit, {'score': round(fused, 6), 'vector_score': round(hit.score, 4), 'lexical_score': round(lex, 4)})
+            for hit, fused, lex in fused_hits
+        ]
+        top = max((f for _, f, _ in fused_hits), default=1.0) or 1.0
+        relevance = [f / top for _, f, _ in fused_hits]  # fused RRF scores rescaled to [0, 1]
+    else:
+        # Index search covers the whole chunk table; ordering is (-score, chunk_id). The index carries the
+        # chunk metadata, so only the winners' text is read from the database.
+        hits = chunk_index.search(q_vec, pool, filters=filters, model=model, timings=metrics)
+        ranked = [(hit, {'score': round(hit.score, 4)}) for hit in hits]
+        relevance = [hit.score for hit in hits]
+    ranked = _mmr_rerank(ranked, relevance, k, metrics, model) if rerank else ranked[:k]
+    if metrics is not None:
+        metrics['embedding_model'] = model  # shows when a dual-read upgrade has switched models
+    if metrics is not None and chunk_index.unembedded_count(model):
+        metrics['unembedded_skipped'] = chunk_index.unembedded_count(model)  # not searchable until the backfill runs
+    with timed(metrics, 'fetch_ms'):
+        texts = dict(AIChunk.objects.filter(id__in=[h.chunk_id for h, _ in ranked]).values_list('id', 'text'))
     out = []
-    for score, ch in scored[:k]:
+    for hit, scores in ranked:
+        text = texts.get(hit.chunk_id)
+        if text is None:  # deleted since the index was synced
+            continue
         out.append(
             {
-                'chunk_id': ch.id,
-                'resource_id': ch.resource_id,
-                'score': round(score, 4),
-                'text': ch.text,
-                'type': ch.resource.type,
-                'token_len': ch.token_len,
+                'chunk_id': hit.chunk_id,
+                'resource_id': hit.resource_id,
+                **scores,
+                'text': text,
+                'type': hit.type,
+                'token_len': hit.token_len,
             }
         )
     if token_budget is not None:
@@ -61,11 +205,32 @@ def retrieve_top_k(query_text: str, *, k: int = 6, token_budget: int | None = No
     return out
 
 
-def retrieve_for_plan(grant_url: str | None, text_spec: str | None, *, token_budget: int | None = None) -> list[dict]:
+def retrieve_for_plan(
+    grant_url: str | None,
+    text_spec: str | None,
+    *,
+    token_budget: int | None = None,
+    org_id: str | None = None,
+    types: Sequence[str] | None = None,
+    metrics: dict | None = None,
+) -> list[dict]:
+    """Plan context: call snapshots limited to this grant's URL (when given), scoped to the org."""
     query = (text_spec or '') + ' ' + (grant_url or '')
-    return retrieve_top_k(query.strip(), k=6, token_budget=token_budget)
+    filters = ChunkFilter(types=tuple(types) if types else None, org_id=org_id, call_url=grant_url or None)
+    return retrieve_top_k(query.strip(), k=6, token_budget=token_budget, filters=filters, metrics=metrics)
 
 
-def retrieve_for_section(section_id: str, answers: dict[str, str] | None, *, token_budget: int | None = None) -> list[dict]:
+def retrieve_for_section(
+    section_id: str,
+    answers: dict[str, str] | None,
+    *,
+    token_budget: int | None = None,
+    org_id: str | None = None,
+    call_url: str | None = None,
+    types: Sequence[str] | None = None,
+    metrics: dict | None = None,
+) -> list[dict]:
+    """Section context scoped like ``retrieve_for_plan`` (``call_url`` = the proposal's call)."""
     base = section_id + ' ' + ' '.join((answers or {}).values())
-    return retrieve_top_k(base.strip(), k=6, token_budget=token_budget)
+    filters = ChunkFilter(types=tuple(types) if types else None, org_id=org_id, call_url=call_url or None)
+    return retrieve_top_k(base.strip(), k=6, token_budget=token_budget, filters=filters, metrics=metrics)
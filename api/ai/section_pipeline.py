@@ -10,7 +10,7 @@ from proposals.models import ProposalSection
 
 def get_section(section_id: str) -> ProposalSection | None:
     try:
-        return ProposalSection.objects.get(id=section_id)
+        return ProposalSection.objects.select_related('proposal').get(id=section_id)
     except (ProposalSection.DoesNotExist, ValueError):  # invalid uuid/int or missing
         return None
 
@@ -1,515 +1,544 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable
+
 from celery import shared_task
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from .provider import get_provider
 import time
-from .models import AIJob, AIMetric, AIJobContext
-from .prompting import render_role_prompt, PromptTemplateError
+from .models import AIChunk, AICorpusState, AIJob, AIMetric, AIJobContext
+from .prompting import get_compiled_template, render_role_prompt, PromptTemplateError
 from . import retrieval
 from .section_pipeline import get_section, save_write_result, apply_revision
 from .validators import validate_role_output, SchemaError
 from .diff_engine import diff_texts
 from .section_materializer import materialize_sections
+from .timing import add_ms, timed
 
 
 def _provider():
     return get_provider(getattr(settings, 'AI_PROVIDER', None))
 
 
+def _stage_timers(stages: dict) -> dict:
+    """Timer and count entries of a job's stage metrics, as stored on ``AIMetric.stages``."""
+    return {k: v for k, v in stages.items() if k.endswith('_ms') or k == 'candidates_scored'}
+
+
+def _call_url(section) -> str | None:
+    """Call URL of the section's proposal (scopes call-snapshot retrieval to that call)."""
+    try:
+        return (section.proposal.call_url or None) if section is not None else None
+    except Exception:  # pragma: no cover - defensive
+        return None
+
+
 @shared_task
-def run_plan(job_id: int):
-    job = AIJob.objects.get(id=job_id)
-    job.status = 'processing'
-    job.save(update_fields=['status'])
+def backfill_chunk_embeddings(batch: int = 256) -> int:
+    """Embed chunks that have no stored vector, in batches (queued by the vector index, never on a request).
+
+    Legacy JSON vectors are packed rather than re-embedded. Returns rows written.
+    """
+    from django.core.cache import cache
+
+    from .chunk_index import BACKFILL_LOCK
+    from .embedding_codec import pack_legacy_embeddings, storage_dtype, store_vectors
+    from .embedding_service import EmbeddingService, previous_service
+
     try:
-        prov = _provider()
-        t0 = time.time()
-        snippets = retrieval.retrieve_for_plan(job.input_json.get('grant_url'), job.input_json.get('text_spec'))
-        plan = prov.plan(grant_url=job.input_json.get('grant_url'), text_spec=job.input_json.get('text_spec'))
-        validation = {}
-        try:
-            validate_role_output('plan', plan)
-            validation = {'plan_valid': True}
-        except SchemaError as ve:  # pragma: no cover - simple failure path
-            validation = {'plan_valid': False, 'error': str(ve)[:200]}
-        # Render and store prompt snapshot
-        try:
-            rp = render_role_prompt(
-                role='planner',
-                variables={
-                    'grant_url': job.input_json.get('grant_url'),
-                    'text_spec': job.input_json.get('text_spec'),
-                },
-            )
-            # Recompute redaction with mapping for persisted context
-            redacted, red_map = AIJobContext.redact_with_mapping(rp.rendered)
-            from .models import AIPromptTemplate as _PT  # local import to avoid circular
-
-            template_sha = _PT.compute_checksum(rp.template.template) if rp.template else ''
-            AIJobContext.objects.create(
-                job=job,
-                prompt_template=rp.template,
-                prompt_version=rp.template.version if rp.template else 1,
-                rendered_prompt_redacted=redacted,
-                model_params={'deterministic': True},
-                snippet_ids=[s['chunk_id'] for s in snippets],
-                retrieval_metrics={'snippet_count': len(snippets), **validation},
-                template_sha256=template_sha,
-                redaction_map=red_map,
-            )
-        except PromptTemplateError as pe:  # pragma: no cover - unusual path
-            AIJobContext.objects.create(
-                job=job,
-                rendered_prompt_redacted=AIJobContext.redact(f'PLAN TEMPLATE ERROR: {pe}')[:5000],
-                model_params={'deterministic': True},
-                snippet_ids=[s['chunk_id'] for s in snippets],
-                retrieval_metrics={'snippet_count': len(snippets), **validation},
-            )
-        # Extract blueprint (same logic as sync endpoint) and materialize sections if proposal id present.
-        created_sections: list[str] = []
-        try:
-            blueprint = []
-            proposal_id_val = None
-            if isinstance(plan, dict):
-                if isinstance(plan.get('sections'), list):
-                    blueprint = plan.get('sections')  # type: ignore[assignment]
-                elif isinstance(plan.get('blueprint'), list):
-                    blueprint = plan.get('blueprint')  # type: ignore[assignment]
-                proposal_id_val = plan.get('proposal_id')
-            if proposal_id_val and blueprint:
-                mat = materialize_sections(proposal_id=int(proposal_id_val), blueprint=blueprint)
-                created_sections = [s.key for (s, c) in mat if c]
-        except Exception as me:  # pragma: no cover - defensive
-            created_sections = ['error:' + str(me)[:120]]
-        job.result_json = {  # type: ignore[assignment]
-            'plan': plan,
-            'created_sections': created_sections,
-        }
-        job.status = 'done'
-        dt_ms = int((time.time() - t0) * 1000)
-        try:
-            AIMetric.objects.create(
-                type='plan',
-                model_id='n/a',
-                duration_ms=dt_ms,
-                tokens_used=0,
-                success=True,
-                created_by=job.created_by,
-                org_id=job.org_id,
-            )
-        except Exception:
-            pass
-        job.save(update_fields=['result_json', 'status'])
-    except Exception as e:  # noqa: BLE001
-        job.status = 'error'
-        job.error_text = str(e)
-        try:
-            AIMetric.objects.create(
-                type='plan',
-                model_id='n/a',
-                duration_ms=0,
-                tokens_used=0,
-                success=False,
-                error_text=job.error_text,
-                created_by=job.created_by,
-                org_id=job.org_id,
+        written = pack_legacy_embeddings(AIChunk, batch=batch, dtype=storage_dtype())
+        service = previous_service() or EmbeddingService.instance()  # chunk rows hold the served model's vectors
+        last_id = 0
+        while True:
+            rows = list(
+                AIChunk.objects.filter(id__gt=last_id, embedding_vec__isnull=True)
+                .order_by('id')
+                .values_list('id', 'text')[:batch]
             )
-        except Exception:
-            pass
-        job.save(update_fields=['status', 'error_text'])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            vectors, model = service.embed_with_model([r[1] for r in rows], memo=False)
+            written += store_vectors(AIChunk, [r[0] for r in rows], vectors, model=model)
+        if written:
+            # Existing rows gained vectors in place: indexes rebuild rather than append
+            AICorpusState.bump('vectors')
+            AICorpusState.bump()
+        return written
+    finally:
+        cache.delete(BACKFILL_LOCK)
 
 
 @shared_task
-def run_write(job_id: int):
-    job = AIJob.objects.get(id=job_id)
-    job.status = 'processing'
-    job.save(update_fields=['status'])
-    try:
-        prov = _provider()
-        t0 = time.time()
-        det_setting = getattr(settings, 'AI_DETERMINISTIC_SAMPLING', True)
-        try:
-            det_default = bool(False if str(det_setting) in ('0', 'false', 'False') else det_setting)
-        except Exception:
-            det_default = True
-        section_id = job.input_json.get('section_id') or ''
-        section_locked = False
-        section_obj = get_section(section_id) if section_id else None
-        if section_obj and section_obj.locked:
-            section_locked = True
-        if section_locked:
-            job.status = 'error'
-            job.error_text = 'section_locked'
-            job.save(update_fields=['status', 'error_text'])
-            return
-
-        # Retrieval & (future) budgeting
-        res_snippets = retrieval.retrieve_for_section(section_id, job.input_json.get('answers') or {})
-        allocation = {'snippets': res_snippets}  # placeholder until context budgeting integrated here
-
-        # Provider call
-        res = prov.write(
-            section_id=section_id,
-            answers=job.input_json.get('answers') or {},
-            file_refs=job.input_json.get('file_refs') or None,
-            deterministic=det_default,
-        )
+def refresh_grant_calls(limit: int = 0) -> dict:
+    """Re-fetch every tracked call URL (nightly beat); unchanged pages cost a 304, changed ones a chunk diff.
 
-        # Validation
-        validation = {}
-        try:
-            validate_role_output('write', {'draft': res.text})
-            validation = {'write_valid': True}
-        except SchemaError as ve:  # pragma: no cover
-            validation = {'write_valid': False, 'error': str(ve)[:200]}
+    Returns counts per outcome (``not_modified``, ``unchanged``, ``refreshed``, ``created``, ``failed``).
+    """
+    import logging
 
-        # Persist prompt context
-        try:
-            rp = render_role_prompt(
-                role='writer',
-                variables={
-                    'section_id': section_id,
-                    'answers_json': job.input_json.get('answers') or {},
-                    'file_refs_json': job.input_json.get('file_refs') or [],
-                },
-            )
-            redacted, red_map = AIJobContext.redact_with_mapping(rp.rendered)
-            from .models import AIPromptTemplate as _PT
-
-            template_sha = _PT.compute_checksum(rp.template.template) if rp.template else ''
-            AIJobContext.objects.create(
-                job=job,
-                prompt_template=rp.template,
-                prompt_version=rp.template.version if rp.template else 1,
-                rendered_prompt_redacted=redacted,
-                model_params={'deterministic': det_default},
-                snippet_ids=[s['chunk_id'] for s in res_snippets],
-                retrieval_metrics={
-                    'snippet_count': len(res_snippets),
-                    'used_snippets': len(allocation['snippets']),
-                    **validation,
-                },
-                template_sha256=template_sha,
-                redaction_map=red_map,
-            )
-        except PromptTemplateError as pe:  # pragma: no cover
-            AIJobContext.objects.create(
-                job=job,
-                rendered_prompt_redacted=AIJobContext.redact(f'WRITE TEMPLATE ERROR: {pe}')[:5000],
-                model_params={'deterministic': det_default},
-                snippet_ids=[s['chunk_id'] for s in res_snippets],
-                retrieval_metrics={
-                    'snippet_count': len(res_snippets),
-                    'used_snippets': len(allocation['snippets']),
-                    **validation,
-                },
-            )
+    from .ingestion import ingest_grant_call
+    from .models import AIResource
 
-        # Result & persistence
-        job.result_json = {  # type: ignore[assignment]
-            'draft_text': res.text,
-            'assets': [],
-            'tokens_used': res.usage_tokens,
-        }
-        section = get_section(section_id)
-        if section:
-            save_write_result(section, res.text)
-        job.status = 'done'
-
-        # Metrics
-        dt_ms = int((time.time() - t0) * 1000)
+    tracked = (
+        AIResource.objects.filter(type='call_snapshot')
+        .exclude(source_url='')
+        .order_by('source_url', 'org_id')
+        .values_list('source_url', 'org_id')
+        .distinct()
+    )
+    counts = {'urls': 0, 'not_modified': 0, 'unchanged': 0, 'refreshed': 0, 'created': 0, 'failed': 0}
+    for url, org_id in tracked[:limit] if limit else tracked:
+        counts['urls'] += 1
+        stats: dict = {}
         try:
-            AIMetric.objects.create(
-                type='write',
-                model_id=res.model_id,
-                duration_ms=dt_ms,
-                tokens_used=res.usage_tokens,
-                success=True,
-                created_by=job.created_by,
-                org_id=job.org_id,
-                proposal_id=job.input_json.get('proposal_id'),
-                section_id=section_id,
-            )
-        except Exception:
-            pass
-        job.save(update_fields=['result_json', 'status'])
-    except Exception as e:  # noqa: BLE001
-        job.status = 'error'
-        job.error_text = str(e)
-        try:
-            AIMetric.objects.create(
-                type='write',
-                model_id='',
-                duration_ms=0,
-                tokens_used=0,
-                success=False,
-                error_text=job.error_text,
-                created_by=job.created_by,
-                org_id=job.org_id,
-                proposal_id=job.input_json.get('proposal_id'),
-                section_id=job.input_json.get('section_id') or '',
-            )
-        except Exception:
-            pass
-        job.save(update_fields=['status', 'error_text'])
+            ingest_grant_call(url, org_id=org_id, stats=stats)
+        except Exception:  # noqa: BLE001 - one unreachable call must not stop the others
+            logging.getLogger(__name__).warning('refresh of %s failed', url, exc_info=True)
+            counts['failed'] += 1
+            continue
+        outcome = 'not_modified' if stats.get('fetch') == 'not_modified' else stats.get('outcome', 'created')
+        counts[outcome if outcome in counts else 'unchanged'] += 1
+    return counts
 
 
 @shared_task
-def run_revise(job_id: int):
-    job = AIJob.objects.get(id=job_id)
-    job.status = 'processing'
-    job.save(update_fields=['status'])
+def ingest_manifest_task(yaml_text: str, workers: int = 0, batch: int = 50) -> dict:
+    """Ingest a YAML manifest off the request path; returns the per-item report (``ManifestReport.as_dict``)."""
+    from .ingestion import ingest_manifest_report
+
+    return ingest_manifest_report(yaml_text, workers=workers, batch=batch).as_dict()
+
+
+# --- Job engine ---------------------------------------------------------------
+# Every AI job runs the same stages: load -> guard -> retrieve -> provider -> validate -> render -> persist.
+# A JobSpec supplies the role-specific parts; the engine owns status transitions, stage timers, the
+# prompt snapshot (AIJobContext) and the metric row. Only the 'processing' status is written up front;
+# the job result, its context, section side effects and the AIMetric row are committed in one transaction.
+
+
+@dataclass
+class JobRun:
+    """Per-job state passed between stages."""
+
+    job: AIJob
+    stages: dict = field(default_factory=dict)  # retrieval metrics + stage timers (ai/timing.py)
+    section: Any = None  # ProposalSection loaded once by the guard stage
+    snippets: list = field(default_factory=list)
+    deterministic: bool = True
+    output: Any = None  # provider return value (plan dict or AIResult)
+    result: dict = field(default_factory=dict)  # becomes job.result_json
+    validation: dict = field(default_factory=dict)
+    context_metrics: dict = field(default_factory=dict)  # role-specific AIJobContext.retrieval_metrics entries
+    model_id: str = ''
+    tokens: int = 0
+
+    @property
+    def input(self) -> dict:
+        return self.job.input_json or {}
+
+    @property
+    def section_id(self) -> str:
+        return self.input.get('section_id') or ''
+
+
+class JobBlocked(Exception):
+    """Raised by a guard: the job ends in ``error`` with ``reason`` and no provider call."""
+
+    def __init__(self, reason: str, metric_model_id: str = '') -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.metric_model_id = metric_model_id  # non-empty: record a failed AIMetric with this model id
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    type: str  # AIJob / AIMetric type
+    role: str  # prompt template role
+    call: Callable[[Any, JobRun], None]  # provider call; sets output, result, model_id, tokens
+    validate: Callable[[JobRun], dict]
+    variables: Callable[[JobRun], dict]  # prompt template variables
+    guard: Callable[[JobRun], None] | None = None
+    retrieve: Callable[[JobRun], list] | None = None
+    persist: Callable[[JobRun], None] | None = None  # side effects, run inside the final transaction
+    metric_fields: Callable[[JobRun], dict] = lambda run: {}
+    failure_model_id: str = ''
+    deterministic_setting: bool = False  # honour AI_DETERMINISTIC_SAMPLING (else always deterministic)
+
+
+def _deterministic_default() -> bool:
+    det_setting = getattr(settings, 'AI_DETERMINISTIC_SAMPLING', True)
     try:
-        prov = _provider()
-        t0 = time.time()
-        det_setting = getattr(settings, 'AI_DETERMINISTIC_SAMPLING', True)
-        try:
-            det_default = bool(False if str(det_setting) in ('0', 'false', 'False') else det_setting)
-        except Exception:
-            det_default = True
-        section_locked = False
-        sec_id = job.input_json.get('section_id') or ''
-        sec_obj = get_section(sec_id) if sec_id else None
-        if sec_obj and sec_obj.locked:
-            section_locked = True
-        if section_locked:
-            job.status = 'error'
-            job.error_text = 'section_locked'
-            job.save(update_fields=['status', 'error_text'])
-            return
-        # Revision cap enforcement (async path).
-        try:
-            if sec_obj is not None:
-                cap_raw = getattr(settings, 'PROPOSAL_SECTION_REVISION_CAP', 5)
-                try:
-                    cap_val = int(cap_raw) if cap_raw not in (None, '') else 5
-                except Exception:
-                    cap_val = 5
-                if cap_val <= 0:
-                    cap_val = 5
-                current_count = len(sec_obj.revisions or [])
-                if current_count >= cap_val:
-                    job.status = 'error'
-                    job.error_text = 'revision_cap_reached'
-                    job.save(update_fields=['status', 'error_text'])
-                    try:
-                        AIMetric.objects.create(
-                            type='revise',
-                            model_id='revision_cap_blocked',
-                            duration_ms=0,
-                            tokens_used=0,
-                            success=False,
-                            created_by=job.created_by,
-                            org_id=job.org_id,
-                            proposal_id=job.input_json.get('proposal_id'),
-                            section_id=sec_id,
-                            error_text='revision_cap_reached',
-                        )
-                    except Exception:
-                        pass
-                    return
-        except Exception:  # pragma: no cover
-            pass
-        rev_snippets = retrieval.retrieve_for_section(
-            job.input_json.get('section_id') or '',
-            {'change_request': job.input_json.get('change_request') or ''},
-        )
-        allocation = {'snippets': rev_snippets}
-        base_text = job.input_json.get('base_text') or ''
-        section_id = job.input_json.get('section_id') or ''
-        res = prov.revise(
-            base_text=base_text,
-            change_request=job.input_json.get('change_request') or '',
-            file_refs=job.input_json.get('file_refs') or None,
-            deterministic=det_default,
+        return bool(False if str(det_setting) in ('0', 'false', 'False') else det_setting)
+    except Exception:
+        return True
+
+
+def _validated(role: str, key: str, payload) -> dict:
+    try:
+        validate_role_output(role, payload)
+        return {f'{key}_valid': True}
+    except SchemaError as ve:  # pragma: no cover - simple failure path
+        return {f'{key}_valid': False, 'error': str(ve)[:200]}
+
+
+def _render_context(spec: JobSpec, run: JobRun) -> AIJobContext:
+    """Unsaved prompt snapshot (redacted render + mapping, template checksum) for the job."""
+    snippet_ids = [s['chunk_id'] for s in run.snippets]
+    try:
+        with timed(run.stages, 'render_ms'):
+            rp = render_role_prompt(role=spec.role, variables=spec.variables(run))
+    except PromptTemplateError as pe:  # pragma: no cover - unusual path
+        return AIJobContext(
+            job=run.job,
+            rendered_prompt_redacted=AIJobContext.redact(f'{spec.type.upper()} TEMPLATE ERROR: {pe}')[:5000],
+            model_params={'deterministic': run.deterministic},
+            snippet_ids=snippet_ids,
+            retrieval_metrics={'snippet_count': len(run.snippets), **run.context_metrics, **run.stages, **run.validation},
         )
-        diff_res = diff_texts(base_text, res.text)
-        validation = {}
-        try:
-            validate_role_output('revise', {'revised': res.text, 'diff': diff_res})
-            validation = {'revise_valid': True}
-        except SchemaError as ve:  # pragma: no cover
-            validation = {'revise_valid': False, 'error': str(ve)[:200]}
-        try:
-            rp = render_role_prompt(
-                role='reviser',
-                variables={
-                    'section_id': section_id,
-                    'base_text': base_text,
-                    'change_request': job.input_json.get('change_request') or '',
-                    'file_refs_json': job.input_json.get('file_refs') or [],
-                },
-            )
-            redacted, red_map = AIJobContext.redact_with_mapping(rp.rendered)
-            from .models import AIPromptTemplate as _PT
-
-            template_sha = _PT.compute_checksum(rp.template.template) if rp.template else ''
-            AIJobContext.objects.create(
-                job=job,
-                prompt_template=rp.template,
-                prompt_version=rp.template.version if rp.template else 1,
-                rendered_prompt_redacted=redacted,
-                model_params={'deterministic': det_default},
-                snippet_ids=[s['chunk_id'] for s in rev_snippets],
-                retrieval_metrics={
-                    'snippet_count': len(rev_snippets),
-                    'used_snippets': len(allocation['snippets']),
-                    'change_ratio': round(diff_res.get('change_ratio', 0), 4),
-                    **validation,
-                },
-                template_sha256=template_sha,
-                redaction_map=red_map,
-            )
-        except PromptTemplateError as pe:  # pragma: no cover
-            AIJobContext.objects.create(
-                job=job,
-                rendered_prompt_redacted=AIJobContext.redact(f'REVISE TEMPLATE ERROR: {pe}')[:5000],
-                model_params={'deterministic': det_default},
-                snippet_ids=[s['chunk_id'] for s in rev_snippets],
-                retrieval_metrics={
-                    'snippet_count': len(rev_snippets),
-                    'used_snippets': len(allocation['snippets']),
-                    'change_ratio': round(diff_res.get('change_ratio', 0), 4),
-                    **validation,
-                },
-            )
-        job.result_json = {'draft_text': res.text, 'diff': diff_res}  # type: ignore[assignment]
-        # Apply revision to section (keep as draft, don't auto-promote)
-        section = get_section(section_id)
-        if section:
-            apply_revision(section, res.text, promote=False)
+    return AIJobContext(
+        job=run.job,
+        prompt_template=rp.template,
+        prompt_version=rp.template.version if rp.template else 1,
+        rendered_prompt_redacted=rp.redacted,
+        model_params={'deterministic': run.deterministic},
+        snippet_ids=snippet_ids,
+        retrieval_metrics={'snippet_count': len(run.snippets), **run.context_metrics, **run.stages, **run.validation},
+        template_sha256=rp.template_sha256,
+        redaction_map=rp.redaction_map,
+    )
+
+
+def _finish_error(spec: JobSpec, run: JobRun, error_text: str, *, model_id: str | None, stages: bool = True) -> None:
+    """Mark the job failed and (if ``model_id`` is not None) record a failed metric, in one transaction."""
+    job = run.job
+    job.status = 'error'
+    job.error_text = error_text
+    with transaction.atomic():
+        job.save(update_fields=['status', 'error_text'])
+        if model_id is not None:
             try:
-                # Append revision log (user context optional if job.created_by absent)
-                section.append_revision(
-                    user_id=getattr(job.created_by, 'id', None),
-                    from_text=base_text,
-                    to_text=res.text,
-                    diff=diff_res,
-                    change_ratio=diff_res.get('change_ratio'),
-                )
-            except Exception:  # pragma: no cover - logging suppressed
+                with transaction.atomic():  # a metric failure must not lose the job status
+                    AIMetric.objects.create(
+                        type=spec.type,
+                        model_id=model_id,
+                        duration_ms=0,
+                        tokens_used=0,
+                        success=False,
+                        **({'stages': _stage_timers(run.stages)} if stages else {}),
+                        error_text=error_text,
+                        created_by_id=job.created_by_id,
+                        org_id=job.org_id,
+                        **spec.metric_fields(run),
+                    )
+            except Exception:
                 pass
-        job.status = 'done'
-        dt_ms = int((time.time() - t0) * 1000)
-        try:
-            AIMetric.objects.create(
-                type='revise',
-                model_id=res.model_id,
-                duration_ms=dt_ms,
-                tokens_used=res.usage_tokens,
-                success=True,
-                created_by=job.created_by,
-                org_id=job.org_id,
-                proposal_id=job.input_json.get('proposal_id'),
-                section_id=job.input_json.get('section_id') or '',
-            )
-        except Exception:
-            pass
-        job.save(update_fields=['result_json', 'status'])
-    except Exception as e:  # noqa: BLE001
-        job.status = 'error'
-        job.error_text = str(e)
-        try:
-            AIMetric.objects.create(
-                type='revise',
-                model_id='',
-                duration_ms=0,
-                tokens_used=0,
-                success=False,
-                error_text=job.error_text,
-                created_by=job.created_by,
-                org_id=job.org_id,
-                proposal_id=job.input_json.get('proposal_id'),
-                section_id=job.input_json.get('section_id') or '',
-            )
-        except Exception:
-            pass
-        job.save(update_fields=['status', 'error_text'])
 
 
-@shared_task
-def run_format(job_id: int):
-    job = AIJob.objects.get(id=job_id)
-    job.status = 'processing'
-    job.save(update_fields=['status'])
+def run_job(job_id: int, spec: JobSpec) -> None:
+    """Execute one AI job through the staged engine (see module comment above)."""
+    t0 = time.time()
+    run = JobRun(job=AIJob.objects.get(id=job_id))
+    run.job.status = 'processing'
+    AIJob.objects.filter(id=job_id).update(status='processing')
     try:
+        run.deterministic = _deterministic_default() if spec.deterministic_setting else True
+        with timed(run.stages, 'guard_ms'):
+            if spec.guard is not None:
+                spec.guard(run)
+        if spec.retrieve is not None:
+            run.snippets = spec.retrieve(run)
         prov = _provider()
-        t0 = time.time()
-        fmt_snippets = []  # formatting currently not retrieval-driven
-        res = prov.format_final(
-            full_text=job.input_json.get('full_text') or '',
-            template_hint=job.input_json.get('template_hint') or None,
-            file_refs=job.input_json.get('file_refs') or None,
-            deterministic=True,
-        )
-        validation = {}
-        try:
-            validate_role_output('format', {'formatted_markdown': res.text})
-            validation = {'format_valid': True}
-        except SchemaError as ve:  # pragma: no cover
-            validation = {'format_valid': False, 'error': str(ve)[:200]}
-        try:
-            rp = render_role_prompt(
-                role='formatter',
-                variables={
-                    'template_hint': job.input_json.get('template_hint') or '',
-                    'full_text': job.input_json.get('full_text') or '',
-                },
-            )
-            redacted, red_map = AIJobContext.redact_with_mapping(rp.rendered)
-            from .models import AIPromptTemplate as _PT
-
-            template_sha = _PT.compute_checksum(rp.template.template) if rp.template else ''
-            AIJobContext.objects.create(
-                job=job,
-                prompt_template=rp.template,
-                prompt_version=rp.template.version if rp.template else 1,
-                rendered_prompt_redacted=redacted,
-                model_params={'deterministic': True},
-                snippet_ids=[s['chunk_id'] for s in fmt_snippets],
-                retrieval_metrics={'snippet_count': 0, **validation},
-                template_sha256=template_sha,
-                redaction_map=red_map,
-            )
-        except PromptTemplateError as pe:  # pragma: no cover
-            AIJobContext.objects.create(
-                job=job,
-                rendered_prompt_redacted=AIJobContext.redact(f'FORMAT TEMPLATE ERROR: {pe}')[:5000],
-                model_params={'deterministic': True},
-                snippet_ids=[s['chunk_id'] for s in fmt_snippets],
-                retrieval_metrics={'snippet_count': 0, **validation},
-            )
-        job.result_json = {'formatted_text': res.text}  # type: ignore[assignment]
-        job.status = 'done'
-        dt_ms = int((time.time() - t0) * 1000)
-        try:
+        with timed(run.stages, 'provider_ms'):
+            spec.call(prov, run)
+        run.validation = spec.validate(run)
+        context = _render_context(spec, run)
+        job = run.job
+        with transaction.atomic():
+            persist_started = time.perf_counter()
+            if spec.persist is not None:
+                spec.persist(run)
+            context.save()
+            job.result_json = run.result  # type: ignore[assignment]
+            job.status = 'done'
+            job.save(update_fields=['result_json', 'status'])
+            add_ms(run.stages, 'persist_ms', time.perf_counter() - persist_started)  # the metric row is written last
             AIMetric.objects.create(
-                type='format',
-                model_id=res.model_id,
-                duration_ms=dt_ms,
-                tokens_used=res.usage_tokens,
+                type=spec.type,
+                model_id=run.model_id,
+                duration_ms=int((time.time() - t0) * 1000),
+                tokens_used=run.tokens,
                 success=True,
-                created_by=job.created_by,
+                stages=_stage_timers(run.stages),
+                created_by_id=job.created_by_id,
                 org_id=job.org_id,
-                proposal_id=job.input_json.get('proposal_id'),
+                **spec.metric_fields(run),
             )
-        except Exception:
-            pass
-        job.save(update_fields=['result_json', 'status'])
+    except JobBlocked as blocked:
+        model_id = blocked.metric_model_id or None
+        _finish_error(spec, run, blocked.reason, model_id=model_id, stages=False)
     except Exception as e:  # noqa: BLE001
-        job.status = 'error'
-        job.error_text = str(e)
-        try:
-            AIMetric.objects.create(
-                type='format',
-                model_id='',
-                duration_ms=0,
-                tokens_used=0,
-                success=False,
-                error_text=job.error_text,
-                created_by=job.created_by,
-                org_id=job.org_id,
-                proposal_id=job.input_json.get('proposal_id'),
+        _finish_error(spec, run, str(e), model_id=spec.failure_model_id)
+
+
+# --- Role specs ---------------------------------------------------------------
+
+
+def _plan_call(prov, run: JobRun) -> None:
+    run.output = prov.plan(grant_url=run.input.get('grant_url'), text_spec=run.input.get('text_spec'))
+    run.model_id = 'n/a'
+
+
+def _plan_persist(run: JobRun) -> None:
+    # Extract blueprint (same logic as sync endpoint) and materialize sections if proposal id present.
+    plan = run.output
+    created_sections: list[str] = []
+    try:
+        blueprint = []
+        proposal_id_val = None
+        if isinstance(plan, dict):
+            if isinstance(plan.get('sections'), list):
+                blueprint = plan.get('sections')  # type: ignore[assignment]
+            elif isinstance(plan.get('blueprint'), list):
+                blueprint = plan.get('blueprint')  # type: ignore[assignment]
+            proposal_id_val = plan.get('proposal_id')
+        if proposal_id_val and blueprint:
+            with transaction.atomic():  # savepoint: a failed materialization keeps the job's own writes
+                mat = materialize_sections(proposal_id=int(proposal_id_val), blueprint=blueprint)
+            created_sections = [s.key for (s, c) in mat if c]
+    except Exception as me:  # pragma: no cover - defensive
+        created_sections = ['error:' + str(me)[:120]]
+    run.result = {'plan': plan, 'created_sections': created_sections}
+
+
+def _section_guard(run: JobRun) -> None:
+    run.section = get_section(run.section_id) if run.section_id else None
+    if run.section is not None and run.section.locked:
+        raise JobBlocked('section_locked')
+
+
+def _revise_guard(run: JobRun) -> None:
+    _section_guard(run)
+    # Revision cap enforcement (async path).
+    if run.section is None:
+        return
+    cap_raw = getattr(settings, 'PROPOSAL_SECTION_REVISION_CAP', 5)
+    try:
+        cap_val = int(cap_raw) if cap_raw not in (None, '') else 5
+    except Exception:
+        cap_val = 5
+    if cap_val <= 0:
+        cap_val = 5
+    if len(run.section.revisions or []) >= cap_val:
+        raise JobBlocked('revision_cap_reached', metric_model_id='revision_cap_blocked')
+
+
+def _write_call(prov, run: JobRun) -> None:
+    res = prov.write(
+        section_id=run.section_id,
+        answers=run.input.get('answers') or {},
+        file_refs=run.input.get('file_refs') or None,
+        deterministic=run.deterministic,
+    )
+    run.output, run.model_id, run.tokens = res, res.model_id, res.usage_tokens
+    run.result = {'draft_text': res.text, 'assets': [], 'tokens_used': res.usage_tokens}
+    run.context_metrics['used_snippets'] = len(run.snippets)  # placeholder until context budgeting integrated here
+
+
+def _write_persist(run: JobRun) -> None:
+    if run.section is not None:
+        save_write_result(run.section, run.output.text)
+
+
+def _revise_call(prov, run: JobRun) -> None:
+    base_text = run.input.get('base_text') or ''
+    res = prov.revise(
+        base_text=base_text,
+        change_request=run.input.get('change_request') or '',
+        file_refs=run.input.get('file_refs') or None,
+        deterministic=run.deterministic,
+    )
+    diff_res = diff_texts(base_text, res.text)
+    run.output, run.model_id, run.tokens = res, res.model_id, res.usage_tokens
+    run.result = {'draft_text': res.text, 'diff': diff_res}
+    run.context_metrics.update(used_snippets=len(run.snippets), change_ratio=round(diff_res.get('change_ratio', 0), 4))
+
+
+def _revise_persist(run: JobRun) -> None:
+    # Apply revision to section (keep as draft, don't auto-promote)
+    section = run.section
+    if section is None:
+        return
+    diff_res = run.result['diff']
+    apply_revision(section, run.output.text, promote=False)
+    try:
+        # Append revision log (user context optional if job.created_by absent)
+        with transaction.atomic():
+            section.append_revision(
+                user_id=run.job.created_by_id,
+                from_text=run.input.get('base_text') or '',
+                to_text=run.output.text,
+                diff=diff_res,
+                change_ratio=diff_res.get('change_ratio'),
             )
-        except Exception:
-            pass
-        job.save(update_fields=['status', 'error_text'])
+    except Exception:  # pragma: no cover - logging suppressed
+        pass
+
+
+def _format_call(prov, run: JobRun) -> None:
+    res = prov.format_final(
+        full_text=run.input.get('full_text') or '',
+        template_hint=run.input.get('template_hint') or None,
+        file_refs=run.input.get('file_refs') or None,
+        deterministic=True,
+    )
+    run.output, run.model_id, run.tokens = res, res.model_id, res.usage_tokens
+    run.result = {'formatted_text': res.text}
+
+
+def _section_metric_fields(run: JobRun) -> dict:
+    return {'proposal_id': run.input.get('proposal_id'), 'section_id': run.section_id}
+
+
+PLAN = JobSpec(
+    type='plan',
+    role='planner',
+    retrieve=lambda run: retrieval.retrieve_for_plan(
+        run.input.get('grant_url'), run.input.get('text_spec'), org_id=run.job.org_id, metrics=run.stages
+    ),
+    call=_plan_call,
+    validate=lambda run: _validated('plan', 'plan', run.output),
+    variables=lambda run: {'grant_url': run.input.get('grant_url'), 'text_spec': run.input.get('text_spec')},
+    persist=_plan_persist,
+    failure_model_id='n/a',
+)
+WRITE = JobSpec(
+    type='write',
+    role='writer',
+    guard=_section_guard,
+    retrieve=lambda run: retrieval.retrieve_for_section(
+        run.section_id,
+        run.input.get('answers') or {},
+        org_id=run.job.org_id,
+        call_url=_call_url(run.section),
+        metrics=run.stages,
+    ),
+    call=_write_call,
+    validate=lambda run: _validated('write', 'write', {'draft': run.output.text}),
+    variables=lambda run: {
+        'section_id': run.section_id,
+        'answers_json': run.input.get('answers') or {},
+        'file_refs_json': run.input.get('file_refs') or [],
+    },
+    persist=_write_persist,
+    metric_fields=_section_metric_fields,
+    deterministic_setting=True,
+)
+REVISE = JobSpec(
+    type='revise',
+    role='reviser',
+    guard=_revise_guard,
+    retrieve=lambda run: retrieval.retrieve_for_section(
+        run.section_id,
+        {'change_request': run.input.get('change_request') or ''},
+        org_id=run.job.org_id,
+        call_url=_call_url(run.section),
+        metrics=run.stages,
+    ),
+    call=_revise_call,
+    validate=lambda run: _validated('revise', 'revise', {'revised': run.output.text, 'diff': run.result['diff']}),
+    variables=lambda run: {
+        'section_id': run.section_id,
+        'base_text': run.input.get('base_text') or '',
+        'change_request': run.input.get('change_request') or '',
+        'file_refs_json': run.input.get('file_refs') or [],
+    },
+    persist=_revise_persist,
+    metric_fields=_section_metric_fields,
+    deterministic_setting=True,
+)
+FORMAT = JobSpec(
+    type='format',
+    role='formatter',
+    call=_format_call,
+    validate=lambda run: _validated('format', 'format', {'formatted_markdown': run.output.text}),
+    variables=lambda run: {
+        'template_hint': run.input.get('template_hint') or '',
+        'full_text': run.input.get('full_text') or '',
+    },
+    metric_fields=lambda run: {'proposal_id': run.input.get('proposal_id')},
+)
+
+
+@shared_task
+def run_plan(job_id: int):
+    run_job(job_id, PLAN)
+
+
+@shared_task
+def run_write(job_id: int):
+    run_job(job_id, WRITE)
+
+
+@shared_task
+def run_revise(job_id: int):
+    run_job(job_id, REVISE)
+
+
+@shared_task
+def run_format(job_id: int):
+    run_job(job_id, FORMAT)
+
+
+# --- Job submission -----------------------------------------------------------
+# An SPA retry submits the same job again. Identical submissions (type, caller, org, input, deterministic
+# flag, active template version) share AIJob.idempotency_key; within AI_JOB_DEDUP_WINDOW seconds a repeat
+# is answered by the newest matching job: while it is queued/processing the caller is attached to it (no
+# second task), once done a deterministic result is served from its result_json (no provider call). Failed
+# jobs are never reused. Best effort: two submissions racing within the same few milliseconds both run.
+
+SPECS = {'plan': PLAN, 'write': WRITE, 'revise': REVISE, 'format': FORMAT}
+
+
+def job_idempotency_key(spec: JobSpec, input_json: dict, *, org_id: str, user_id: int | None, deterministic: bool) -> str:
+    compiled = get_compiled_template(spec.role)
+    payload = {
+        'type': spec.type,
+        'org': org_id,
+        'user': user_id,
+        'input': input_json,
+        'deterministic': deterministic,
+        'template': [compiled.template.version if compiled.template else 0, compiled.checksum],
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def submit_job(type_: str, input_json: dict, *, created_by=None, org_id: str = '') -> tuple[AIJob, str]:
+    """Create an async job, or answer with an identical recent one.
+
+    Returns ``(job, outcome)``; outcome is ``'created'`` (caller enqueues the task), ``'coalesced'``
+    (queued/processing job with the same key) or ``'reused'`` (done deterministic job with the same key).
+    """
+    spec = SPECS[type_]
+    window = int(getattr(settings, 'AI_JOB_DEDUP_WINDOW', 600) or 0)
+    key = ''
+    if window > 0:
+        deterministic = _deterministic_default() if spec.deterministic_setting else True
+        user_id = getattr(created_by, 'pk', None)
+        key = job_idempotency_key(spec, input_json, org_id=org_id, user_id=user_id, deterministic=deterministic)
+        since = timezone.now() - timedelta(seconds=window)
+        prior = AIJob.objects.filter(idempotency_key=key, created_at__gte=since).order_by('-id').first()
+        if prior is not None and prior.status in ('queued', 'processing'):
+            AIJob.objects.filter(id=prior.pk).update(coalesced_count=F('coalesced_count') + 1)
+            return prior, 'coalesced'
+        if prior is not None and prior.status == 'done' and deterministic:
+            AIJob.objects.filter(id=prior.pk).update(reused_count=F('reused_count') + 1)
+            return prior, 'reused'
+    job = AIJob.objects.create(type=type_, input_json=input_json, created_by=created_by, org_id=org_id, idempotency_key=key)
+    return job, 'created'
@@ -0,0 +1,120 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from ai import chunk_index
+from ai.embedding_codec import vector_fields
+from ai.embedding_service import embed_texts
+from ai.ingestion import create_resource_with_chunks
+from ai.models import AIChunk, AICorpusState, AIResource
+from ai.retrieval import retrieve_top_k
+
+
+class ChunkIndexTests(TestCase):
+    def setUp(self):
+        chunk_index.reset_index()
+
+    def test_retrieval_considers_chunks_beyond_former_cap(self):
+        res = AIResource.objects.create(type='sample', title='bulk', sha256='x' * 64)
+        filler = create_resource_with_chunks(type_='sample', title='f', source_url='', full_text='filler text')
+        dim = filler.chunks.first().embedding_dim  # type: ignore[attr-defined]
+        AIChunk.objects.bulk_create(
+            [AIChunk(resource=res, ord=i, text=f'row {i}', token_len=2, **vector_fields([0.0] * dim)) for i in range(600)]
+        )
+        target = create_resource_with_chunks(type_='template', title='t', source_url='', full_text='needle in the haystack')
+        out = retrieve_top_k('needle in the haystack', k=1)
+        self.assertEqual(out[0]['resource_id'], target.id)
+        self.assertEqual(out[0]['score'], 1.0)
+
+    def test_index_tracks_deletes(self):
+        r = create_resource_with_chunks(type_='sample', title='gone', source_url='', full_text='temporary content here')
+        self.assertEqual(retrieve_top_k('temporary content here', k=1)[0]['resource_id'], r.id)
+        r.delete()
+        self.assertEqual(retrieve_top_k('temporary content here', k=1), [])
+
+    def test_resource_delete_bumps_once_without_per_chunk_signals(self):
+        r = AIResource.objects.create(type='sample', title='many', sha256='y' * 64)
+        AIChunk.objects.bulk_create([AIChunk(resource=r, ord=i, text=f'row {i}', token_len=2) for i in range(50)])
+        before = AICorpusState.current()
+        with mock.patch.object(AICorpusState, 'bump', wraps=AICorpusState.bump) as bump:
+            r.delete()
+        bump.assert_called_once_with()
+        self.assertNotEqual(AICorpusState.current(), before)
+        self.assertFalse(AIChunk.objects.filter(resource_id=r.id).exists())
+
+    def test_index_persisted_to_disk_and_reloaded(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(AI_VECTOR_INDEX_DIR=tmp, AI_VECTOR_INDEX='flat'):
+            create_resource_with_chunks(type_='sample', title='p', source_url='', full_text='persist me please')
+            first = retrieve_top_k('persist me please', k=1)
+            self.assertTrue(any(name.endswith('.npz') for name in os.listdir(tmp)))
+            chunk_index.reset_index()
+            with self.assertNumQueries(2):  # corpus token and winning texts; no stamp check or rebuild
+                second = retrieve_top_k('persist me please', k=1)
+            self.assertEqual(first, second)
+
+    def test_unusable_index_dir_keeps_index_in_memory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            blocker = os.path.join(tmp, 'file')
+            open(blocker, 'w').close()
+            with override_settings(AI_VECTOR_INDEX_DIR=os.path.join(blocker, 'ai_index')), self.assertLogs('ai.chunk_index'):
+                r = create_resource_with_chunks(type_='sample', title='m', source_url='', full_text='memory only index')
+                self.assertEqual(retrieve_top_k('memory only index', k=1)[0]['resource_id'], r.id)
+
+    def test_unchanged_corpus_skips_sync_and_bump_triggers_refresh(self):
+        create_resource_with_chunks(type_='sample', title='a', source_url='', full_text='alpha bravo charlie')
+        retrieve_top_k('alpha bravo charlie', k=1)
+        with self.assertNumQueries(2):  # corpus token and winning texts
+            out = retrieve_top_k('alpha bravo charlie', k=1)
+        self.assertEqual(out[0]['type'], 'sample')
+        # A write from another process: rows appear and the token changes, no in-process index_chunks call
+        other = AIResource.objects.create(type='template', title='b', sha256='y' * 64)
+        vec = embed_texts(['delta echo foxtrot'])[0]
+        AIChunk.objects.create(resource=other, ord=0, text='delta echo foxtrot', token_len=3, **vector_fields(vec))
+        AICorpusState.bump()
+        out = retrieve_top_k('delta echo foxtrot', k=1)
+        self.assertEqual((out[0]['resource_id'], out[0]['type'], out[0]['token_len']), (other.id, 'template', 3))
+
+    def test_ingesting_process_adopts_token_without_resync(self):
+        create_resource_with_chunks(type_='sample', title='a', source_url='', full_text='first document body')
+        retrieve_top_k('first document body', k=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            r = create_resource_with_chunks(type_='sample', title='b', source_url='', full_text='second document body')
+        with self.assertNumQueries(2):
+            out = retrieve_top_k('second document body', k=1)
+        self.assertEqual(out[0]['resource_id'], r.id)
+
+
+class ChunkFilterTests(TestCase):
+    def setUp(self):
+        chunk_index.reset_index()
+        text = 'eligibility criteria for applicants'
+        self.mine = create_resource_with_chunks(
+            type_='call_snapshot', title='a', source_url='https://calls.example/a', full_text=text, org_id='1'
+        )
+        self.other_org = create_resource_with_chunks(
+            type_='call_snapshot', title='b', source_url='https://calls.example/a', full_text=text, org_id='2'
+        )
+        self.other_call = create_resource_with_chunks(
+            type_='call_snapshot', title='c', source_url='https://calls.example/c', full_text=text + '.', org_id=''
+        )
+        self.template = create_resource_with_chunks(type_='template', title='t', source_url='', full_text=text + '!')
+
+    def _resources(self, **filters):
+        out = retrieve_top_k('eligibility criteria for applicants', k=10, filters=chunk_index.ChunkFilter(**filters))
+        return {r['resource_id'] for r in out}
+
+    def test_org_scope_includes_shared_and_own_only(self):
+        self.assertEqual(self._resources(org_id='1'), {self.mine.id, self.other_call.id, self.template.id})
+
+    def test_call_url_limits_only_call_snapshots(self):
+        self.assertEqual(self._resources(org_id='1', call_url='https://calls.example/a'), {self.mine.id, self.template.id})
+
+    def test_type_and_source_url_filters(self):
+        self.assertEqual(self._resources(types=('template',)), {self.template.id})
+        self.assertEqual(self._resources(source_url='https://calls.example/c'), {self.other_call.id})
+        self.assertEqual(self._resources(types=('sample',)), set())
+
+    def test_hybrid_mode_respects_filters(self):
+        out = retrieve_top_k('eligibility criteria', k=10, mode='hybrid', filters=chunk_index.ChunkFilter(types=('template',)))
+        self.assertEqual({r['resource_id'] for r in out}, {self.template.id})
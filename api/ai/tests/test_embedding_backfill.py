@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from ai import chunk_index
+from ai.embedding_service import HASH_MODEL, embed_texts
+from ai.ingestion import create_resource_with_chunks
+from ai.models import AIChunk, AIResource
+from ai.retrieval import retrieve_top_k
+from ai.tasks import backfill_chunk_embeddings
+
+
+class EmbeddingBackfillTests(TestCase):
+    def setUp(self):
+        chunk_index.reset_index()
+        cache.clear()
+        create_resource_with_chunks(type_='sample', title='ok', source_url='', full_text='Embedded budget guidance.')
+        res = AIResource.objects.create(type='sample', title='cold', sha256='c' * 64)
+        legacy = embed_texts(['legacy budget row'])[0]
+        AIChunk.objects.bulk_create(
+            [AIChunk(resource=res, ord=i, text=f'cold budget row {i}', token_len=4) for i in range(3)]
+            + [AIChunk(resource=res, ord=3, text='legacy budget row', token_len=3, embedding=legacy)]
+        )
+
+    def test_retrieval_skips_unembedded_chunks_without_writing(self):
+        metrics: dict = {}
+        with CaptureQueriesContext(connection) as ctx:
+            out = retrieve_top_k('budget row', k=10, metrics=metrics)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "ai_aichunk"')])
+        texts = {r['text'] for r in out}
+        self.assertIn('legacy budget row', texts)  # legacy JSON vectors are read as-is
+        self.assertFalse(any(t.startswith('cold') for t in texts))
+        self.assertEqual(metrics['unembedded_skipped'], 3)
+        self.assertEqual(AIChunk.objects.filter(embedding_vec__isnull=True).count(), 4)
+
+    @override_settings(AI_ASYNC=True, CELERY_BROKER_URL='memory://')
+    def test_backfill_queued_once(self):
+        with mock.patch.object(backfill_chunk_embeddings, 'delay') as delay:
+            retrieve_top_k('budget row', k=3)
+            chunk_index.reset_index()
+            retrieve_top_k('budget row', k=3)
+        delay.assert_called_once_with()
+
+    def test_task_embeds_backlog_and_index_warms(self):
+        retrieve_top_k('budget row', k=3)
+        self.assertEqual(backfill_chunk_embeddings(batch=2), 4)
+        self.assertFalse(AIChunk.objects.filter(embedding_vec__isnull=True).exists())
+        self.assertEqual(AIChunk.objects.get(text='cold budget row 0').embedding_model, HASH_MODEL)
+        metrics: dict = {}
+        out = retrieve_top_k('cold budget row 1', k=1, metrics=metrics)
+        self.assertEqual(out[0]['text'], 'cold budget row 1')  # index rebuilt with the backfilled rows
+        self.assertNotIn('unembedded_skipped', metrics)
+
+    def test_metrics_summary_reports_backlog(self):
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(username='m', password='p'))
+        data = client.get('/api/ai/metrics/summary').json()
+        self.assertEqual(data['retrieval'], {'embedding_backlog': 4, 'index_warm': False})
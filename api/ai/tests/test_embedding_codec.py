@@ -0,0 +1,48 @@
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from ai.embedding_codec import decode_vector, encode_vector
+from ai.models import AIChunk, AIResource
+from ai.retrieval import retrieve_top_k
+
+
+class EmbeddingCodecTests(SimpleTestCase):
+    def test_round_trip_float32_and_float16(self):
+        vec = [0.25, -1.5, 3.0]
+        blob = encode_vector(vec, 'float32')
+        self.assertEqual(len(blob), 12)
+        out = decode_vector(blob, 'float32', 3)
+        self.assertEqual(out.tolist(), vec)
+        self.assertFalse(out.flags.writeable)  # zero-copy view over the bytes
+        half = decode_vector(memoryview(encode_vector(vec, 'float16')), 'float16', 3)
+        self.assertEqual(half.dtype, np.float16)
+        self.assertEqual(half.tolist(), vec)
+
+    def test_malformed_blobs_decode_to_none(self):
+        self.assertIsNone(decode_vector(None))
+        self.assertIsNone(decode_vector(b'\x00\x01\x02', 'float32'))
+        self.assertIsNone(decode_vector(encode_vector([1.0, 2.0]), 'float32', 3))
+        self.assertIsNone(decode_vector(encode_vector([1.0]), 'float64'))
+
+
+class PackLegacyEmbeddingsTests(TestCase):
+    def test_command_packs_json_vectors_and_retrieval_reads_them(self):
+        res = AIResource.objects.create(type='sample', title='legacy', sha256='y' * 64)
+        from ai.embedding_service import embed_texts
+
+        vec = embed_texts(['legacy chunk text'])[0]
+        ch = AIChunk.objects.create(resource=res, ord=0, text='legacy chunk text', token_len=3, embedding=vec)
+        out = StringIO()
+        call_command('pack_chunk_embeddings', stdout=out)
+        self.assertIn('Packed embeddings: 1 / 1', out.getvalue())
+        ch.refresh_from_db()
+        self.assertIsNone(ch.embedding)
+        self.assertEqual(ch.embedding_dim, len(vec))
+        np.testing.assert_allclose(ch.vector, vec, rtol=1e-6)
+        self.assertEqual(retrieve_top_k('legacy chunk text', k=1)[0]['chunk_id'], ch.id)
+        # Resumable: nothing left to convert
+        out = StringIO()
+        call_command('pack_chunk_embeddings', stdout=out)
+        self.assertIn('Packed embeddings: 0 / 0', out.getvalue())
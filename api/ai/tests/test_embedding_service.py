@@ -0,0 +1,102 @@
+import threading
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from ai.embedding_service import EmbeddingMemo, EmbeddingService, MicroBatcher
+
+
+class EmbeddingMemoTests(SimpleTestCase):
+    def test_repeat_texts_served_from_memo(self):
+        svc = EmbeddingService()
+        first = svc.embed(['section one answers', 'other'])
+        again = svc.embed(['section one answers', 'section one answers'])
+        self.assertEqual(again, [first[0], first[0]])
+        self.assertEqual(svc.memo.stats()['hits'], 1)  # duplicate keys within a call are looked up once
+        again[0][0] = -1.0  # callers get copies
+        self.assertEqual(svc.embed(['section one answers']), [first[0]])
+
+    def test_lru_eviction_and_ttl(self):
+        now = [0.0]
+        memo = EmbeddingMemo(max_size=2, ttl_seconds=10, clock=lambda: now[0])
+        memo.set_many({'a': [1.0], 'b': [2.0]})
+        memo.get_many(['a'])  # a becomes most recent
+        memo.set_many({'c': [3.0]})
+        self.assertEqual(sorted(memo.get_many(['a', 'b', 'c'])), ['a', 'c'])
+        now[0] = 11.0
+        self.assertEqual(memo.get_many(['a', 'c']), {})
+
+    def test_key_includes_backend_and_model(self):
+        self.assertNotEqual(EmbeddingMemo.key('hash', 'm1', 'x'), EmbeddingMemo.key('minilm', 'm1', 'x'))
+        self.assertNotEqual(EmbeddingMemo.key('hash', 'm1', 'x'), EmbeddingMemo.key('hash', 'm2', 'x'))
+
+    @override_settings(AI_EMBEDDING_CACHE_ALIAS='default')
+    def test_shared_cache_reused_across_instances(self):
+        caches['default'].clear()
+        vec = EmbeddingService().embed(['shared query'])[0]
+        other = EmbeddingService()
+        self.assertEqual(other.embed(['shared query'])[0], vec)
+        self.assertEqual(other.memo.stats()['hits'], 1)
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_concurrent_submits_share_one_encode(self):
+        calls = []
+
+        def encode(texts):
+            calls.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+        batcher = MicroBatcher(encode, window_ms=200, max_batch=4)
+        results = {}
+        barrier = threading.Barrier(4)
+
+        def worker(i):
+            barrier.wait()
+            results[i] = batcher.submit(['x' * i])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(1, 5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(calls[0]), ['x', 'xx', 'xxx', 'xxxx'])
+        self.assertEqual({i: r[0][0] for i, r in results.items()}, {1: 1.0, 2: 2.0, 3: 3.0, 4: 4.0})
+
+    def test_encode_error_reaches_caller(self):
+        def encode(texts):
+            raise RuntimeError('model down')
+
+        with self.assertRaises(RuntimeError):
+            MicroBatcher(encode, window_ms=0).submit(['q'])
+
+
+class OnnxBackendTests(SimpleTestCase):
+    def test_mean_pool_ignores_padding_and_normalizes(self):
+        import numpy as np
+        from ai.onnx_embedder import mean_pool
+
+        hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+        out = mean_pool(hidden, np.array([[1, 1, 0]]))
+        np.testing.assert_allclose(out, [[1.0, 0.0]])
+
+    @override_settings(AI_ONNX_QUANTIZED=True)
+    def test_onnx_backend_identity(self):
+        class Model:
+            def encode(self, texts, normalize_embeddings=True):
+                return [[0.5] * 384 for _ in texts]
+
+        with mock.patch.object(EmbeddingService, 'model_loader', staticmethod(lambda backend: Model())):
+            svc = EmbeddingService('onnx')
+        self.assertEqual((svc.backend, svc.model_name, svc.dim), ('onnx', 'MiniLM-L6-v2-onnx-int8', 384))
+        self.assertEqual(svc.embed(['q'])[0][:2], [0.5, 0.5])
+
+    def test_missing_runtime_falls_back_to_hash(self):
+        def loader(backend):
+            raise ImportError('No module named onnxruntime')
+
+        with mock.patch.object(EmbeddingService, 'model_loader', staticmethod(loader)):
+            svc = EmbeddingService('onnx')
+        self.assertEqual((svc.backend, svc.health()['state']), ('hash', 'failed'))
+        self.assertEqual(len(svc.embed(['q'])[0]), 32)
@@ -0,0 +1,104 @@
+import hashlib
+import os
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from ai import chunk_index
+from ai.embedding_codec import vector_fields
+from ai.embedding_service import HASH_MODEL, EmbeddingService, embed_texts
+from ai.ingestion import create_resource_with_chunks
+from ai.models import AIChunk, AIChunkEmbedding, AIResource
+from ai.retrieval import _cosine, retrieve_top_k
+
+
+class _FakeMiniLM:
+    def encode(self, texts, normalize_embeddings=True):
+        out = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], 'little')
+            vec = np.random.default_rng(seed).standard_normal(384)
+            out.append(vec / np.linalg.norm(vec))
+        return np.array(out)
+
+
+class CosineTests(SimpleTestCase):
+    def test_mismatched_dimensions_never_match(self):
+        self.assertEqual(_cosine([1.0] * 32, [1.0] * 384), 0.0)
+        self.assertAlmostEqual(_cosine([1.0, 0.0], [2.0, 0.0]), 1.0)
+
+
+class ModelScopedIndexTests(TestCase):
+    def setUp(self):
+        chunk_index.reset_index()
+
+    def test_search_only_reads_vectors_of_the_query_model(self):
+        res = AIResource.objects.create(type='sample', title='mixed', sha256='m' * 64)
+        texts = ['hash tagged', 'legacy untagged', 'minilm row', 'other 32-dim model']
+        vecs = embed_texts(texts)
+        AIChunk.objects.bulk_create(
+            [
+                AIChunk(resource=res, ord=0, text=texts[0], **vector_fields(vecs[0], model=HASH_MODEL)),
+                AIChunk(resource=res, ord=1, text=texts[1], **vector_fields(vecs[1])),
+                AIChunk(resource=res, ord=2, text=texts[2], **vector_fields([0.05] * 384, model='MiniLM-L6-v2')),
+                AIChunk(resource=res, ord=3, text=texts[3], **vector_fields(vecs[3], model='another-32d')),
+            ]
+        )
+        hits = chunk_index.search(embed_texts(['hash tagged'])[0], 10, model=HASH_MODEL)
+        texts_by_id = dict(AIChunk.objects.values_list('id', 'text'))
+        self.assertEqual(sorted(texts_by_id[h.chunk_id] for h in hits), ['hash tagged', 'legacy untagged'])
+
+
+class DualReadUpgradeTests(TestCase):
+    def setUp(self):
+        chunk_index.reset_index()
+        self._saved = EmbeddingService._instance
+        for i in range(3):
+            create_resource_with_chunks(type_='sample', title=f's{i}', source_url='', full_text=f'Old corpus text {i}.')
+        for patcher in (
+            mock.patch.dict(os.environ, {'EMBEDDING_BACKEND': 'minilm'}),
+            mock.patch.object(EmbeddingService, 'model_loader', staticmethod(lambda backend: _FakeMiniLM())),
+            mock.patch.object(chunk_index, '_spawn', lambda target: target()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        EmbeddingService._instance = EmbeddingService()  # active model: MiniLM (fake)
+
+    def tearDown(self):
+        EmbeddingService._instance = self._saved
+        EmbeddingService._others.clear()
+
+    @override_settings(AI_EMBEDDING_PREVIOUS_BACKEND='hash')
+    def test_previous_index_serves_until_new_model_covers_corpus(self):
+        out = retrieve_top_k('Old corpus text 1.', k=3)
+        self.assertEqual(out[0]['text'], 'Old corpus text 1.')  # previous (hash) index
+        self.assertIn(HASH_MODEL, chunk_index._slots)
+
+        # New ingestion during the upgrade: served model in the row, new model staged alongside
+        res = create_resource_with_chunks(type_='sample', title='new', source_url='', full_text='Fresh upgrade text.')
+        fresh = AIChunk.objects.get(resource=res)
+        self.assertEqual(fresh.embedding_model, HASH_MODEL)
+        self.assertTrue(AIChunkEmbedding.objects.filter(chunk=fresh, model='MiniLM-L6-v2').exists())
+
+        call_command('reembed_chunks', '--backend', 'minilm', stdout=StringIO())  # stages: dual-read is on
+        self.assertEqual(AIChunkEmbedding.objects.filter(model='MiniLM-L6-v2').count(), AIChunk.objects.count())
+        self.assertFalse(AIChunk.objects.exclude(embedding_model=HASH_MODEL).exists())
+
+        retrieve_top_k('Old corpus text 2.', k=3)  # new index rebuilt in the background (inline here)
+        metrics: dict = {}
+        out = retrieve_top_k('Old corpus text 2.', k=3, metrics=metrics)
+        self.assertEqual(metrics['embedding_model'], 'MiniLM-L6-v2')
+        self.assertEqual(out[0]['text'], 'Old corpus text 2.')
+        self.assertGreater(out[0]['score'], 0.99)
+        self.assertNotIn(HASH_MODEL, chunk_index._slots)  # switched; previous index dropped
+
+        call_command('reembed_chunks', '--backend', 'minilm', '--promote', stdout=StringIO())
+        self.assertFalse(AIChunkEmbedding.objects.exists())
+        self.assertFalse(AIChunk.objects.exclude(embedding_model='MiniLM-L6-v2').exists())
+        self.assertEqual(retrieve_top_k('Fresh upgrade text.', k=1)[0]['text'], 'Fresh upgrade text.')
+
+    def test_without_dual_read_old_vectors_are_not_compared(self):
+        out = retrieve_top_k('Old corpus text 1.', k=3)
+        self.assertEqual(out, [])  # no MiniLM vectors yet: nothing comparable, never garbage scores
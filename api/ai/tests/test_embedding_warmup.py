@@ -0,0 +1,180 @@
+import os
+import threading
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from ai.embedding_service import _HASH_DIM, HASH_MODEL, EmbeddingService
+
+
+class _FakeModel:
+    def encode(self, texts, normalize_embeddings=True):
+        return [[1.0] + [0.0] * 383 for _ in texts]
+
+
+@mock.patch.dict(os.environ, {'EMBEDDING_BACKEND': 'minilm'})
+class EmbeddingWarmupTests(SimpleTestCase):
+    def test_hash_fallback_until_background_load_finishes(self):
+        release = threading.Event()
+
+        def loader(backend):
+            release.wait(5)
+            return _FakeModel()
+
+        with mock.patch.object(EmbeddingService, 'model_loader', staticmethod(loader)):
+            svc = EmbeddingService(background=True)
+            self.assertEqual(svc.health()['state'], 'loading')
+            self.assertFalse(svc.health()['ready'])
+            self.assertEqual(len(svc.embed(['query'])[0]), 32)  # hash while loading
+            release.set()
+            self.assertTrue(svc.wait_until_ready(5))
+        health = svc.health()
+        self.assertEqual((health['backend'], health['dim'], health['state']), ('minilm', 384, 'ready'))
+        self.assertEqual(len(svc.embed(['query'])[0]), 384)  # memo keyed per backend: no stale hash vector
+
+    @override_settings(AI_EMBEDDING_LOAD_RETRY_SECONDS=0)
+    def test_failed_load_retried_instead_of_permanent_hash(self):
+        attempts = []
+
+        def loader(backend):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError('model download failed')
+            return _FakeModel()
+
+        with mock.patch.object(EmbeddingService, 'model_loader', staticmethod(loader)):
+            svc = EmbeddingService()
+            self.assertEqual(svc.health()['state'], 'failed')
+            self.assertIn('download failed', svc.health()['error'])
+            svc.embed(['q'])  # kicks off a background retry
+            self.assertTrue(svc.wait_until_ready(5))
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(svc.backend, 'minilm')
+
+    def test_fallback_vectors_are_hash_model_sized(self):
+        class _BrokenModel(_FakeModel):
+            def encode(self, texts, normalize_embeddings=True):
+                raise RuntimeError('inference failed')
+
+        with mock.patch.object(EmbeddingService, 'model_loader', staticmethod(lambda backend: _BrokenModel())):
+            for window in (0, 5):
+                svc = EmbeddingService(batch_window_ms=window)
+                self.assertEqual((svc.backend, svc.dim), ('minilm', 384))
+                for memo in (True, False):
+                    vectors, model = svc.embed_with_model(['a', 'b'], memo=memo)
+                    self.assertEqual((model, {len(v) for v in vectors}), (HASH_MODEL, {_HASH_DIM}))
+
+    @override_settings(AI_EMBEDDING_BATCH_WINDOW_MS=5)
+    def test_batch_window_argument_overrides_setting(self):
+        with mock.patch.object(EmbeddingService, 'model_loader', staticmethod(lambda backend: _FakeModel())):
+            self.assertIsNotNone(EmbeddingService()._batcher)
+            self.assertIsNone(EmbeddingService(batch_window_ms=0)._batcher)
+
+
+class ReadyProbeEmbeddingTests(TestCase):
+    def setUp(self):
+        self._saved = EmbeddingService._instance
+
+    def tearDown(self):
+        EmbeddingService._instance = self._saved
+
+    @override_settings(AI_EMBEDDING_WARMUP='web')
+    @mock.patch.dict(os.environ, {'EMBEDDING_BACKEND': 'minilm'})
+    def test_ready_reports_not_ready_while_warming(self):
+        release = threading.Event()
+        with mock.patch.object(EmbeddingService, 'model_loader', staticmethod(lambda backend: release.wait(5) and _FakeModel())):
+            EmbeddingService._instance = None
+            svc = EmbeddingService.warm_up()
+            r = self.client.get('/api/ready')
+            self.assertEqual(r.status_code, 503)
+            release.set()
+            svc.wait_until_ready(5)
+        r = self.client.get('/api/ready')
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.json()['embeddings'])
+        self.assertEqual(r.json()['details']['embeddings']['backend'], 'minilm')
+
+
+@mock.patch.dict(os.environ, {'EMBEDDING_BACKEND': 'minilm'})
+class EmbeddingForkTests(SimpleTestCase):
+    def setUp(self):
+        self._saved = (EmbeddingService._instance, EmbeddingService._others)
+
+    def tearDown(self):
+        EmbeddingService._instance, EmbeddingService._others = self._saved
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork()')
+    def test_child_forked_during_warm_up_loads_its_own_model(self):
+        parent = os.getpid()
+        release = threading.Event()
+
+        def loader(backend):
+            if os.getpid() == parent:
+                release.wait(5)
+            return _FakeModel()
+
+        with mock.patch.object(EmbeddingService, 'model_loader', staticmethod(loader)):
+            EmbeddingService._instance = None
+            svc = EmbeddingService.warm_up()
+            self.assertEqual(svc.load_state, 'loading')
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:  # child: the parent's loader thread does not exist here
+                status = 'inherited'
+                try:
+                    child = EmbeddingService.warm_up()
+                    if child is not svc and child.wait_until_ready(5):
+                        status = f'{child.load_state}:{child.backend}'
+                finally:
+                    os.write(write_fd, status.encode())
+                    os._exit(0)
+            os.close(write_fd)
+            os.waitpid(pid, 0)
+            with os.fdopen(read_fd) as fh:
+                self.assertEqual(fh.read(), 'ready:minilm')
+            release.set()
+            self.assertTrue(svc.wait_until_ready(5))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'needs fork()')
+    def test_child_forked_while_batcher_and_memo_are_busy_can_embed(self):
+        with mock.patch.object(EmbeddingService, 'model_loader', staticmethod(lambda backend: _FakeModel())):
+            EmbeddingService._instance = None
+            svc = EmbeddingService.instance()
+            self.assertIsNotNone(svc._batcher)
+            # A parent thread mid-flush / mid-lookup at fork time: locks held, leader flag set
+            held = [svc.memo._lock, svc._batcher._cond, svc._batcher._encode_lock]
+            for lock in held:
+                lock.acquire()
+            svc._batcher._leader = True
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                threading.Timer(5, os._exit, (1,)).start()  # a deadlock fails the test instead of hanging it
+                status = 'error'
+                try:
+                    vectors, model = EmbeddingService.instance().embed_with_model(['after fork'])
+                    status = f'{model}:{len(vectors[0])}'
+                finally:
+                    os.write(write_fd, status.encode())
+                    os._exit(0)
+            os.close(write_fd)
+            for lock in reversed(held):
+                lock.release()
+            svc._batcher._leader = False
+            os.waitpid(pid, 0)
+            with os.fdopen(read_fd) as fh:
+                self.assertEqual(fh.read(), f'{svc.model_name}:384')
+
+    def test_web_warm_up_only_in_server_processes(self):
+        from ai.apps import _is_web_server
+
+        cases = [
+            (['/usr/local/bin/gunicorn', 'app.wsgi:application'], {}, True),
+            (['/usr/local/bin/celery', '-A', 'app', 'worker'], {}, False),
+            (['manage.py', 'migrate'], {}, False),
+            (['manage.py', 'runserver'], {}, False),  # autoreloader parent
+            (['manage.py', 'runserver'], {'RUN_MAIN': 'true'}, True),
+        ]
+        for argv, env, expected in cases:
+            with mock.patch('sys.argv', argv), mock.patch.dict(os.environ, env):
+                self.assertEqual(_is_web_server(), expected, argv)
@@ -0,0 +1,106 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ai.ingestion import _chunk_text, _clean_html, _extract_text, _validators_key, ingest_grant_call
+from ai.models import AIResource
+
+PAGE = (
+    '<html><head><script>alert(1)</script><style>p {}</style></head><body>'
+    '<h1>Call for proposals</h1><p>Eligible applicants: universities and research institutes.</p>'
+    '<div>Deadline: 1 March. Budget up to €200k.</div></body></html>'
+)
+
+
+class _CallHandler(BaseHTTPRequestHandler):
+    page = PAGE.encode('utf-8')
+    etag = '"v1"'
+    requests: list[dict] = []
+
+    def do_GET(self):  # noqa: N802 - http.server API
+        type(self).requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(self.page)))
+        self.end_headers()
+        self.wfile.write(self.page)
+
+    def log_message(self, *args):
+        pass
+
+
+class GrantCallFetchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _CallHandler.requests = []
+        _CallHandler.etag = '"v1"'
+        _CallHandler.page = PAGE.encode('utf-8')
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _CallHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/call'
+
+    def test_streamed_text_matches_whole_body_extraction(self):
+        stats: dict = {}
+        res = ingest_grant_call(self.url, stats=stats)
+        text = ' '.join(res.chunks.order_by('ord').values_list('text', flat=True))  # type: ignore[attr-defined]
+        self.assertEqual(text, ' '.join(_chunk_text(_clean_html(PAGE))))
+        self.assertEqual(_extract_text(list(PAGE)), _clean_html(PAGE))  # piece boundaries inside tags/entities
+        self.assertNotIn('alert', text)
+        self.assertIn('€200k', text)
+        self.assertEqual((stats['fetch'], stats['bytes']), ('fetched', len(PAGE.encode('utf-8'))))
+
+    def test_unchanged_call_is_a_304_check(self):
+        first = ingest_grant_call(self.url)
+        stats: dict = {}
+        with self.assertNumQueries(2):  # snapshot existence check + load; no parsing, embedding or writes
+            again = ingest_grant_call(self.url, stats=stats)
+        self.assertEqual(again.id, first.id)
+        self.assertEqual(stats['fetch'], 'not_modified')
+        self.assertEqual(_CallHandler.requests[-1].get('If-None-Match'), '"v1"')
+        # Changed page: new ETag, new version of the same snapshot
+        _CallHandler.etag = '"v2"'
+        _CallHandler.page = PAGE.replace('1 March', '9 April').encode('utf-8')
+        stats = {}
+        changed = ingest_grant_call(self.url, stats=stats)
+        self.assertEqual((changed.id, changed.version, stats['outcome']), (first.id, 2, 'refreshed'))
+        self.assertIn('9 April', ' '.join(changed.chunks.values_list('text', flat=True)))  # type: ignore[attr-defined]
+        self.assertEqual(AIResource.objects.filter(type='call_snapshot').count(), 1)
+
+    def test_validators_dropped_when_snapshot_deleted(self):
+        ingest_grant_call(self.url).delete()
+        res = ingest_grant_call(self.url)
+        self.assertNotIn('If-None-Match', _CallHandler.requests[-1])
+        self.assertTrue(AIResource.objects.filter(id=res.id).exists())
+
+    @override_settings(AI_FETCH_MAX_BYTES=200)
+    def test_body_read_stops_at_byte_cap(self):
+        _CallHandler.page = ('<p>' + 'grant ' * 5000 + '</p>').encode('utf-8')
+        stats: dict = {}
+        res = ingest_grant_call(self.url, stats=stats)
+        self.assertEqual(stats['bytes'], 200)
+        self.assertTrue(stats['truncated'])
+        self.assertLessEqual(len(res.chunks.get().text), 200)  # type: ignore[attr-defined]
+
+    def test_transport_error_mid_body_stores_nothing(self):
+        def broken(*args, **kwargs):
+            yield PAGE[:40]
+            raise requests.exceptions.ChunkedEncodingError('connection reset')
+
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            _extract_text(broken())
+        with mock.patch('ai.ingestion._stream_text', broken), self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            ingest_grant_call(self.url)
+        self.assertFalse(AIResource.objects.exists())
+        self.assertIsNone(cache.get(_validators_key(self.url, '')))
+        self.assertIn('Deadline', ' '.join(ingest_grant_call(self.url).chunks.values_list('text', flat=True)))  # type: ignore[attr-defined]
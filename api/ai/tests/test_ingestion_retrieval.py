@@ -10,13 +10,63 @@ class IngestionRetrievalTests(TestCase):
         res = create_resource_with_chunks(type_='sample', title='Sample', source_url='', full_text=text)
         chunks = list(res.chunks.all())  # type: ignore[attr-defined]
         self.assertGreaterEqual(len(chunks), 1)
-        # All chunks have embedding stored
+        # All chunks have a binary embedding stored (no JSON list)
         for ch in chunks:
-            self.assertIsInstance(ch.embedding, list)
-            self.assertGreater(len(ch.embedding), 0)
+            self.assertIsNone(ch.embedding)
+            self.assertEqual(ch.embedding_dtype, 'float32')
+            self.assertEqual(len(bytes(ch.embedding_vec)), ch.embedding_dim * 4)
+            self.assertEqual(ch.vector.shape, (ch.embedding_dim,))
         out = retrieve_top_k('Paragraph two', k=3)
         self.assertGreaterEqual(len(out), 1)
         # Ensure retrieval attaches score and text
         self.assertIn('score', out[0])
         # Ensure no on-demand re-embed left embedding null
-        self.assertEqual(AIChunk.objects.filter(embedding__isnull=True).count(), 0)
+        self.assertEqual(AIChunk.objects.filter(embedding_vec__isnull=True).count(), 0)
+
+    def test_bulk_ingestion_writes_chunks_in_few_queries_and_reports_throughput(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from ai.ingestion import _dedup_key, ingest_manifest
+        from ai.tokenization import count_tokens, tokenizer_name
+
+        text = '\n'.join(f'Paragraph {i} ' + 'word ' * 150 for i in range(12))
+        stats: dict = {}
+        with CaptureQueriesContext(connection) as ctx:
+            res = create_resource_with_chunks(type_='sample', title='Bulk', source_url='', full_text=text, stats=stats)
+        chunks = list(res.chunks.order_by('ord'))  # type: ignore[attr-defined]
+        self.assertGreater(len(chunks), 5)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "ai_aichunk"')]
+        self.assertEqual(len(inserts), 1)  # one bulk INSERT instead of one per chunk
+        self.assertFalse(any(q['sql'].startswith('UPDATE "ai_airesource"') for q in ctx.captured_queries))
+        self.assertEqual(res.metadata, {'chunks': len(chunks)})
+        self.assertEqual([c.ord for c in chunks], list(range(len(chunks))))
+        self.assertEqual(chunks[0].embedding_key, _dedup_key(chunks[0].text + str(chunks[0].embedding_dim)))
+        self.assertEqual((chunks[0].token_len, chunks[0].tokenizer), (count_tokens(chunks[0].text), tokenizer_name()))
+        self.assertEqual(stats['chunks'], len(chunks))
+        for key in ('embed_ms', 'insert_ms', 'ingest_ms', 'chunks_per_sec'):
+            self.assertIn(key, stats)
+        self.assertEqual(len(retrieve_top_k(chunks[3].text, k=1)), 1)  # indexed after commit like before
+
+        manifest_stats: dict = {}
+        manifest = 'items:\n' + ''.join(
+            f'  - {{type: template, title: t{i}, text: "Manifest item {i} text."}}\n' for i in range(3)
+        )
+        created = ingest_manifest(manifest, stats=manifest_stats)
+        self.assertEqual(len(created), 3)
+        self.assertEqual((manifest_stats['items'], manifest_stats['resources'], manifest_stats['chunks']), (3, 3, 3))
+        self.assertGreater(manifest_stats['chunks_per_sec'], 0)
+
+    def test_failed_chunk_insert_leaves_no_resource(self):
+        from unittest import mock
+
+        from ai.models import AIResource, AIResourceBand
+
+        text = 'A resource whose chunk insert fails. It must not be left behind without chunks.'
+        with mock.patch.object(AIChunk.objects, 'bulk_create', side_effect=RuntimeError('insert failed')):
+            with self.assertRaises(RuntimeError):
+                create_resource_with_chunks(type_='sample', title='Broken', source_url='', full_text=text)
+        self.assertFalse(AIResource.objects.exists())
+        self.assertFalse(AIResourceBand.objects.exists())
+        # The retry is not mistaken for an exact duplicate of a partial resource
+        res = create_resource_with_chunks(type_='sample', title='Retry', source_url='', full_text=text)
+        self.assertGreater(res.chunks.count(), 0)  # type: ignore[attr-defined]
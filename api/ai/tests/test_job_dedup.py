@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ai import tasks
+from ai.models import AIJob, AIPromptTemplate
+
+
+@override_settings(DEBUG=True, AI_ASYNC=1, CELERY_TASK_ALWAYS_EAGER=True, CELERY_BROKER_URL='memory://')
+class JobDedupTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dedup', password='p')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.payload = {'section_id': 'summary', 'answers': {'objective': 'impact'}}
+
+    def _submit(self, payload=None):
+        return tasks.submit_job('write', payload or {'section_id': 's', 'answers': {'a': 1}}, created_by=self.user, org_id='7')
+
+    def test_retry_reuses_done_deterministic_result(self):
+        first = self.api.post('/api/ai/write', self.payload, format='json').json()
+        with mock.patch('ai.tasks._provider') as prov:
+            retry = self.api.post('/api/ai/write', self.payload, format='json').json()
+        prov.assert_not_called()
+        self.assertEqual((retry['job_id'], retry['status'], retry['dedup']), (first['job_id'], 'done', 'reused'))
+        self.assertEqual(AIJob.objects.count(), 1)
+        self.assertIn('draft_text', self.api.get(f'/api/ai/jobs/{retry["job_id"]}').json()['result'])
+        jobs = self.api.get('/api/ai/metrics/summary').json()['jobs']
+        self.assertEqual((jobs['dedup_misses'], jobs['dedup_reused'], jobs['dedup_hit_rate']), (1, 1, 0.5))
+
+    def test_in_flight_job_is_coalesced(self):
+        job, outcome = self._submit()
+        self.assertEqual((outcome, len(job.idempotency_key)), ('created', 64))
+        again, outcome = self._submit()
+        self.assertEqual((again.pk, outcome), (job.pk, 'coalesced'))
+        job.refresh_from_db()
+        self.assertEqual((job.coalesced_count, job.reused_count), (1, 0))
+
+    def test_key_covers_input_template_and_sampling(self):
+        job, _ = self._submit()
+        self.assertEqual(self._submit({'section_id': 's', 'answers': {'a': 2}})[1], 'created')
+        AIJob.objects.filter(pk=job.pk).update(status='done')
+        with override_settings(AI_DETERMINISTIC_SAMPLING=False):
+            self.assertEqual(self._submit()[1], 'created')  # different key: sampled output
+        AIPromptTemplate.objects.create(
+            name='writer.base',
+            version=3,
+            role='writer',
+            template='{{section_id}} {{answers_json}} {{file_refs_json}}',
+            variables=['section_id', 'answers_json', 'file_refs_json'],
+            active=True,
+        )
+        self.assertEqual(self._submit()[1], 'created')  # new template version
+
+    def test_failed_stale_or_sampled_jobs_are_not_reused(self):
+        job, _ = self._submit()
+        AIJob.objects.filter(pk=job.pk).update(status='error')
+        self.assertEqual(self._submit()[1], 'created')
+        with override_settings(AI_DETERMINISTIC_SAMPLING=False):
+            sampled, _ = self._submit()
+            AIJob.objects.filter(pk=sampled.pk).update(status='done')
+            self.assertEqual(self._submit()[1], 'created')
+        with override_settings(AI_JOB_DEDUP_WINDOW=0):
+            job, outcome = self._submit()
+            self.assertEqual((outcome, job.idempotency_key), ('created', ''))
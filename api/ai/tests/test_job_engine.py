@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ai import tasks
+from ai.models import AIJob, AIJobContext, AIMetric, AIPromptTemplate
+from orgs.models import Organization
+from proposals.models import Proposal, ProposalSection
+
+
+class JobEngineTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='engine', password='p')
+        org = Organization.objects.create(name='Org', admin=self.user)
+        proposal = Proposal.objects.create(author=self.user, org=org)
+        self.section = ProposalSection.objects.create(proposal=proposal, key='intro', title='Intro', order=1)
+        self.org_id = str(org.pk)
+
+    def _job(self, type_: str, payload: dict) -> AIJob:
+        return AIJob.objects.create(type=type_, input_json=payload, created_by=self.user, org_id=self.org_id)
+
+    def test_write_job_writes_once_in_one_transaction(self):
+        job = self._job('write', {'section_id': str(self.section.pk), 'answers': {'q': 'budget'}})
+        with CaptureQueriesContext(connection) as ctx:
+            tasks.run_write(job.pk)
+        sql = [q['sql'] for q in ctx.captured_queries]
+        writes = [i for i, q in enumerate(sql) if q.startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(sum(q.startswith('UPDATE "ai_aijob"') for q in sql), 2)  # processing, then done
+        self.assertEqual(sum(q.startswith('SELECT "proposals_proposalsection"') for q in sql), 1)  # loaded once
+        self.assertFalse([q for q in sql if q.startswith(('SELECT "proposals_proposal"', 'SELECT "auth_user"'))])
+        # Everything after the 'processing' update sits inside one savepoint (a transaction outside tests)
+        start = next(i for i, q in enumerate(sql) if q.startswith('SAVEPOINT'))
+        end = max(i for i, q in enumerate(sql) if q.startswith('RELEASE SAVEPOINT'))
+        self.assertTrue(all(start < i < end for i in writes[1:]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertTrue(AIJobContext.objects.filter(job=job).exists())
+        metric = AIMetric.objects.get(type='write')
+        for key in ('guard_ms', 'provider_ms', 'render_ms', 'persist_ms'):
+            self.assertIn(key, metric.stages)
+
+    def test_prompt_redacted_and_hashed_once_per_job(self):
+        template = 'Write {{section_id}} {{answers_json}} {{file_refs_json}}'
+        AIPromptTemplate.objects.create(
+            name='writer.base',
+            version=1,
+            role='writer',
+            template=template,
+            variables=['section_id', 'answers_json', 'file_refs_json'],
+            active=True,
+        )
+        job = self._job('write', {'section_id': str(self.section.pk), 'answers': {'contact': 'pi@example.org'}})
+        redact = mock.Mock(wraps=AIJobContext.redact_with_mapping)
+        with mock.patch.object(AIJobContext, 'redact_with_mapping', redact), mock.patch.object(
+            AIPromptTemplate, 'compute_checksum', side_effect=AssertionError('stored checksum expected')
+        ):
+            tasks.run_write(job.pk)
+        self.assertEqual(redact.call_count, 1)
+        ctx = AIJobContext.objects.get(job=job)
+        self.assertEqual(ctx.template_sha256, AIPromptTemplate.compute_checksum(template))
+        self.assertIn('EMAIL', ctx.redaction_map.values())
+        self.assertNotIn('pi@example.org', ctx.rendered_prompt_redacted)
+
+    def test_failed_persist_rolls_back_job_writes(self):
+        job = self._job('write', {'section_id': str(self.section.pk), 'answers': {}})
+        with mock.patch('ai.tasks.save_write_result', side_effect=RuntimeError('disk full')):
+            tasks.run_write(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error_text), ('error', 'disk full'))
+        self.assertFalse(AIJobContext.objects.filter(job=job).exists())  # rolled back with the result
+        metric = AIMetric.objects.get(type='write')
+        self.assertFalse(metric.success)
+        self.assertEqual(metric.section_id, str(self.section.pk))
+
+    def test_revision_cap_blocks_before_provider(self):
+        self.section.revisions = [{'ts': 'x'}] * 5
+        self.section.save(update_fields=['revisions'])
+        job = self._job('revise', {'section_id': str(self.section.pk), 'base_text': 'a', 'change_request': 'b'})
+        with mock.patch('ai.tasks._provider') as prov:
+            tasks.run_revise(job.pk)
+        prov.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.error_text, 'revision_cap_reached')
+        self.assertEqual(AIMetric.objects.get(type='revise').model_id, 'revision_cap_blocked')
+
+    def test_format_job(self):
+        job = self._job('format', {'full_text': 'Intro text.', 'proposal_id': 7})
+        tasks.run_format(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertIn('formatted_text', job.result_json)
+        self.assertEqual(AIMetric.objects.get(type='format').proposal_id, 7)
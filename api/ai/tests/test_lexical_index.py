@@ -0,0 +1,65 @@
+import math
+
+from django.test import SimpleTestCase, TestCase
+from ai import chunk_index, lexical_index
+from ai.ingestion import create_resource_with_chunks
+from ai.lexical_index import BM25Index, tokenize
+from ai.retrieval import retrieve_top_k
+
+
+class BM25IndexTests(SimpleTestCase):
+    def test_tokenize_keeps_codes_whole_and_split(self):
+        self.assertEqual(
+            tokenize('Call HORIZON-CL5-2024 for the SMEs'),
+            ['call', 'horizon-cl5-2024', 'horizon', 'cl5', '2024', 'smes'],
+        )
+
+    def test_scores_match_reference_formula(self):
+        index = BM25Index()
+        docs = {1: 'solar grant solar', 2: 'wind grant', 3: 'education outreach'}
+        for cid, text in docs.items():
+            index.add(cid, text)
+        avgdl = 7 / 3
+
+        def ref(tf, dl, df, n=3, k1=1.2, b=0.75):
+            return math.log(1 + (n - df + 0.5) / (df + 0.5)) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+
+        got = index.search('solar grant', 5)
+        self.assertEqual([cid for cid, _ in got], [1, 2])
+        self.assertAlmostEqual(got[0][1], ref(2, 3, 1) + ref(1, 3, 2), places=4)
+        self.assertAlmostEqual(got[1][1], ref(1, 2, 2), places=4)
+        self.assertEqual(index.search('unknown words', 5), [])
+
+    def test_ties_broken_by_chunk_id(self):
+        index = BM25Index()
+        for cid in (7, 3, 5):
+            index.add(cid, 'same text')
+        self.assertEqual([cid for cid, _ in index.search('text', 2)], [3, 5])
+
+
+class HybridRetrievalTests(TestCase):
+    def setUp(self):
+        chunk_index.reset_index()
+        lexical_index.reset_index()
+
+    def test_hybrid_surfaces_exact_programme_code(self):
+        target = create_resource_with_chunks(
+            type_='call_snapshot', title='c', source_url='', full_text='Eligibility for topic HORIZON-CL5-2024-D3-01 applicants.'
+        )
+        for i in range(5):
+            create_resource_with_chunks(
+                type_='sample', title=f's{i}', source_url='', full_text=f'Unrelated narrative number {i}.'
+            )
+        out = retrieve_top_k('requirements of HORIZON-CL5-2024-D3-01', k=3, mode='hybrid')
+        self.assertEqual(out[0]['resource_id'], target.id)
+        self.assertGreater(out[0]['lexical_score'], 0)
+        self.assertEqual(
+            set(out[0]), {'chunk_id', 'resource_id', 'score', 'vector_score', 'lexical_score', 'text', 'type', 'token_len'}
+        )
+
+    def test_ingestion_updates_loaded_lexical_index(self):
+        create_resource_with_chunks(type_='sample', title='a', source_url='', full_text='first body text')
+        retrieve_top_k('first', k=1, mode='hybrid')
+        with self.captureOnCommitCallbacks(execute=True):
+            r = create_resource_with_chunks(type_='sample', title='b', source_url='', full_text='zeppelin budget line')
+        self.assertEqual(lexical_index.search('zeppelin', 1)[0][0], r.chunks.first().id)  # type: ignore[attr-defined]
@@ -0,0 +1,85 @@
+import json
+import os
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ai import ingestion
+from ai.ingestion import create_resource_with_chunks, ingest_manifest_report
+from ai.models import AIChunk, AIResource
+
+BASE = (
+    'The programme funds collaborative research on coastal resilience, including monitoring networks, '
+    'community adaptation plans and open data platforms for regional authorities and small businesses.'
+)
+
+
+def _manifest(texts: list[str | None]) -> str:
+    lines = ['items:']
+    for i, text in enumerate(texts):
+        lines.append(
+            f'  - {{type: template, title: t{i}}}' if text is None else f'  - {{type: template, title: t{i}, text: "{text}"}}'
+        )
+    return '\n'.join(lines) + '\n'
+
+
+class ManifestReportTests(TestCase):
+    def test_report_classifies_every_item(self):
+        existing = create_resource_with_chunks(type_='template', title='old', source_url='', full_text=BASE)
+        manifest = _manifest([f'Fresh item {i} about budgets.' for i in range(2)] + [BASE, BASE + ' Impact.', None])
+        report = ingest_manifest_report(manifest, batch=2)
+        self.assertEqual(report.items, 5)
+        self.assertEqual([r['index'] for r in report.created], [0, 1])
+        self.assertEqual(report.duplicate_exact, [{'index': 2, 'resource_id': existing.id}])
+        self.assertEqual(report.duplicate_similar, [{'index': 3, 'resource_id': existing.id}])
+        self.assertEqual(report.failed, [{'index': 4, 'title': 't4', 'reason': 'missing type or text'}])
+        self.assertEqual(report.chunks, AIChunk.objects.exclude(resource=existing).count())
+        summary = report.as_dict()
+        self.assertEqual(summary['counts'], {'created': 2, 'duplicate_exact': 1, 'duplicate_similar': 1, 'failed': 1})
+        for key in ('parse_ms', 'prepare_ms', 'write_ms', 'total_ms'):
+            self.assertIn(key, summary['timings'])
+        self.assertEqual(report.resource_ids(), [r['resource_id'] for r in report.created] + [existing.id])
+
+    def test_failing_item_does_not_roll_back_its_batch(self):
+        real = ingestion.create_resource_with_chunks
+
+        def flaky(**kwargs):
+            res = real(**kwargs)
+            if kwargs['title'] == 't1':
+                raise ValueError('boom')  # after writing: the item's savepoint must discard its rows
+            return res
+
+        with mock.patch.object(ingestion, 'create_resource_with_chunks', side_effect=flaky):
+            report = ingest_manifest_report(_manifest([f'Item {i} text.' for i in range(3)]), batch=10)
+        self.assertEqual([r['index'] for r in report.created], [0, 2])
+        self.assertEqual(report.failed, [{'index': 1, 'title': 't1', 'reason': 'ValueError: boom'}])
+        self.assertEqual(sorted(AIResource.objects.values_list('title', flat=True)), ['t0', 't2'])
+
+    def test_invalid_yaml_is_reported(self):
+        report = ingest_manifest_report('items: [unclosed')
+        self.assertEqual(report.items, 0)
+        self.assertEqual(report.failed[0]['index'], -1)
+
+    def test_process_pool_prepares_items(self):
+        report = ingest_manifest_report(_manifest([f'Pooled item {i} with words.' for i in range(4)]), workers=1, batch=2)
+        self.assertEqual(len(report.created), 4)
+        vec = AIChunk.objects.get(resource_id=report.created[2]['resource_id'])
+        inline = create_resource_with_chunks(type_='sample', title='x', source_url='', full_text='Pooled item 2 with words.')
+        self.assertEqual(bytes(vec.embedding_vec), bytes(inline.chunks.get().embedding_vec))  # type: ignore[attr-defined]
+
+
+class IngestManifestCommandTests(TestCase):
+    def test_command_prints_summary_and_json(self):
+        import tempfile
+
+        with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as fh:
+            fh.write(_manifest(['One item.', None]))
+        self.addCleanup(os.remove, fh.name)
+        out = StringIO()
+        call_command('ingest_manifest', fh.name, stdout=out)
+        self.assertIn('2 items: 1 created, 0 exact duplicates, 0 similar duplicates, 1 failed', out.getvalue())
+        out = StringIO()
+        call_command('ingest_manifest', fh.name, '--json', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['counts']['duplicate_exact'], 1)
@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase, TestCase
+
+from ai.ingestion import create_resource_with_chunks
+from ai.models import AIChunk, AIResource, AIResourceBand
+from ai.near_dup import BANDS, backfill_signatures, band_keys, estimate_jaccard, minhash, shingles
+
+BASE = (
+    'The programme funds collaborative research on coastal resilience, including monitoring networks, '
+    'community adaptation plans and open data platforms for regional authorities and small businesses.'
+)
+
+
+class MinHashTests(SimpleTestCase):
+    def test_signature_estimates_jaccard_and_is_deterministic(self):
+        variant = BASE.replace('small businesses', 'local cooperatives')
+        a, b = shingles(BASE), shingles(variant)
+        exact = len(a & b) / len(a | b)
+        self.assertAlmostEqual(estimate_jaccard(minhash(BASE), minhash(variant)), exact, delta=0.15)
+        self.assertEqual(minhash(BASE).tolist(), minhash(BASE).tolist())
+        self.assertEqual(len(band_keys(minhash(BASE))), BANDS)
+        self.assertEqual(band_keys(minhash('...')), [])  # no words: not indexed
+
+    def test_unrelated_texts_share_no_bucket(self):
+        other = 'Completely unrelated agricultural policy document focusing on soil management.'
+        self.assertFalse(set(band_keys(minhash(BASE))) & set(band_keys(minhash(other))))
+
+
+class NearDuplicateIndexTests(TestCase):
+    def test_old_resource_found_beyond_recency_window(self):
+        original = create_resource_with_chunks(type_='template', title='T', source_url='', full_text=BASE)
+        self.assertEqual(original.lsh_bands.count(), BANDS)  # type: ignore[attr-defined]
+        # 250 newer resources of the same type: the old scan only looked at the latest 200
+        AIResource.objects.bulk_create(AIResource(type='template', title=f'n{i}', sha256=f'{i:064d}') for i in range(250))
+        variant = create_resource_with_chunks(type_='template', title='T2', source_url='', full_text=BASE + ' Impact.')
+        self.assertEqual(variant.id, original.id)
+
+    def test_candidates_scoped_by_type_and_org(self):
+        shared = create_resource_with_chunks(type_='template', title='T', source_url='', full_text=BASE)
+        other_org = create_resource_with_chunks(type_='template', title='T', source_url='', full_text=BASE + ' X.', org_id='o2')
+        other_type = create_resource_with_chunks(type_='sample', title='T', source_url='', full_text=BASE + ' Y.')
+        self.assertEqual(len({shared.id, other_org.id, other_type.id}), 3)
+
+    def test_backfill_indexes_resources_created_before_signatures(self):
+        legacy = AIResource.objects.create(type='sample', title='old', sha256='a' * 64)
+        AIChunk.objects.create(resource=legacy, ord=0, text=BASE)
+        self.assertFalse(AIResourceBand.objects.filter(resource=legacy).exists())
+        self.assertEqual(backfill_signatures(AIResource, AIChunk, AIResourceBand), 1)
+        self.assertEqual(AIResourceBand.objects.filter(resource=legacy).count(), BANDS)
+        self.assertEqual(backfill_signatures(AIResource, AIChunk, AIResourceBand), 0)  # resumable: done rows skipped
+        found = create_resource_with_chunks(type_='sample', title='new', source_url='', full_text=BASE + ' More.')
+        self.assertEqual(found.id, legacy.id)
@@ -56,6 +56,7 @@ class PromptRenderingTests(TestCase):
         rp = render_role_prompt(role='writer', variables={'input_json': {'a': 1}})
         self.assertIn('ROLE: writer', rp.rendered)
         self.assertIsNone(rp.template)
+        self.assertEqual(rp.template_sha256, '')
 
     def test_integration_context_created(self):
         AIPromptTemplate.objects.create(
@@ -103,6 +104,8 @@ class PromptRenderingTests(TestCase):
         self.assertIn('EMAIL', mapping.values())
         self.assertIn('NUMBER', mapping.values())
         self.assertEqual(red2, rp.redacted)
+        self.assertEqual(rp.redaction_map, mapping)
+        self.assertEqual(rp.template_sha256, AIPromptTemplate.compute_checksum('Contact {{email}} ref {{refnum}}'))
 
     def test_blueprint_append_for_formatter(self):
         AIPromptTemplate.objects.create(
@@ -153,3 +156,51 @@ class PromptRenderingTests(TestCase):
         AIPromptTemplate.objects.filter(pk=tpl.pk).update(template=tpl.template + ' CHANGED')
         ctx_fresh = AIJobContext.objects.get(pk=ctx.pk)
         self.assertTrue(detect_template_drift(ctx_fresh))
+
+    def test_compiled_template_cached_until_saved(self):
+        tpl = AIPromptTemplate.objects.create(
+            name='planner.base',
+            version=1,
+            role='planner',
+            template='A {{grant_url}} B {{ text_spec }} {{unclosed',
+            variables=['grant_url', 'text_spec'],
+            active=True,
+        )
+        variables = {'grant_url': 'u', 'text_spec': 's'}
+        self.assertEqual(render_role_prompt(role='planner', variables=variables).rendered, 'A u B s {{unclosed')
+        with self.assertNumQueries(1):  # active row head only (no template text); the parsed template is reused
+            rp = render_role_prompt(role='planner', variables=variables)
+        self.assertEqual(rp.rendered, 'A u B s {{unclosed')
+        tpl.template = 'NEW {{grant_url}}'
+        tpl.variables = ['grant_url']
+        tpl.save()
+        with self.assertRaises(PromptTemplateError):
+            render_role_prompt(role='planner', variables=variables)
+        self.assertEqual(render_role_prompt(role='planner', variables={'grant_url': 'u'}).rendered, 'NEW u')
+
+    def test_rollback_to_previous_version_without_save_signal(self):
+        AIPromptTemplate.objects.create(name='writer.v', version=1, role='writer', template='V1', variables=[], active=True)
+        v2 = AIPromptTemplate.objects.create(name='writer.v', version=2, role='writer', template='V2', variables=[], active=True)
+        self.assertEqual(render_role_prompt(role='writer', variables={}).rendered, 'V2')
+        AIPromptTemplate.objects.filter(pk=v2.pk).update(active=False)  # bulk update: no post_save
+        rp = render_role_prompt(role='writer', variables={})
+        self.assertEqual((rp.rendered, rp.template.version), ('V1', 1))
+
+    def test_blueprint_and_variables_edited_without_save_signal(self):
+        tpl = AIPromptTemplate.objects.create(
+            name='formatter.bp',
+            version=1,
+            role='formatter',
+            template='FORMAT:\n{{full_text}}',
+            variables=['full_text'],
+            active=True,
+            blueprint_instructions='OLD instructions.',
+        )
+        self.assertIn('OLD', render_role_prompt(role='formatter', variables={'full_text': 'x'}).rendered)
+        # Bulk update (or an edit in another process): no post_save here, the checksum is unchanged
+        AIPromptTemplate.objects.filter(pk=tpl.pk).update(
+            blueprint_instructions='NEW instructions.', variables=['full_text', 'template_hint']
+        )
+        rendered = render_role_prompt(role='formatter', variables={'full_text': 'x', 'template_hint': ''}).rendered
+        self.assertIn('NEW', rendered)
+        self.assertNotIn('OLD', rendered)
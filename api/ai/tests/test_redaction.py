@@ -0,0 +1,98 @@
+import random
+
+from django.test import SimpleTestCase
+
+from ai.models import AIJobContext
+from ai.redaction import MAX_REDACTED_LEN, legacy_redact_with_mapping, redact_with_mapping
+
+# Fragments that exercise every pattern, their overlaps and near misses
+_PIECES = [
+    'jane.doe@example.org',
+    'a@b.cc.x@d.ee',
+    'x@y',
+    '@@',
+    'foo@bar.c',
+    '.+%-_@host-1.io',
+    'user@',
+    '@example.com',
+    '1234567',
+    '12345',
+    '٣٤٥٦٧٨٩',
+    '+1 555-010-1234',
+    '555 0101 22',
+    '+44 20 7946 0958',
+    '-',
+    '+',
+    'AB12',
+    'WP01',
+    'XY9',
+    'ab12',
+    'Jane Doe',
+    'Main Street',
+    'Community Health',
+    'Ann',
+    'McDonald Smith',
+    '12 Main Street',
+    '7 Elm Rd',
+    '221 Baker St',
+    '9  Long Avenue',
+    '3 Oak Ln',
+    '12 McDonald Street',
+    '4 MAIN St',
+    'Lane',
+    'Boulevard',
+    'Blvd',
+    'word',
+    'the',
+    'é',
+    'ß',
+    '_',
+    '[EMAIL_0123456789]',
+    '(',
+    ')',
+    ',',
+    '.',
+    ';',
+    ' ',
+    '  ',
+    '\n',
+    '\t',
+]
+
+
+def _random_text(rng: random.Random, n: int) -> str:
+    return ''.join(rng.choice(_PIECES) + rng.choice(['', ' ', '', '\n', '.', '-']) for _ in range(n))
+
+
+class RedactionEngineTests(SimpleTestCase):
+    def assertSameAsLegacy(self, text: str):
+        got, mapping = redact_with_mapping(text)
+        want, want_mapping = legacy_redact_with_mapping(text)
+        self.assertEqual(got, want, text[:200])
+        self.assertEqual(list(mapping.items()), list(want_mapping.items()), text[:200])
+
+    def test_identical_to_legacy_on_random_text(self):
+        rng = random.Random(20251017)
+        for _ in range(3000):
+            self.assertSameAsLegacy(_random_text(rng, rng.randint(0, 40)))
+
+    def test_identical_to_legacy_on_random_characters(self):
+        rng = random.Random(7)
+        alphabet = 'aAzZ09@.+-_% \n\tSRLtdv٣'
+        for _ in range(3000):
+            self.assertSameAsLegacy(''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60))))
+
+    def test_identical_to_legacy_on_large_text(self):
+        rng = random.Random(3)
+        text = _random_text(rng, 6000)
+        self.assertGreater(len(text), MAX_REDACTED_LEN)
+        self.assertSameAsLegacy(text)
+        self.assertTrue(redact_with_mapping(text)[0].endswith('…'))
+
+    def test_empty_and_model_entry_point(self):
+        self.assertEqual(redact_with_mapping(''), ('', {}))
+        text = 'Mail jane.doe@example.org or call +1 555-010-1234 at 12 Main Street'
+        self.assertEqual(AIJobContext.redact_with_mapping(text), legacy_redact_with_mapping(text))
+        redacted, mapping = AIJobContext.redact_with_mapping(text)
+        self.assertNotIn('jane.doe', redacted)
+        self.assertEqual(set(mapping.values()), {'EMAIL', 'PHONE', 'SIMPLE_NAME'})
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from ai import chunk_index
+from ai.embedding_codec import vector_fields
+from ai.embedding_service import HASH_MODEL, EmbeddingService, embed_texts
+from ai.models import AIChunk, AIResource
+
+
+class ReembedChunksTests(TestCase):
+    def setUp(self):
+        chunk_index.reset_index()
+        res = AIResource.objects.create(type='sample', title='r', sha256='r' * 64)
+        rows = []
+        for i in range(7):
+            # Stale rows: unknown model, wrong dimension, or no vector at all
+            fields = vector_fields([0.5] * 384) if i % 3 == 0 else {} if i % 3 == 1 else vector_fields([0.1] * 32)
+            rows.append(AIChunk(resource=res, ord=i, text=f'chunk text {i}', token_len=3, **fields))
+        self.ids = [c.id for c in AIChunk.objects.bulk_create(rows)]
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('reembed_chunks', '--backend', 'hash', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reembeds_stale_rows_in_batches_and_records_model(self):
+        out = self._run('--batch', '3')
+        self.assertIn('Re-embedded 7 chunks with placeholder-hash-v1 (dim 32)', out)
+        for ch in AIChunk.objects.order_by('id'):
+            self.assertEqual((ch.embedding_model, ch.embedding_dim), (HASH_MODEL, 32))
+            self.assertTrue(np.allclose(ch.vector, embed_texts([ch.text])[0]))
+        self.assertIn('Re-embedded 0 chunks', self._run())  # nothing stale left
+
+    def test_resumes_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'reembed.json')
+            with open(path, 'w') as fh:
+                json.dump({'model': HASH_MODEL, 'last_id': self.ids[3], 'done': 4}, fh)
+            out = self._run('--all', '--dtype', 'float16', '--checkpoint', path)
+            self.assertIn('Re-embedded 3 chunks', out)
+            self.assertFalse(os.path.exists(path))  # completed runs clear the checkpoint
+            dtypes = list(AIChunk.objects.order_by('id').values_list('embedding_dtype', flat=True))
+            self.assertNotIn('float16', dtypes[:4])
+            self.assertEqual(dtypes[4:], ['float16'] * 3)
+            self._run('--all', '--limit', '2', '--checkpoint', path)
+            with open(path) as fh:
+                self.assertEqual(json.load(fh)['last_id'], self.ids[1])
+
+    def test_process_pool(self):
+        self.assertIn('Re-embedded 7 chunks', self._run('--workers', '1', '--batch', '2'))
+        self.assertEqual(AIChunk.objects.filter(embedding_model=HASH_MODEL, embedding_dim=32).count(), 7)
+
+    def test_aborts_without_writing_fallback_vectors(self):
+        with mock.patch.object(EmbeddingService, 'model_loader', side_effect=RuntimeError('no model')):
+            with self.assertRaises(CommandError):
+                call_command('reembed_chunks', '--backend', 'minilm', stdout=StringIO())
+        self.assertFalse(AIChunk.objects.filter(embedding_model__startswith='MiniLM').exists())
+
+    def test_index_rebuilds_after_reembedding(self):
+        self._run()
+        vec = embed_texts(['chunk text 2'])[0]
+        self.assertEqual(chunk_index.search(vec, 1)[0].chunk_id, self.ids[2])
+        before = chunk_index._slot(HASH_MODEL)['index']
+        self._run('--all', '--dtype', 'float16')
+        chunk_index.search(vec, 1)
+        self.assertIsNot(chunk_index._slot(HASH_MODEL)['index'], before)  # same row count, but vectors changed in place
@@ -0,0 +1,67 @@
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from ai import chunk_index
+from ai.ingestion import create_resource_with_chunks
+from ai.models import AIJob, AIJobContext
+from ai.rerank import mmr_select
+from ai.retrieval import retrieve_top_k
+from ai.tasks import run_plan
+from ai.vector_index import normalize_rows
+
+
+class MMRSelectTests(SimpleTestCase):
+    def _vecs(self, rows):
+        return normalize_rows(np.array(rows, dtype=np.float32))
+
+    def test_collapses_near_duplicates_and_prefers_diverse(self):
+        vecs = self._vecs([[1, 0, 0], [1, 0.01, 0], [0.8, 0.6, 0], [0, 1, 0]])
+        picked, stats = mmr_select(np.array([0.9, 0.89, 0.7, 0.5]), vecs, np.array([1, 1, 2, 3]), 3, dup_threshold=0.95)
+        self.assertEqual(picked[0], 0)
+        self.assertNotIn(1, picked)
+        self.assertEqual(stats.collapsed, 1)
+        self.assertEqual(stats.distinct_resources, 3)
+
+    def test_per_resource_cap_with_backfill(self):
+        vecs = self._vecs(np.eye(4).tolist())
+        rel = np.array([0.9, 0.8, 0.7, 0.1])
+        picked, stats = mmr_select(rel, vecs, np.array([1, 1, 1, 2]), 3, max_per_group=2)
+        self.assertEqual(sorted(picked), [0, 1, 3])
+        self.assertEqual(stats.capped, 1)
+        # Not enough resources: the capped chunk backfills instead of returning fewer than k
+        picked, stats = mmr_select(rel[:3], vecs[:3], np.array([1, 1, 1]), 3, max_per_group=2)
+        self.assertEqual(picked, [0, 1, 2])
+        self.assertEqual(stats.capped, 0)
+
+    def test_lambda_one_is_relevance_order(self):
+        vecs = self._vecs([[1, 0], [1, 0], [0, 1]])
+        picked, _ = mmr_select(np.array([0.3, 0.9, 0.5]), vecs, np.arange(3), 3, lambda_=1.0)
+        self.assertEqual(picked, [1, 2, 0])
+
+
+class RetrievalRerankTests(TestCase):
+    def setUp(self):
+        chunk_index.reset_index()
+
+    def test_results_capped_per_resource_and_metrics_reported(self):
+        long_doc = ' '.join(f'Budget paragraph {i} about eligible costs. ' * 20 for i in range(8))
+        big = create_resource_with_chunks(type_='sample', title='big', source_url='', full_text=long_doc)
+        for i in range(4):
+            create_resource_with_chunks(type_='sample', title=f'o{i}', source_url='', full_text=f'Other source {i} costs.')
+        self.assertGreater(big.chunks.count(), 3)  # type: ignore[attr-defined]
+        metrics: dict = {}
+        out = retrieve_top_k('Budget paragraph about eligible costs', k=4, metrics=metrics)
+        self.assertLessEqual(sum(1 for r in out if r['resource_id'] == big.id), 2)
+        self.assertEqual(len(out), 4)
+        for key in ('rerank_ms', 'rerank_pool', 'rerank_selected', 'distinct_resources', 'mean_similarity'):
+            self.assertIn(key, metrics)
+        plain = retrieve_top_k('Budget paragraph about eligible costs', k=4, rerank=False)
+        self.assertEqual(len(plain), 4)
+
+    def test_plan_job_context_records_rerank_metrics(self):
+        create_resource_with_chunks(type_='sample', title='s', source_url='', full_text='Plan sample text.')
+        user = get_user_model().objects.create_user(username='r', password='p')
+        job = AIJob.objects.create(type='plan', input_json={'grant_url': '', 'text_spec': 'sample'}, created_by=user)
+        run_plan(job.id)
+        metrics = AIJobContext.objects.get(job=job).retrieval_metrics
+        self.assertIn('rerank_selected', metrics)
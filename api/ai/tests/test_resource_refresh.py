@@ -0,0 +1,59 @@
+from django.test import TestCase, override_settings
+
+from ai import tasks
+from ai.ingestion import create_resource_with_chunks, refresh_resource
+from ai.models import AIChunk, AIResource
+from ai.retrieval import retrieve_top_k
+
+# One 16-token sentence per chunk with a 20-token budget
+SENTENCES = [f'Section {i} explains eligibility rules for partner {chr(97 + i)} institutions.' for i in range(6)]
+
+
+@override_settings(AI_CHUNK_MAX_TOKENS=20, AI_CHUNK_OVERLAP_TOKENS=0)
+class RefreshResourceTests(TestCase):
+    def setUp(self):
+        self.res = create_resource_with_chunks(
+            type_='call_snapshot', title='Call', source_url='https://funder.example/call', full_text='\n'.join(SENTENCES)
+        )
+        self.ids = dict(AIChunk.objects.filter(resource=self.res).values_list('text', 'id'))
+        self.assertEqual(len(self.ids), 6)
+
+    def test_only_changed_chunks_are_embedded(self):
+        updated = SENTENCES[:2] + ['Section 2 now requires a letter of support from the host.'] + SENTENCES[3:]
+        updated.append('Section 9 adds a second submission round in autumn.')
+        stats: dict = {}
+        res = refresh_resource(self.res, '\n'.join(updated), stats=stats)
+        self.assertEqual(res.id, self.res.id)
+        self.assertEqual((stats['reused'], stats['embedded'], stats['deleted']), (5, 2, 1))
+        rows = list(AIChunk.objects.filter(resource=res).order_by('ord').values_list('text', 'id'))
+        self.assertEqual([t for t, _ in rows], updated)
+        for text, cid in rows:
+            if text in self.ids:
+                self.assertEqual(cid, self.ids[text])  # unchanged chunk: same row, vector untouched
+        self.assertFalse(AIChunk.objects.filter(id=self.ids[SENTENCES[2]]).exists())
+        res.refresh_from_db()
+        self.assertEqual(res.version, 2)
+        self.assertEqual(res.metadata['chunks'], 7)
+        self.assertEqual(res.metadata['versions'][0]['version'], 1)
+        self.assertEqual(res.sha256, AIResource.compute_sha256('\n'.join(updated)))
+        top = retrieve_top_k('Section 9 adds a second submission round in autumn.', k=1)
+        self.assertEqual(top[0]['resource_id'], res.id)
+        self.assertNotIn(self.ids[SENTENCES[2]], [hit['chunk_id'] for hit in retrieve_top_k(SENTENCES[2], k=10)])
+
+    def test_reordered_chunks_reuse_every_vector(self):
+        stats: dict = {}
+        refresh_resource(self.res, '\n'.join(reversed(SENTENCES)), stats=stats)
+        self.assertEqual((stats['reused'], stats['embedded'], stats['deleted']), (6, 0, 0))
+        rows = list(AIChunk.objects.filter(resource=self.res).order_by('ord').values_list('id', flat=True))
+        self.assertEqual(rows, [self.ids[t] for t in reversed(SENTENCES)])
+
+    def test_unchanged_text_is_a_noop(self):
+        stats: dict = {}
+        with self.assertNumQueries(0):
+            refresh_resource(self.res, '\n'.join(SENTENCES), stats=stats)
+        self.assertEqual(stats['outcome'], 'unchanged')
+
+    def test_nightly_task_isolates_failures(self):
+        with self.assertLogs('ai.tasks', 'WARNING'):
+            counts = tasks.refresh_grant_calls()  # .example never resolves
+        self.assertEqual((counts['urls'], counts['failed']), (1, 1))
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ai import chunk_index
+from ai.ingestion import create_resource_with_chunks
+from ai.models import AIJob, AIJobContext, AIMetric
+from ai.retrieval import retrieve_top_k
+from ai.tasks import run_write
+from ai.timing import summarize_stages
+
+
+class SummarizeStagesTests(SimpleTestCase):
+    def test_percentiles_over_ms_keys_only(self):
+        rows = [{'score_ms': float(v), 'candidates_scored': 5} for v in range(1, 101)] + [{}]
+        out = summarize_stages(rows)
+        self.assertEqual(list(out), ['score_ms'])
+        self.assertEqual(out['score_ms']['count'], 100)
+        self.assertEqual(out['score_ms']['p50_ms'], 51.0)
+        self.assertEqual(out['score_ms']['p95_ms'], 95.0)
+        self.assertEqual(out['score_ms']['max_ms'], 100.0)
+
+
+@override_settings(AI_VECTOR_INDEX='flat')
+class RetrievalStageTimerTests(TestCase):
+    def setUp(self):
+        chunk_index.reset_index()
+        for i in range(4):
+            create_resource_with_chunks(type_='sample', title=f's{i}', source_url='', full_text=f'Stage timer text {i}.')
+
+    def test_retrieve_top_k_records_stage_timers(self):
+        metrics: dict = {}
+        retrieve_top_k('Stage timer text 2.', k=2, metrics=metrics)
+        for key in ('retrieval_ms', 'embed_ms', 'fetch_ms', 'decode_ms', 'score_ms'):
+            self.assertGreaterEqual(metrics[key], 0.0, key)
+        self.assertGreaterEqual(metrics['retrieval_ms'], metrics['score_ms'])
+        self.assertEqual(metrics['candidates_scored'], 4)  # flat index: every chunk vector scored
+
+        warm: dict = {}
+        retrieve_top_k('Stage timer text 2.', k=2, metrics=warm)
+        self.assertEqual(warm['decode_ms'], 0.0)  # index current: nothing decoded
+
+    def test_hybrid_mode_times_lexical_stage(self):
+        metrics: dict = {}
+        retrieve_top_k('timer', k=2, mode='hybrid', metrics=metrics)
+        self.assertIn('lexical_ms', metrics)
+        self.assertGreaterEqual(metrics['candidates_scored'], 4)  # lexical candidates + vector search
+
+
+class JobStageMetricsTests(TestCase):
+    def setUp(self):
+        chunk_index.reset_index()
+        create_resource_with_chunks(type_='sample', title='s', source_url='', full_text='Budget section sample text.')
+        self.user = get_user_model().objects.create_user(username='st', password='p')
+
+    @override_settings(AI_DEPLOYMENT_ID='release-42')
+    def test_write_job_persists_stages_and_summary_aggregates_them(self):
+        job = AIJob.objects.create(
+            type='write', input_json={'section_id': 'budget', 'answers': {'a': 'budget'}}, created_by=self.user
+        )
+        run_write(job.id)
+        context = AIJobContext.objects.get(job=job).retrieval_metrics
+        for key in ('embed_ms', 'score_ms', 'provider_ms', 'render_ms', 'candidates_scored'):
+            self.assertIn(key, context)
+        metric = AIMetric.objects.get(type='write')
+        self.assertEqual(metric.deployment, 'release-42')
+        for key in ('retrieval_ms', 'provider_ms', 'render_ms', 'persist_ms'):
+            self.assertIn(key, metric.stages)
+        self.assertNotIn('rerank_pool', metric.stages)  # only timers and counts
+
+        AIMetric.objects.create(type='write', model_id='m', duration_ms=10, stages={'provider_ms': 900.0}, deployment='old')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        stages = client.get('/api/ai/metrics/summary').json()['stages']
+        self.assertEqual(stages['window'], 2)
+        self.assertEqual(set(stages['by_deployment']), {'release-42', 'old'})
+        self.assertEqual(stages['by_deployment']['old']['provider_ms']['avg_ms'], 900.0)
+        self.assertIn('retrieval_ms', stages['by_type']['write'])
+        only = client.get('/api/ai/metrics/summary', {'deployment': 'old'}).json()['stages']
+        self.assertEqual(only['window'], 1)
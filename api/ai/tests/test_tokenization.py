@@ -0,0 +1,63 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ai.context_budget import apply_context_budget
+from ai.models import AIChunk, AIResource
+from ai.tokenization import ApproxTokenizer, chunk_text, count_tokens, get_tokenizer, tokenizer_name
+
+SENTENCES = [f'Sentence {i} describes the evaluation methodology for regional partners.' for i in range(30)]
+
+
+class TokenizerTests(SimpleTestCase):
+    def test_approx_counts_punctuation_and_long_words(self):
+        self.assertEqual(count_tokens('Grant budget.'), 3)
+        self.assertEqual(count_tokens('internationalization'), 4)  # 20 chars -> 6 + 6 + 6 + 2
+        self.assertGreater(count_tokens(' '.join(SENTENCES)), len(' '.join(SENTENCES).split()))
+        self.assertEqual(count_tokens(''), 0)
+
+    @override_settings(AI_TOKENIZER='/nonexistent/tokenizer.json')
+    def test_missing_tokenizer_file_falls_back_to_approx(self):
+        with self.assertLogs('ai.tokenization', 'WARNING'):
+            self.assertIsInstance(get_tokenizer(), ApproxTokenizer)
+
+    def test_chunks_respect_budget_and_sentence_boundaries(self):
+        text = ' '.join(SENTENCES)
+        chunks = chunk_text(text, max_tokens=40, overlap=0)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(count_tokens(chunk), 40)
+            self.assertTrue(chunk.startswith('Sentence') and chunk.endswith('.'))
+        self.assertEqual(' '.join(chunks), text)
+
+    def test_sliding_overlap_repeats_trailing_sentences(self):
+        chunks = chunk_text(' '.join(SENTENCES), max_tokens=40, overlap=20)  # one 16-token sentence carried
+        for prev, nxt in zip(chunks, chunks[1:]):
+            last = prev.rsplit('. ', 1)[-1]
+            self.assertTrue(nxt.startswith(last), (prev, nxt))
+            self.assertLessEqual(count_tokens(nxt), 40)
+
+    def test_overlong_sentence_is_cut_on_token_boundaries(self):
+        chunks = chunk_text('word ' * 95, max_tokens=40, overlap=0)
+        self.assertEqual([count_tokens(c) for c in chunks], [40, 40, 15])
+
+    def test_context_budget_uses_token_counts(self):
+        item = {'text': 'Budget: 10k, staff; travel.'}
+        self.assertEqual(
+            apply_context_budget(retrieval=[item], memory=[], file_refs=[], model_max_tokens=None).used_retrieval_tokens, 8
+        )
+
+
+class RecountTokensTests(TestCase):
+    def test_command_recounts_stale_rows_only(self):
+        res = AIResource.objects.create(type='sample', title='old', sha256='b' * 64)
+        stale = AIChunk.objects.create(resource=res, ord=0, text='Legacy chunk, counted by words.', token_len=5)
+        fresh = AIChunk.objects.create(resource=res, ord=1, text='Already counted.', token_len=99, tokenizer=tokenizer_name())
+        out = StringIO()
+        call_command('recount_tokens', stdout=out)
+        self.assertIn('Recounted 1 chunks', out.getvalue())
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.token_len, stale.tokenizer), (8, tokenizer_name()))
+        self.assertEqual(fresh.token_len, 99)
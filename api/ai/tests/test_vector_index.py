@@ -0,0 +1,89 @@
+import os
+import random
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+from ai.retrieval import _cosine
+from ai.vector_index import EmbeddingMatrix, IVFFlatIndex, load_index, recall_at_k, synthetic_vectors
+
+
+class EmbeddingMatrixTests(SimpleTestCase):
+    def test_matches_pure_python_cosine_ordering(self):
+        rng = random.Random(7)
+        ids = list(range(1, 301))
+        vectors = [[rng.random() for _ in range(32)] for _ in ids]
+        query = [rng.random() for _ in range(32)]
+        matrix = EmbeddingMatrix.build(ids, vectors, dim=32)
+        expected = sorted(((_cosine(query, v), i) for i, v in zip(ids, vectors)), key=lambda x: (-x[0], x[1]))[:6]
+        got = matrix.top_k(query, 6)
+        self.assertEqual([i for i, _ in got], [i for _, i in expected])
+        for (_, score), (exp_score, _) in zip(got, expected):
+            self.assertAlmostEqual(score, exp_score, places=5)
+
+    def test_ties_broken_by_chunk_id(self):
+        vec = [1.0, 0.0, 0.0]
+        matrix = EmbeddingMatrix.build([9, 3, 5, 1], [vec, vec, vec, [0.0, 1.0, 0.0]], dim=3)
+        self.assertEqual([i for i, _ in matrix.top_k(vec, 2)], [3, 5])
+        self.assertEqual([i for i, _ in matrix.top_k(vec, 10)], [3, 5, 9, 1])
+
+    def test_mismatched_dimensions_and_zero_vectors(self):
+        matrix = EmbeddingMatrix.build([1, 2, 3], [[0.0, 0.0], [1.0, 1.0, 1.0], [0.5, 0.5]], dim=2)
+        self.assertEqual(len(matrix), 2)
+        hits = matrix.top_k([1.0, 1.0], 5)
+        self.assertEqual([i for i, _ in hits], [3, 1])
+        self.assertEqual(hits[1][1], 0.0)
+        self.assertEqual(EmbeddingMatrix.build([], [], dim=4).top_k([1, 0, 0, 0], 3), [])
+
+
+class IVFFlatIndexTests(SimpleTestCase):
+    def test_recall_against_brute_force(self):
+        vectors = synthetic_vectors(4000, 32, clusters=16, seed=3)
+        ids = np.arange(1, 4001)
+        flat = EmbeddingMatrix(ids, vectors)
+        ivf = IVFFlatIndex(ids, vectors.copy(), nprobe=8, min_train=100)
+        ivf.train()
+        self.assertTrue(ivf.is_trained)
+        queries = vectors[:50]
+        exact = [[i for i, _ in flat.top_k(q, 6)] for q in queries]
+        approx = [[i for i, _ in ivf.top_k(q, 6)] for q in queries]
+        self.assertGreaterEqual(recall_at_k(approx, exact), 0.9)
+
+    def test_small_index_scans_exactly_and_add_replace_remove(self):
+        ivf = IVFFlatIndex.empty(2, min_train=10)
+        ivf.add([1, 2], [[1.0, 0.0], [0.0, 1.0]])
+        ivf.add([1], [[0.0, 2.0]])  # replace row 1
+        self.assertFalse(ivf.is_trained)
+        self.assertEqual([i for i, _ in ivf.top_k([0.0, 1.0], 2)], [1, 2])
+        ivf.remove([2])
+        self.assertEqual(len(ivf), 1)
+
+    def test_save_and_load_round_trip(self):
+        vectors = synthetic_vectors(300, 8, clusters=4)
+        ivf = IVFFlatIndex(np.arange(300), vectors, nprobe=2, min_train=50)
+        ivf.train(nlist=6)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'idx.npz')
+            ivf.save(path, stamp=np.array(['1', '2', 'x']))
+            loaded, extra = load_index(path)
+        self.assertIsInstance(loaded, IVFFlatIndex)
+        self.assertEqual(list(extra['stamp']), ['1', '2', 'x'])
+        self.assertEqual(loaded.top_k(vectors[5], 4), ivf.top_k(vectors[5], 4))
+
+    def test_score_ids_exact_for_requested_rows(self):
+        matrix = EmbeddingMatrix.build([5, 2, 9], [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], dim=2)
+        got = matrix.score_ids([1.0, 0.0], [9, 4, 5])
+        self.assertEqual([i for i, _ in got], [9, 5])
+        self.assertAlmostEqual(got[0][1], 2**-0.5, places=5)
+        self.assertAlmostEqual(got[1][1], 1.0, places=5)
+
+    def test_filtered_search_scores_only_partition_rows(self):
+        vectors = synthetic_vectors(2000, 16, clusters=8, seed=5)
+        ids = np.arange(1, 2001)
+        ivf = IVFFlatIndex(ids, vectors.copy(), nprobe=2, min_train=100)
+        ivf.train()
+        flat = EmbeddingMatrix(ids, vectors)
+        for rows in (np.arange(0, 2000, 50), np.arange(0, 2000, 2)):  # small partition (exact) and large (probed)
+            got = ivf.top_k(vectors[0], 5, rows=rows)
+            self.assertTrue(all((cid - 1) in set(rows.tolist()) for cid, _ in got))
+            self.assertEqual(got[0], flat.top_k(vectors[0], 1, rows=rows)[0])
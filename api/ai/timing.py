@@ -0,0 +1,60 @@
+"""Stage timers for retrieval and AI job metrics.
+
+Timings are accumulated in plain ``dict`` metrics (``<stage>_ms`` keys, milliseconds,
+summed when a stage runs more than once, e.g. two index searches in hybrid mode) so they
+can be stored as-is in ``AIJobContext.retrieval_metrics`` and ``AIMetric.stages``.
+Every helper is a no-op when ``metrics`` is ``None``.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+
+def add_ms(metrics: dict | None, stage: str, seconds: float) -> None:
+    if metrics is not None:
+        metrics[stage] = round(metrics.get(stage, 0.0) + seconds * 1000, 3)
+
+
+def add_count(metrics: dict | None, key: str, n: int) -> None:
+    if metrics is not None:
+        metrics[key] = metrics.get(key, 0) + int(n)
+
+
+@contextmanager
+def timed(metrics: dict | None, stage: str) -> Iterator[None]:
+    """Add the wall-clock time of the block to ``metrics[stage]``."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_ms(metrics, stage, time.perf_counter() - t0)
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize_stages(rows: Iterable[dict]) -> dict[str, dict]:
+    """Per-stage ``count`` / ``avg_ms`` / ``p50_ms`` / ``p95_ms`` / ``max_ms`` over stage dicts (``*_ms`` keys only)."""
+    samples: dict[str, list[float]] = {}
+    for row in rows:
+        for key, value in (row or {}).items():
+            if key.endswith('_ms') and isinstance(value, (int, float)):
+                samples.setdefault(key, []).append(float(value))
+    out: dict[str, dict] = {}
+    for key in sorted(samples):
+        ordered = sorted(samples[key])
+        out[key] = {
+            'count': len(ordered),
+            'avg_ms': round(sum(ordered) / len(ordered), 3),
+            'p50_ms': round(_percentile(ordered, 0.5), 3),
+            'p95_ms': round(_percentile(ordered, 0.95), 3),
+            'max_ms': round(ordered[-1], 3),
+        }
+    return out
+
+
+__all__ = ['add_count', 'add_ms', 'summarize_stages', 'timed']
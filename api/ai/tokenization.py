@@ -0,0 +1,200 @@
+"""Token counting and token-budgeted chunking for ingestion and context budgets.
+
+``AIChunk.token_len`` drives ``retrieval._trim_to_token_budget`` and
+``context_budget.apply_context_budget``, so it is counted with the tokenizer
+selected by ``AI_TOKENIZER`` and stored next to its name (``AIChunk.tokenizer``):
+
+- ``approx`` (default): regex pre-tokenizer close to WordPiece/BPE counts --
+  words and punctuation are separate tokens and long words count one token per
+  ``WORD_PIECE`` characters (whitespace word counts were 30-50% low).
+- ``onnx``: ``tokenizer.json`` from ``AI_ONNX_MODEL_DIR`` (the served MiniLM).
+- a path to any HuggingFace ``tokenizer.json``.
+
+The last two need the optional ``tokenizers`` package; when it or the file is
+missing the approximate tokenizer is used (logged once). Counts are memoized
+per (tokenizer, text) in-process; rows whose ``tokenizer`` differs from the
+active one are recounted with ``python manage.py recount_tokens``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+WORD_PIECE = 6  # characters per token inside long words (approx tokenizer)
+MAX_CHUNKS = 200  # safety cap per resource
+_PIECE_RE = re.compile(r'\w+|[^\w\s]')
+_SENTENCE_RE = re.compile(r'\n+|(?<=[.!?])\s+')
+
+
+class Tokenizer(Protocol):
+    name: str
+
+    def spans(self, text: str) -> list[tuple[int, int]]:
+        """(start, end) character offsets of the tokens of ``text`` (no special tokens)."""
+        ...
+
+
+class ApproxTokenizer:
+    name = 'approx-v1'
+
+    def spans(self, text: str) -> list[tuple[int, int]]:
+        out: list[tuple[int, int]] = []
+        for m in _PIECE_RE.finditer(text):
+            start, end = m.span()
+            while end - start > WORD_PIECE:  # long words: one token per WORD_PIECE characters, like subword vocabularies
+                out.append((start, start + WORD_PIECE))
+                start += WORD_PIECE
+            out.append((start, end))
+        return out
+
+
+class HFTokenizer:
+    """HuggingFace ``tokenizers`` file, without truncation or padding."""
+
+    def __init__(self, path: str) -> None:
+        from tokenizers import Tokenizer as _Tokenizer  # type: ignore
+
+        with open(path, 'rb') as fh:
+            digest = hashlib.sha256(fh.read()).hexdigest()[:12]
+        self._tok = _Tokenizer.from_file(path)
+        self._tok.no_truncation()
+        self._tok.no_padding()
+        self.name = f'hf-{digest}'
+
+    def spans(self, text: str) -> list[tuple[int, int]]:
+        enc = self._tok.encode(text, add_special_tokens=False)
+        return [(s, e) for s, e in enc.offsets if e > s]
+
+
+_active: tuple[str, Tokenizer] | None = None
+
+
+def _spec() -> str:
+    from django.conf import settings
+
+    return (getattr(settings, 'AI_TOKENIZER', 'approx') or 'approx').strip()
+
+
+def get_tokenizer() -> Tokenizer:
+    """Tokenizer for the current ``AI_TOKENIZER`` (resolved once per setting value)."""
+    global _active
+    spec = _spec()
+    if _active is not None and _active[0] == spec:
+        return _active[1]
+    tokenizer: Tokenizer = ApproxTokenizer()
+    if spec != 'approx':
+        from django.conf import settings
+
+        path = os.path.join(getattr(settings, 'AI_ONNX_MODEL_DIR', ''), 'tokenizer.json') if spec == 'onnx' else spec
+        try:
+            tokenizer = HFTokenizer(path)
+        except Exception as exc:  # noqa: BLE001 - optional dependency / missing file
+            logger.warning('AI_TOKENIZER=%s unavailable (%s); using approximate token counts', spec, exc)
+    _active = (spec, tokenizer)
+    return tokenizer
+
+
+@lru_cache(maxsize=8192)
+def _count(name: str, text: str) -> int:
+    return len(get_tokenizer().spans(text))
+
+
+def count_tokens(text: str | None) -> int:
+    if not text:
+        return 0
+    return _count(get_tokenizer().name, text)
+
+
+def tokenizer_name() -> str:
+    return get_tokenizer().name
+
+
+def _sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+
+
+def chunk_text(text: str, *, max_tokens: int | None = None, overlap: int | None = None) -> list[str]:
+    """Split ``text`` into chunks of at most ``max_tokens`` tokens on sentence boundaries.
+
+    Sentences are packed greedily; a sentence longer than the budget is cut on token
+    boundaries. Each chunk after the first starts with the trailing whole sentences of
+    the previous one that fit in ``overlap`` tokens (sliding overlap; 0 disables).
+    Defaults: ``AI_CHUNK_MAX_TOKENS`` / ``AI_CHUNK_OVERLAP_TOKENS``.
+    """
+    from django.conf import settings
+
+    tokenizer = get_tokenizer()
+    if max_tokens is None:
+        max_tokens = int(getattr(settings, 'AI_CHUNK_MAX_TOKENS', 200))
+    if overlap is None:
+        overlap = int(getattr(settings, 'AI_CHUNK_OVERLAP_TOKENS', 0))
+    max_tokens = max(1, max_tokens)
+    overlap = max(0, min(overlap, max_tokens // 2))
+    units: list[tuple[str, int]] = []
+    for sentence in _sentences(text):
+        n = count_tokens(sentence)
+        if n <= max_tokens:
+            units.append((sentence, n))
+            continue
+        spans = tokenizer.spans(sentence)
+        for start in range(0, len(spans), max_tokens):
+            part = spans[start : start + max_tokens]
+            units.append((sentence[part[0][0] : part[-1][1]], len(part)))
+    chunks: list[str] = []
+    current: list[tuple[str, int]] = []
+    used = 0
+    for unit in units:
+        if current and used + unit[1] > max_tokens:
+            chunks.append(' '.join(t for t, _ in current))
+            if len(chunks) >= MAX_CHUNKS:
+                return chunks
+            carry: list[tuple[str, int]] = []
+            carried = 0
+            for t, n in reversed(current):
+                if carried + n > overlap or carried + n + unit[1] > max_tokens:
+                    break
+                carry.insert(0, (t, n))
+                carried += n
+            current, used = carry, carried
+        current.append(unit)
+        used += unit[1]
+    if current:
+        chunks.append(' '.join(t for t, _ in current))
+    return chunks[:MAX_CHUNKS]
+
+
+def recount_token_lens(chunk_model, *, batch: int = 500, stale_only: bool = True) -> int:
+    """Recount ``token_len`` with the active tokenizer (live or historical migration model); returns rows updated."""
+    name = tokenizer_name()
+    qs = chunk_model.objects.all()
+    if stale_only:
+        qs = qs.exclude(tokenizer=name)
+    done = 0
+    last_id = 0
+    while True:
+        rows = list(qs.filter(id__gt=last_id).order_by('id').values_list('id', 'text')[:batch])
+        if not rows:
+            return done
+        last_id = rows[-1][0]
+        updates = [chunk_model(id=cid, token_len=count_tokens(text), tokenizer=name) for cid, text in rows]
+        chunk_model.objects.bulk_update(updates, ['token_len', 'tokenizer'])
+        done += len(updates)
+
+
+__all__ = [
+    'ApproxTokenizer',
+    'HFTokenizer',
+    'MAX_CHUNKS',
+    'chunk_text',
+    'count_tokens',
+    'get_tokenizer',
+    'recount_token_lens',
+    'tokenizer_name',
+]
@@ -0,0 +1,379 @@
+"""Vector indexes for retrieval (exact + approximate).
+
+Chunk embeddings are packed into one contiguous float32 matrix whose rows are
+pre-normalized to unit length, so cosine similarity against a query collapses
+into a single matrix-vector product. Top-k selection uses ``argpartition`` and
+then sorts only the selected rows by (-score, chunk_id), preserving the
+deterministic ordering contract of the original pure-Python scan.
+
+Index kinds (``AI_VECTOR_INDEX``):
+  - ``flat``: exact brute-force scan (``EmbeddingMatrix``)
+  - ``ivf``: inverted-file index (``IVFFlatIndex``); k-means partitions the
+    vectors into ``nlist`` cells and a query only scores the ``nprobe`` cells
+    whose centroids are closest. Below ``min_train`` rows it scans exactly.
+
+Both kinds are pure NumPy and persist to a single ``.npz`` file.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Iterable, Sequence
+
+import numpy as np
+
+
+def normalize_rows(mat: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place (zero rows stay zero) and return the matrix."""
+    if mat.size == 0:
+        return mat
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    mat /= norms
+    return mat
+
+
+def normalize_vector(vec: Sequence[float] | np.ndarray) -> np.ndarray:
+    q = np.asarray(vec, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(q))
+    if norm:
+        q = q / norm
+    return q
+
+
+def select_top_k(scores: np.ndarray, ids: np.ndarray, k: int) -> np.ndarray:
+    """Return row positions of the k best scores ordered by (-score, id).
+
+    ``argpartition`` finds the k-th best score in O(n); every row tied with it
+    is kept as a candidate so the id tie-break stays exact before truncating.
+    """
+    n = scores.shape[0]
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        part = np.argpartition(-scores, k - 1)[:k]
+        kth = scores[part].min()
+        cand = np.flatnonzero(scores >= kth)
+    else:
+        cand = np.arange(n)
+    order = np.lexsort((ids[cand], -scores[cand]))
+    return cand[order[:k]]
+
+
+class EmbeddingMatrix:
+    """Exact (flat) index: chunk ids + unit-length float32 vectors."""
+
+    kind = 'flat'
+
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        self.ids = ids
+        self.vectors = vectors
+        self._by_id: np.ndarray | None = None  # row positions sorted by id (lazy, for score_ids)
+        self.version = 0  # bumped on every mutation; lets callers cache row-aligned data (filter partitions)
+        self.last_scored = 0  # vectors scored by the latest top_k / score_ids call (retrieval metrics)
+
+    @classmethod
+    def empty(cls, dim: int) -> EmbeddingMatrix:
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=np.float32))
+
+    @classmethod
+    def build(cls, ids: Sequence[int], vectors: Sequence[Sequence[float]], *, dim: int) -> EmbeddingMatrix:
+        """Pack rows of width ``dim``; rows of any other width are skipped."""
+        keep = [i for i, v in enumerate(vectors) if v is not None and len(v) == dim]
+        mat = np.empty((len(keep), dim), dtype=np.float32)
+        for row, i in enumerate(keep):
+            mat[row] = vectors[i]
+        id_arr = np.fromiter((ids[i] for i in keep), dtype=np.int64, count=len(keep))
+        index = cls.empty(dim)
+        index._append(id_arr, normalize_rows(mat))
+        return index
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1])
+
+    # -- mutation --------------------------------------------------------
+    def add(self, ids: Sequence[int], vectors: Sequence[Sequence[float]] | np.ndarray) -> None:
+        """Insert (or replace) rows. Vectors are copied and normalized."""
+        id_arr = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if not id_arr.size:
+            return
+        mat = normalize_rows(np.array(vectors, dtype=np.float32).reshape(id_arr.size, self.dim))
+        self.remove(id_arr)
+        self._append(id_arr, mat)
+
+    def remove(self, ids: Iterable[int] | np.ndarray) -> None:
+        id_arr = np.asarray(list(ids) if not isinstance(ids, np.ndarray) else ids, dtype=np.int64)
+        if not id_arr.size or not len(self):
+            return
+        keep = ~np.isin(self.ids, id_arr)
+        if not keep.all():
+            self._keep_rows(keep)
+
+    def _append(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        self.ids = np.concatenate([self.ids, ids])
+        self.vectors = np.ascontiguousarray(np.concatenate([self.vectors, vectors]))
+        self._by_id = None
+        self.version += 1
+
+    def _keep_rows(self, mask: np.ndarray) -> None:
+        self.ids = self.ids[mask]
+        self.vectors = np.ascontiguousarray(self.vectors[mask])
+        self._by_id = None
+        self.version += 1
+
+    # -- search ------------------------------------------------------------
+    def scores(self, query: Sequence[float] | np.ndarray) -> np.ndarray:
+        return self.vectors @ normalize_vector(query)
+
+    def top_k(self, query: Sequence[float] | np.ndarray, k: int, *, rows: np.ndarray | None = None) -> list[tuple[int, float]]:
+        """Return ``[(chunk_id, score), ...]`` best first, ties broken by chunk id.
+
+        ``rows`` restricts the search to those row positions (a filter partition); only they are scored.
+        """
+        self.last_scored = 0
+        if not len(self):
+            return []
+        if rows is not None:
+            return self._top_k_rows(normalize_vector(query), k, rows)
+        scores = self.scores(query)
+        self.last_scored = len(self)
+        sel = select_top_k(scores, self.ids, k)
+        return [(int(self.ids[i]), float(scores[i])) for i in sel]
+
+    def _top_k_rows(self, q: np.ndarray, k: int, rows: np.ndarray) -> list[tuple[int, float]]:
+        if not rows.size:
+            return []
+        scores = self.vectors[rows] @ q
+        self.last_scored += int(rows.size)
+        sel = select_top_k(scores, self.ids[rows], k)
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in sel]
+
+    def rows_for(self, ids: Iterable[int]) -> tuple[np.ndarray, np.ndarray]:
+        """(ids found, their row positions), in input order; ids not in the index are skipped."""
+        want = np.fromiter(ids, dtype=np.int64)
+        if not want.size or not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.intp)
+        if self._by_id is None:
+            self._by_id = np.argsort(self.ids, kind='stable')
+        sorted_ids = self.ids[self._by_id]
+        pos = np.minimum(np.searchsorted(sorted_ids, want), len(self) - 1)
+        found = sorted_ids[pos] == want
+        return want[found], self._by_id[pos[found]]
+
+    def score_ids(self, query: Sequence[float] | np.ndarray, ids: Iterable[int]) -> list[tuple[int, float]]:
+        """Exact scores for the given ids (ids not in the index are skipped), in input order."""
+        found, rows = self.rows_for(ids)
+        self.last_scored = int(found.size)
+        if not found.size:
+            return []
+        scores = self.vectors[rows] @ normalize_vector(query)
+        return list(zip(found.tolist(), scores.tolist()))
+
+    # -- persistence -------------------------------------------------------
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return {'kind': np.array(self.kind), 'ids': self.ids, 'vectors': self.vectors}
+
+    @classmethod
+    def _from_arrays(cls, data) -> EmbeddingMatrix:
+        return cls(data['ids'].astype(np.int64), np.ascontiguousarray(data['vectors'], dtype=np.float32))
+
+    def save(self, path: str, **extra: np.ndarray) -> None:
+        """Write atomically (temp file + rename) so readers never see a partial index."""
+        tmp = f'{path}.tmp{os.getpid()}'
+        with open(tmp, 'wb') as fh:
+            np.savez(fh, **self._arrays(), **extra)
+        os.replace(tmp, path)
+
+
+class IVFFlatIndex(EmbeddingMatrix):
+    """Inverted-file index with exact scoring inside the probed cells."""
+
+    kind = 'ivf'
+
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, *, nprobe: int = 8, min_train: int = 1024) -> None:
+        super().__init__(ids, vectors)
+        self.nprobe = nprobe
+        self.min_train = min_train
+        self.centroids: np.ndarray | None = None
+        self.assign = np.empty(0, dtype=np.int32)
+        self.trained_size = 0
+        self._lists: list[np.ndarray] | None = None
+
+    @classmethod
+    def empty(cls, dim: int, **opts) -> IVFFlatIndex:
+        return cls(np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=np.float32), **opts)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def needs_training(self) -> bool:
+        """Untrained past ``min_train`` rows, or grown 2x since the last training."""
+        n = len(self)
+        if n < self.min_train:
+            return False
+        return not self.is_trained or n > 2 * self.trained_size
+
+    def train(self, *, nlist: int | None = None, iters: int = 10, sample: int = 50_000, seed: int = 0) -> None:
+        """Spherical k-means over (a deterministic sample of) the stored rows."""
+        n = len(self)
+        if n < self.min_train:
+            self.centroids = None
+            self.assign = np.empty(0, dtype=np.int32)
+            self._lists = None
+            return
+        nlist = nlist or int(min(4096, max(8, np.sqrt(n))))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(seed)
+        data = self.vectors if n <= sample else self.vectors[np.sort(rng.choice(n, sample, replace=False))]
+        cent = data[rng.choice(data.shape[0], nlist, replace=False)].copy()
+        for _ in range(iters):
+            labels = _nearest(data, cent)
+            sums = np.zeros_like(cent)
+            np.add.at(sums, labels, data)
+            counts = np.bincount(labels, minlength=nlist)
+            filled = counts > 0
+            cent[filled] = sums[filled]  # empty cells keep their previous centroid
+            normalize_rows(cent)
+        self.centroids = cent
+        self.assign = _nearest(self.vectors, cent).astype(np.int32)
+        self.trained_size = n
+        self._lists = None
+
+    def _append(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        super()._append(ids, vectors)
+        if self.centroids is not None:
+            self.assign = np.concatenate([self.assign, _nearest(vectors, self.centroids).astype(np.int32)])
+            self._lists = None
+
+    def _keep_rows(self, mask: np.ndarray) -> None:
+        super()._keep_rows(mask)
+        if self.centroids is not None:
+            self.assign = self.assign[mask]
+            self._lists = None
+
+    def _inverted_lists(self) -> list[np.ndarray]:
+        if self._lists is None:
+            assert self.centroids is not None
+            order = np.argsort(self.assign, kind='stable')
+            bounds = np.searchsorted(self.assign[order], np.arange(self.centroids.shape[0] + 1))
+            self._lists = [order[bounds[c] : bounds[c + 1]] for c in range(self.centroids.shape[0])]
+        return self._lists
+
+    def top_k(
+        self,
+        query: Sequence[float] | np.ndarray,
+        k: int,
+        *,
+        nprobe: int | None = None,
+        rows: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        if self.centroids is None:
+            return super().top_k(query, k, rows=rows)
+        self.last_scored = 0
+        if not len(self):
+            return []
+        q = normalize_vector(query)
+        nlist = self.centroids.shape[0]
+        probe = min(nprobe or self.nprobe, nlist)
+        if rows is not None and rows.size <= 2 * len(self) * probe / nlist:
+            # Small partition: an exact scan of it costs no more than probing cells
+            return self._top_k_rows(q, k, rows)
+        cells = np.argpartition(-(self.centroids @ q), probe - 1)[:probe]
+        self.last_scored = nlist  # centroid scores
+        lists = self._inverted_lists()
+        cand = np.concatenate([lists[c] for c in cells])
+        if rows is not None:
+            allowed = np.zeros(len(self), dtype=bool)
+            allowed[rows] = True
+            cand = cand[allowed[cand]]
+            if cand.size < k:  # probed cells too sparse for this filter
+                return self._top_k_rows(q, k, rows)
+        return self._top_k_rows(q, k, cand)
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        arrays = super()._arrays()
+        arrays['params'] = np.array([self.nprobe, self.min_train, self.trained_size], dtype=np.int64)
+        if self.centroids is not None:
+            arrays['centroids'] = self.centroids
+            arrays['assign'] = self.assign
+        return arrays
+
+    @classmethod
+    def _from_arrays(cls, data) -> IVFFlatIndex:
+        nprobe, min_train, trained_size = (int(x) for x in data['params'])
+        index = cls(
+            data['ids'].astype(np.int64),
+            np.ascontiguousarray(data['vectors'], dtype=np.float32),
+            nprobe=nprobe,
+            min_train=min_train,
+        )
+        if 'centroids' in data:
+            index.centroids = np.ascontiguousarray(data['centroids'], dtype=np.float32)
+            index.assign = data['assign'].astype(np.int32)
+            index.trained_size = trained_size
+        return index
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, *, batch: int = 8192) -> np.ndarray:
+    """Closest centroid (max inner product) per row, batched to bound memory."""
+    out = np.empty(vectors.shape[0], dtype=np.int64)
+    for start in range(0, vectors.shape[0], batch):
+        out[start : start + batch] = np.argmax(vectors[start : start + batch] @ centroids.T, axis=1)
+    return out
+
+
+INDEX_KINDS: dict[str, type[EmbeddingMatrix]] = {
+    EmbeddingMatrix.kind: EmbeddingMatrix,
+    IVFFlatIndex.kind: IVFFlatIndex,
+}
+
+
+def load_index(path: str) -> tuple[EmbeddingMatrix, dict[str, np.ndarray]]:
+    """Load an index saved with ``save``; returns (index, extra arrays)."""
+    with np.load(path, allow_pickle=False) as data:
+        kind = str(data['kind'])
+        if kind not in INDEX_KINDS:
+            raise ValueError(f'unknown index kind: {kind}')
+        index = INDEX_KINDS[kind]._from_arrays(data)
+        known = set(index._arrays()) | {'params', 'centroids', 'assign'}
+        extra = {name: data[name] for name in data.files if name not in known}
+    return index, extra
+
+
+def recall_at_k(approx: Sequence[Sequence[int]], exact: Sequence[Sequence[int]]) -> float:
+    """Mean fraction of the exact top-k ids recovered by the approximate search."""
+    total = 0.0
+    counted = 0
+    for a, e in zip(approx, exact):
+        if not e:
+            continue
+        total += len(set(a) & set(e)) / len(e)
+        counted += 1
+    return total / counted if counted else 1.0
+
+
+def synthetic_vectors(n: int, dim: int, *, clusters: int = 32, noise: float = 0.35, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors (benchmark / test corpus resembling topical text embeddings)."""
+    rng = np.random.default_rng(seed)
+    centers = normalize_rows(rng.standard_normal((clusters, dim)).astype(np.float32))
+    labels = rng.integers(0, clusters, size=n)
+    pts = centers[labels] + noise * rng.standard_normal((n, dim)).astype(np.float32) / np.sqrt(dim)
+    return normalize_rows(pts.astype(np.float32))
+
+
+__all__ = [
+    'EmbeddingMatrix',
+    'IVFFlatIndex',
+    'INDEX_KINDS',
+    'load_index',
+    'normalize_rows',
+    'normalize_vector',
+    'recall_at_k',
+    'select_top_k',
+    'synthetic_vectors',
+]
@@ -6,7 +6,7 @@ from .sanitize import sanitize_text, sanitize_url, sanitize_answers, sanitize_fi
 import time
 from .models import AIJob
 from .section_materializer import materialize_sections
-from .tasks import run_plan, run_write, run_revise, run_format
+from .tasks import run_plan, run_write, run_revise, run_format, submit_job
 from .provider import get_provider
 from django.db.models import QuerySet
 from typing import Optional
@@ -36,6 +36,14 @@ class DebugOrAuthPermission(BasePermission):
         return IsAuthenticated().has_permission(request, view)
 
 
+def _job_ack(job: AIJob, outcome: str) -> dict:
+    """Async submission response; ``dedup`` tells a retry it was attached to (or served by) an earlier job."""
+    ack = {'job_id': job.id, 'status': job.status}  # type: ignore[attr-defined]
+    if outcome != 'created':
+        ack['dedup'] = outcome
+    return ack
+
+
 def _compute_rate_limits(tier: str) -> int:
     """Return max requests per minute for the given tier.
 
@@ -218,17 +226,18 @@ def plan(request):
     text_spec = sanitize_text(request.data.get('text_spec'), max_len=4000)
     async_enabled = getattr(settings, 'AI_ASYNC', False) and settings.CELERY_BROKER_URL
     if async_enabled:
-        job = AIJob.objects.create(
-            type='plan',
-            input_json={
+        job, outcome = submit_job(
+            'plan',
+            {
                 'grant_url': grant_url or None,
                 'text_spec': text_spec or None,
             },
             created_by=(getattr(request, 'user', None) if request.user.is_authenticated else None),
             org_id=request.META.get('HTTP_X_ORG_ID', ''),
         )
-        run_plan.delay(job.id)  # type: ignore[attr-defined]
-        return Response({'job_id': job.id, 'status': job.status})  # type: ignore[attr-defined]
+        if outcome == 'created':
+            run_plan.delay(job.id)  # type: ignore[attr-defined]
+        return Response(_job_ack(job, outcome))
     provider = get_provider(getattr(settings, 'AI_PROVIDER', None))
     t0 = time.time()
     try:
@@ -290,9 +299,9 @@ def write(request):
     file_refs = sanitize_file_refs(request.data.get('file_refs', []))
     async_enabled = getattr(settings, 'AI_ASYNC', False) and settings.CELERY_BROKER_URL
     if async_enabled:
-        job = AIJob.objects.create(
-            type='write',
-            input_json={
+        job, outcome = submit_job(
+            'write',
+            {
                 'proposal_id': proposal_id,
                 'section_id': section_id,
                 'answers': answers,
@@ -303,12 +312,13 @@ def write(request):
         )
         # Ensure background path does not break test expecting second call limited (guard already set)
         try:  # pragma: no cover - safety
-            run_write.delay(job.id)  # type: ignore[attr-defined]
+            if outcome == 'created':
+                run_write.delay(job.id)  # type: ignore[attr-defined]
         except Exception:
             # Fallback: run synchronously if Celery misconfigured in test
             provider = get_provider(getattr(settings, 'AI_PROVIDER', None))
             provider.write(section_id=section_id, answers=answers, file_refs=file_refs or None)
-        return Response({'job_id': job.id, 'status': job.status})  # type: ignore[attr-defined]
+        return Response(_job_ack(job, outcome))
     provider = get_provider(getattr(settings, 'AI_PROVIDER', None))
     t0 = time.time()
     # Fetch memory suggestions (user or org scope) to enrich context (not persisted provider-side yet)
@@ -391,9 +401,9 @@ def revise(request):
     file_refs = sanitize_file_refs(request.data.get('file_refs', []))
     async_enabled = getattr(settings, 'AI_ASYNC', False) and settings.CELERY_BROKER_URL
     if async_enabled:
-        job = AIJob.objects.create(
-            type='revise',
-            input_json={
+        job, outcome = submit_job(
+            'revise',
+            {
                 'proposal_id': proposal_id,
                 'section_id': section_id,
                 'base_text': base_text,
@@ -403,8 +413,9 @@ def revise(request):
             created_by=(getattr(request, 'user', None) if request.user.is_authenticated else None),
             org_id=request.META.get('HTTP_X_ORG_ID', ''),
         )
-        run_revise.delay(job.id)  # type: ignore[attr-defined]
-        return Response({'job_id': job.id, 'status': job.status})  # type: ignore[attr-defined]
+        if outcome == 'created':
+            run_revise.delay(job.id)  # type: ignore[attr-defined]
+        return Response(_job_ack(job, outcome))
     provider = get_provider(getattr(settings, 'AI_PROVIDER', None))
     # --- Revision cap pre-check (sync path only; async handled in task) ---
     if section_id:
@@ -534,9 +545,9 @@ def format(request):
     file_refs = sanitize_file_refs(request.data.get('file_refs', []))
     async_enabled = getattr(settings, 'AI_ASYNC', False) and settings.CELERY_BROKER_URL
     if async_enabled:
-        job = AIJob.objects.create(
-            type='format',
-            input_json={
+        job, outcome = submit_job(
+            'format',
+            {
                 'proposal_id': proposal_id,
                 'full_text': full_text,
                 'template_hint': template_hint or None,
@@ -545,8 +556,9 @@ def format(request):
             created_by=(getattr(request, 'user', None) if request.user.is_authenticated else None),
             org_id=request.META.get('HTTP_X_ORG_ID', ''),
         )
-        run_format.delay(job.id)  # type: ignore[attr-defined]
-        return Response({'job_id': job.id, 'status': job.status})  # type: ignore[attr-defined]
+        if outcome == 'created':
+            run_format.delay(job.id)  # type: ignore[attr-defined]
+        return Response(_job_ack(job, outcome))
     provider = get_provider(getattr(settings, 'AI_PROVIDER', None))
     t0 = time.time()
     # Deterministic sampling toggle (default on for stable exports)
@@ -648,8 +660,17 @@ def metrics_recent(request):
 @api_view(['GET'])  # aggregate averages across scopes
 @permission_classes([DebugOrAuthPermission])
 def metrics_summary(request):
-    """Averages for tokens/duration and edit metrics by scope (global/org/user)."""
-    from .models import AIMetric  # local import
+    """Averages for tokens/duration and edit metrics by scope (global/org/user), plus the embedding backlog.
+
+    ``jobs`` counts async job deduplication (X-Org-ID scoped when given): misses (new jobs), hits coalesced onto
+    an in-flight job or served from a finished deterministic job's result, and the hit rate.
+
+    ``stages`` holds per-stage latency percentiles (retrieval embed/fetch/decode/score, provider, render,
+    persist) over the newest ``AI_STAGE_METRICS_WINDOW`` job metrics, overall, per job type and per
+    deployment (``AI_DEPLOYMENT_ID``); ``?deployment=<id>`` restricts them to one deployment.
+    """
+    from .models import AIChunk, AIMetric  # local import
+    from .timing import summarize_stages
     from django.db.models import Sum, Count
 
     org_id = request.META.get('HTTP_X_ORG_ID', '')
@@ -692,7 +713,50 @@ def metrics_summary(request):
     if getattr(request, 'user', None) and request.user.is_authenticated:
         user_stats = agg(AIMetric.objects.filter(created_by=request.user))
 
-    return Response({'global': global_stats, 'org': org_stats, 'user': user_stats})
+    # Chunks without a stored binary vector (unembedded or legacy JSON) are waiting for the backfill task
+    backlog = AIChunk.objects.filter(embedding_vec__isnull=True).count()
+    retrieval_stats = {'embedding_backlog': backlog, 'index_warm': backlog == 0}
+
+    window = max(1, int(getattr(settings, 'AI_STAGE_METRICS_WINDOW', 1000) or 1000))
+    staged = AIMetric.objects.exclude(stages={})
+    deployment = request.GET.get('deployment')
+    if deployment is not None:
+        staged = staged.filter(deployment=deployment)
+    rows = list(staged.order_by('-id').values_list('type', 'deployment', 'stages')[:window])
+    by_type: dict[str, list[dict]] = {}
+    by_deployment: dict[str, list[dict]] = {}
+    for type_, dep, stages in rows:
+        by_type.setdefault(type_, []).append(stages)
+        by_deployment.setdefault(dep, []).append(stages)
+    stage_stats = {
+        'window': len(rows),
+        'overall': summarize_stages(r[2] for r in rows),
+        'by_type': {t: summarize_stages(v) for t, v in sorted(by_type.items())},
+        'by_deployment': {d: summarize_stages(v) for d, v in sorted(by_deployment.items())},
+    }
+    # Async job deduplication (ai.tasks.submit_job): misses created a job, hits were coalesced onto or reused one
+    keyed = AIJob.objects.exclude(idempotency_key='')
+    if org_id:
+        keyed = keyed.filter(org_id=org_id)
+    dedup = keyed.aggregate(misses=Count('id'), coalesced=Sum('coalesced_count'), reused=Sum('reused_count'))
+    hits = (dedup['coalesced'] or 0) + (dedup['reused'] or 0)
+    submitted = dedup['misses'] + hits
+    job_stats = {
+        'dedup_misses': dedup['misses'],
+        'dedup_coalesced': dedup['coalesced'] or 0,
+        'dedup_reused': dedup['reused'] or 0,
+        'dedup_hit_rate': round(hits / submitted, 4) if submitted else 0.0,
+    }
+    return Response(
+        {
+            'global': global_stats,
+            'org': org_stats,
+            'user': user_stats,
+            'retrieval': retrieval_stats,
+            'stages': stage_stats,
+            'jobs': job_stats,
+        }
+    )
 
 
 @api_view(['GET'])
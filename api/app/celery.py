@@ -1,8 +1,19 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 app = Celery('granterstellar')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def _warm_up_embeddings(**_kwargs):
+    # Runs in each forked worker child (a thread started in the parent would not survive the fork)
+    from ai.embedding_service import EmbeddingService, warmup_enabled
+
+    EmbeddingService.after_fork()  # drop an instance whose load was still running in the parent
+    if warmup_enabled('worker'):
+        EmbeddingService.warm_up()
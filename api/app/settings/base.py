@@ -192,6 +192,57 @@ CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', '0') == '1'
 EXPORTS_ASYNC = os.getenv('EXPORTS_ASYNC', '0') == '1'
 AI_ASYNC = os.getenv('AI_ASYNC', '0') == '1'
 
+# Retrieval vector index (ai/chunk_index.py): 'ivf' (approximate) or 'flat' (exact scan)
+AI_VECTOR_INDEX = os.getenv('AI_VECTOR_INDEX', 'ivf').strip().lower()
+# Directory for the persisted index; empty disables persistence (tests default to in-memory only)
+AI_VECTOR_INDEX_DIR = os.getenv('AI_VECTOR_INDEX_DIR', '' if TESTING else str(BASE_DIR / 'var' / 'ai_index')).strip()
+AI_IVF_NPROBE = int(os.getenv('AI_IVF_NPROBE', '8'))
+AI_IVF_MIN_TRAIN = int(os.getenv('AI_IVF_MIN_TRAIN', '1024'))
+# Retrieval ranking: 'vector' (cosine) or 'hybrid' (BM25 + cosine fused with reciprocal rank fusion)
+AI_RETRIEVAL_MODE = os.getenv('AI_RETRIEVAL_MODE', 'vector').strip().lower()
+AI_HYBRID_CANDIDATES = int(os.getenv('AI_HYBRID_CANDIDATES', '50'))
+AI_RRF_K = int(os.getenv('AI_RRF_K', '60'))
+# MMR diversity rerank over a k * POOL_FACTOR candidate pool, with per-resource caps and near-duplicate collapsing
+AI_RETRIEVAL_MMR = os.getenv('AI_RETRIEVAL_MMR', '1') == '1'
+AI_MMR_LAMBDA = float(os.getenv('AI_MMR_LAMBDA', '0.7'))
+AI_MMR_POOL_FACTOR = int(os.getenv('AI_MMR_POOL_FACTOR', '4'))
+AI_MAX_CHUNKS_PER_RESOURCE = int(os.getenv('AI_MAX_CHUNKS_PER_RESOURCE', '2'))
+AI_MMR_DUP_THRESHOLD = float(os.getenv('AI_MMR_DUP_THRESHOLD', '0.95'))
+# Label stored on AIMetric rows (e.g. release tag / git sha) so metrics_summary can compare stage timings per deployment
+AI_DEPLOYMENT_ID = os.getenv('AI_DEPLOYMENT_ID', '').strip()
+# metrics_summary stage percentiles are computed over the newest N metric rows
+AI_STAGE_METRICS_WINDOW = int(os.getenv('AI_STAGE_METRICS_WINDOW', '1000'))
+# Binary precision for stored chunk embeddings (ai/embedding_codec.py): float32 | float16
+AI_EMBEDDING_DTYPE = os.getenv('AI_EMBEDDING_DTYPE', 'float32').strip().lower()
+# Embedding memo (ai/embedding_service.py): per-process LRU size and TTL; optional Django cache alias for cross-process reuse
+AI_EMBEDDING_MEMO_SIZE = int(os.getenv('AI_EMBEDDING_MEMO_SIZE', '2048'))
+AI_EMBEDDING_MEMO_TTL = int(os.getenv('AI_EMBEDDING_MEMO_TTL', '3600'))
+AI_EMBEDDING_CACHE_ALIAS = os.getenv('AI_EMBEDDING_CACHE_ALIAS', '').strip()
+# MiniLM micro-batching: concurrent embed calls within the window share one encode (0 disables)
+AI_EMBEDDING_BATCH_WINDOW_MS = float(os.getenv('AI_EMBEDDING_BATCH_WINDOW_MS', '5'))
+AI_EMBEDDING_BATCH_MAX = int(os.getenv('AI_EMBEDDING_BATCH_MAX', '64'))
+# Background MiniLM warm-up: '' (load on first use), 'web' (AppConfig.ready), 'worker' (Celery worker_process_init), 'all'
+AI_EMBEDDING_WARMUP = os.getenv('AI_EMBEDDING_WARMUP', '').strip().lower()
+# After a failed model load, serve hash vectors and retry the load after this many seconds
+AI_EMBEDDING_LOAD_RETRY_SECONDS = int(os.getenv('AI_EMBEDDING_LOAD_RETRY_SECONDS', '300'))
+# Dual-read model upgrade: backend whose vectors keep serving until the EMBEDDING_BACKEND index covers the corpus
+AI_EMBEDDING_PREVIOUS_BACKEND = os.getenv('AI_EMBEDDING_PREVIOUS_BACKEND', '').strip().lower()
+# EMBEDDING_BACKEND=onnx (ai/onnx_embedder.py): exported MiniLM dir (model.onnx, tokenizer.json),
+# int8 model, ORT threads (0 = default)
+AI_ONNX_MODEL_DIR = os.getenv('AI_ONNX_MODEL_DIR', '').strip()
+AI_ONNX_QUANTIZED = os.getenv('AI_ONNX_QUANTIZED', '0') == '1'
+AI_ONNX_THREADS = int(os.getenv('AI_ONNX_THREADS', '0'))
+# ingest_grant_call: stop reading a call page after this many bytes; ETag/Last-Modified kept this long (seconds) for 304 checks
+AI_FETCH_MAX_BYTES = int(os.getenv('AI_FETCH_MAX_BYTES', str(5 * 1024 * 1024)))
+AI_FETCH_VALIDATOR_TTL = int(os.getenv('AI_FETCH_VALIDATOR_TTL', str(7 * 24 * 3600)))
+# Token counting (ai/tokenization.py): 'approx' | 'onnx' (AI_ONNX_MODEL_DIR/tokenizer.json) | path to a tokenizer.json
+AI_TOKENIZER = os.getenv('AI_TOKENIZER', 'approx').strip()
+# Ingestion chunk budget in tokens, and sliding overlap (trailing whole sentences of the previous chunk, 0 disables)
+AI_CHUNK_MAX_TOKENS = int(os.getenv('AI_CHUNK_MAX_TOKENS', '200'))
+AI_CHUNK_OVERLAP_TOKENS = int(os.getenv('AI_CHUNK_OVERLAP_TOKENS', '0'))
+# Async AI jobs: identical submissions within N seconds join the in-flight job or reuse its deterministic result (0 disables)
+AI_JOB_DEDUP_WINDOW = int(os.getenv('AI_JOB_DEDUP_WINDOW', '600'))
+
 INVITE_SENDER_DOMAIN = os.getenv('INVITE_SENDER_DOMAIN', '').strip()
 DEFAULT_FROM_EMAIL = (
     (f'invites@{INVITE_SENDER_DOMAIN}' if INVITE_SENDER_DOMAIN else None)
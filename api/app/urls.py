@@ -45,7 +45,7 @@ def api_ready(_request):
     """Readiness probe: checks DB and (optionally) cache connectivity.
 
     Returns shape:
-    {"status":"ok|error","db":bool,"cache":bool,"details":{...}}
+    {"status":"ok|error","db":bool,"cache":bool,"embeddings":bool,"details":{...}}
     """
     db_ok = False
     cache_ok = False
@@ -70,8 +70,23 @@ def api_ready(_request):
         cache_ok = val == '1'
     except Exception as exc:  # pragma: no cover
         details['cache_error'] = str(exc)[:200]
-    status = 'ok' if db_ok else 'error'
-    payload = {'status': status, 'db': db_ok, 'cache': cache_ok, 'details': details}
+    # Embedding model: while a configured warm-up is still loading, report not ready so traffic waits for it.
+    # A failed load does not block readiness (requests are served by the hash fallback meanwhile).
+    embeddings_ok = True
+    warming = False
+    try:
+        from ai.embedding_service import EmbeddingService, warmup_enabled
+
+        svc = EmbeddingService.existing()  # never trigger a synchronous model load from the probe
+        if svc is not None:
+            health = svc.health()
+            embeddings_ok = bool(health['ready'])
+            warming = health['state'] == 'loading' and warmup_enabled('web')
+            details['embeddings'] = {k: health[k] for k in ('backend', 'requested_backend', 'state', 'error')}
+    except Exception as exc:  # pragma: no cover
+        details['embeddings_error'] = str(exc)[:200]
+    status = 'ok' if db_ok and not warming else 'error'
+    payload = {'status': status, 'db': db_ok, 'cache': cache_ok, 'embeddings': embeddings_ok, 'details': details}
     if status == 'error':
         # Wrap in standardized error format while still including top-level keys for backward compatibility.
         err = error_response('ready_check_failed', 'One or more readiness checks failed', status=503, meta=payload)